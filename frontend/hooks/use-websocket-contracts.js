@@ -5,6 +5,7 @@ export function useWebSocketContracts(token) {
   const ws = useRef(null)
   const [contracts, setContracts] = useState([])
   const [isLoading, setIsLoading] = useState(true)
+  const lastSeq = useRef(0)
 
   useEffect(() => {
     if (!token) return
@@ -13,11 +14,13 @@ export function useWebSocketContracts(token) {
 
     ws.current.onopen = () => {
       console.log("WebSocket connected")
+      // After a reconnect only the changes we missed are replayed
       ws.current.send(
-        JSON.stringify({
-          token: token,
-          action: "fetch_contracts",
-        }),
+        JSON.stringify(
+          lastSeq.current > 0
+            ? { token: token, action: "resync", since: lastSeq.current }
+            : { token: token, action: "fetch_contracts" },
+        ),
       )
     }
 
@@ -28,6 +31,11 @@ export function useWebSocketContracts(token) {
         const transformedContracts = transformContracts(data.data)
         setContracts(transformedContracts)
         setIsLoading(false)
+      } else if (data.delta) {
+        setContracts((prev) => applyDelta(prev, data.delta))
+      }
+      if (typeof data.seq === "number") {
+        lastSeq.current = data.seq
       }
     }
 
@@ -70,6 +78,17 @@ export function useWebSocketContracts(token) {
     }
   }
 
+  const applyDelta = (current, events) => {
+    let next = current
+    for (const event of events) {
+      next = next.filter((contract) => contract.id !== event.contract_id)
+      if (event.op !== "deleted" && event.contract) {
+        next = [...transformContracts([event.contract]), ...next]
+      }
+    }
+    return next
+  }
+
   const sendMessage = (message) => {
     if (ws.current && ws.current.readyState === WebSocket.OPEN) {
       ws.current.send(JSON.stringify({ token, ...message }))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+import uploads.blobs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0002_remove_complaint_admin_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaint',
+            name='proof',
+            field=uploads.blobs.DedupFileField(blank=True, null=True, upload_to='complaint_proofs/'),
+        ),
+    ]
@@ -1,12 +1,13 @@
 from django.db import models
 from user.models import CustomUser
+from uploads.blobs import DedupFileField
 
 class Complaint(models.Model):
     complainant = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="complaints_filed")
     accused = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name="complaints_against")
     category = models.CharField(max_length=30, default="fraud")
     description = models.TextField()
-    proof = models.FileField(upload_to="complaint_proofs/", blank=True, null=True)
+    proof = DedupFileField(upload_to="complaint_proofs/", blank=True, null=True)
     priority = models.CharField(max_length=10, default="Low")
     status = models.CharField(max_length=20, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
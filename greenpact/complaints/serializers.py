@@ -1,14 +1,18 @@
 from rest_framework import serializers
 from .models import Complaint
 from user.models import CustomUser
+from uploads.serializers import UploadSessionField, UploadSessionMixin
 
-class ComplaintSerializer(serializers.ModelSerializer):
+class ComplaintSerializer(UploadSessionMixin, serializers.ModelSerializer):
     # Read-only fields
     complainant = serializers.ReadOnlyField(source="complainant.username")
     accused = serializers.SlugRelatedField(
         slug_field='username',
         queryset=CustomUser.objects.all(),
     )
+    # resumable upload in place of a multipart ``proof``
+    proof_upload = UploadSessionField()
+    upload_fields = {"proof_upload": "proof"}
 
     class Meta:
         model = Complaint
@@ -2,4 +2,14 @@ from django.contrib import admin
 from . import models
 admin.site.register(models.Contract)
 admin.site.register(models.Transaction)
-admin.site.register(models.FarmerProgress)
\ No newline at end of file
+admin.site.register(models.FarmerProgress)
+admin.site.register(models.ContractPdfJob)
+admin.site.register(models.ContractVerification)
+admin.site.register(models.ContractCounter)
+admin.site.register(models.ContractChange)
+admin.site.register(models.ContractLedger)
+admin.site.register(models.Installment)
+admin.site.register(models.ContractEvent)
+admin.site.register(models.ContractSnapshot)
+admin.site.register(models.FaceMatchJob)
+admin.site.register(models.DeliveryReminder)
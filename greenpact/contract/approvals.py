@@ -0,0 +1,68 @@
+import uuid
+from django.db import transaction
+from .models import (
+    Contract, ContractChange, ContractEvent, ContractVerification, PartyChange,
+    record_contract_changes, record_contract_events,
+)
+from .pdf_jobs import enqueue_contract_pdfs
+from .serializers import CONTRACT_RELATED
+
+MAX_APPROVALS = 500
+
+
+class ApprovalError(Exception):
+    """A batch approval request the caller has to fix; the message is safe to send back."""
+
+
+def approve_contracts(farmer, contract_ids):
+    """
+    Approve the farmer's contracts among ``contract_ids`` in one transaction:
+    the rows are locked in key order, flipped with a single UPDATE, and each
+    party gets one coalesced change push for the whole batch. Returns
+    ``{"approved", "already_approved", "not_found"}`` lists of ids; ids that
+    are missing or belong to another farmer are reported as not found.
+    Raises ApprovalError for a request that cannot be carried out at all.
+    """
+    if farmer.type != "farmer":
+        raise ApprovalError("You can't approve this contract, wait for seller to approve")
+    if not isinstance(contract_ids, list) or not contract_ids:
+        raise ApprovalError("contract_ids must be a non-empty list")
+    if len(contract_ids) > MAX_APPROVALS:
+        raise ApprovalError(f"At most {MAX_APPROVALS} contracts per message")
+    try:
+        requested = list(dict.fromkeys(str(uuid.UUID(str(contract_id))) for contract_id in contract_ids))
+    except ValueError:
+        raise ApprovalError("contract_ids must be UUIDs")
+    with transaction.atomic():
+        contracts = list(
+            Contract.objects.select_for_update(of=("self",))
+            .select_related(*CONTRACT_RELATED)
+            .filter(contract_id__in=requested, farmer=farmer)
+            .order_by("contract_id")
+        )
+        pending = [contract for contract in contracts if not contract.status]
+        if pending:
+            Contract.objects.filter(contract_id__in=[c.contract_id for c in pending]).update(status=True)
+            changes = []
+            for contract in pending:
+                contract.status = True
+                contract._loaded_values["status"] = True
+                changes += [
+                    PartyChange(contract.farmer, contract.contract_id, ContractChange.Op.UPDATED, 0),
+                    PartyChange(contract.buyer, contract.contract_id, ContractChange.Op.UPDATED, 0),
+                ]
+            record_contract_events([
+                ContractEvent(contract=contract, kind=ContractEvent.Kind.APPROVED, data={"fields": {"status": True}})
+                for contract in pending
+            ])
+            ContractVerification.refresh_many(pending)
+            enqueue_contract_pdfs(pending)
+            record_contract_changes(changes)
+
+    found = {str(contract.contract_id) for contract in contracts}
+    approved = {str(contract.contract_id) for contract in pending}
+    return {
+        "approved": [i for i in requested if i in approved],
+        "already_approved": [i for i in requested if i in found and i not in approved],
+        "not_found": [i for i in requested if i not in found],
+    }
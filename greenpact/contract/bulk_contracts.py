@@ -0,0 +1,46 @@
+from django.db import transaction
+from .models import (
+    Contract, ContractChange, ContractEvent, ContractLedger, ContractVerification, PartyChange,
+    record_contract_changes, record_contract_events,
+)
+from .pdf_jobs import enqueue_contract_pdfs
+from .reservations import take_many
+
+
+def create_contracts(buyer, items):
+    """
+    Insert one contract per validated ``items`` entry (from
+    BulkContractSerializer) for ``buyer`` in a single transaction. The side
+    effects of Contract.save run once for the whole batch: ledgers, event
+    log, verification rows and PDF jobs are bulk inserted and each party
+    gets one coalesced change push. The crop quantities are reserved and then
+    the change feed numbered at the very end, in the lock order every path
+    uses; if a listing runs short, CropShortage is raised and nothing is
+    created.
+    Returns ``(contracts, pdf_jobs)``.
+    """
+    contracts = [Contract(buyer=buyer, reserved_quantity=item["quantity"], **item) for item in items]
+    with transaction.atomic():
+        Contract.objects.bulk_create(contracts)
+        ContractLedger.objects.bulk_create([
+            ContractLedger(
+                contract=contract,
+                total_price=contract.nego_price * contract.quantity,
+                remaining_amount=contract.nego_price * contract.quantity,
+            )
+            for contract in contracts
+        ])
+        changes = []
+        events = []
+        for contract in contracts:
+            changes += [
+                PartyChange(contract.farmer, contract.contract_id, ContractChange.Op.CREATED, 1),
+                PartyChange(buyer, contract.contract_id, ContractChange.Op.CREATED, 1),
+            ]
+            events += ContractEvent.for_contract_save(contract, set(Contract.HISTORY_FIELDS), True)
+        record_contract_events(events)
+        ContractVerification.refresh_many(contracts)
+        jobs = enqueue_contract_pdfs(contracts)
+        take_many(contracts)
+        record_contract_changes(changes)
+    return contracts, jobs
@@ -3,13 +3,27 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from user.models import CustomUser, FarmerProfile, ContractorProfile
 from rest_framework_simplejwt.tokens import AccessToken
 from . import models, serializers
+from .approvals import ApprovalError, approve_contracts
 import json
+import logging
 from asgiref.sync import sync_to_async
-import requests
-from django.core.files.base import ContentFile
+from django.db import OperationalError
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+def user_for_token(token):
+    try:
+        access_token = AccessToken(token)
+        return CustomUser.objects.get(id=access_token["user_id"])
+    except Exception:
+        return None
 
 
 class ContractConsumer(AsyncWebsocketConsumer):
+    RESYNC_LIMIT = 500
+
     async def connect(self):
         self.user = None
         self.contract_groupname = None
@@ -39,6 +53,8 @@ class ContractConsumer(AsyncWebsocketConsumer):
 
             if action == "fetch_contracts":
                 await self.handle_fetch_contracts()
+            elif action == "resync":
+                await self.handle_resync(data)
             elif action == "approve_contracts":
                 await self.handle_approve_contract(data)
             else:
@@ -57,36 +73,43 @@ class ContractConsumer(AsyncWebsocketConsumer):
         await self.send(text_data=json.dumps(payload))
 
     async def handle_fetch_contracts(self):
-        contracts = await self.get_contracts()
-        await self.send_json({"data": contracts})
+        seq, contracts = await self.get_snapshot()
+        await self.send_json({"data": contracts, "seq": seq})
 
-    async def handle_approve_contract(self, data):
-        if self.user.type != "farmer":
-            await self.send_json(
-                {"error": "You can't approve this contract, wait for seller to approve"}
-            )
+    async def handle_resync(self, data):
+        """Replay changes after the client's last seen ``since``, or fall back to a snapshot."""
+        try:
+            since = int(data.get("since", 0))
+        except (TypeError, ValueError):
+            await self.send_json({"error": "since must be an integer"})
+            return
+        events = await self.get_changes_since(since)
+        if events is None:
+            await self.handle_fetch_contracts()
             return
+        seq = events[-1]["seq"] if events else since
+        await self.send_json({"delta": events, "seq": seq})
 
-        success = await self.approve_contract_sync(data)
-        if success:
-            await self.send_json({"success": True})
-        else:
-            await self.send_json({"error": "Failed to approve contract"})
+    async def handle_approve_contract(self, data):
+        # a single "contract_id" is still accepted from older clients
+        contract_ids = data.get("contract_ids")
+        if contract_ids is None and data.get("contract_id"):
+            contract_ids = [data["contract_id"]]
+        await self.send_json(await self.approve_contracts_sync(contract_ids))
 
     # ---------- sync helpers wrapped with sync_to_async ----------
 
     @sync_to_async
     def authenticate_user(self, token):
-        try:
-            access_token = AccessToken(token)
-            return CustomUser.objects.get(id=access_token["user_id"])
-        except Exception:
-            return None
+        return user_for_token(token)
 
     @sync_to_async
     def get_contracts(self):
+        return self._contracts_data()
+
+    def _contracts_data(self):
         try:
-            qs = models.Contract.objects.select_related("farmer", "buyer", "crop")
+            qs = models.Contract.objects.select_related(*serializers.CONTRACT_RELATED)
             if self.user.type == "farmer":
                 qs = qs.filter(farmer=self.user)
             else:
@@ -96,63 +119,122 @@ class ContractConsumer(AsyncWebsocketConsumer):
             return []
 
     @sync_to_async
-    def approve_contract_sync(self, data):
+    def get_snapshot(self):
+        # read the sequence first: anything newer may also be in the snapshot,
+        # and clients apply deltas idempotently by contract_id
+        seq = (
+            models.ContractCounter.objects.filter(user=self.user)
+            .values_list("seq", flat=True)
+            .first()
+        ) or 0
+        return seq, self._contracts_data()
+
+    @sync_to_async
+    def get_changes_since(self, since):
+        limit = self.RESYNC_LIMIT
+        changes = list(
+            models.ContractChange.objects.filter(user=self.user, seq__gt=since)
+            .order_by("seq")[:limit + 1]
+        )
+        # a gap means the log was pruned past ``since``; too many means a snapshot is cheaper
+        if len(changes) > limit or (changes and changes[0].seq != since + 1):
+            return None
+        payloads = models.contract_payloads(change.contract_id for change in changes)
+        return [change.as_event(payloads) for change in changes]
+
+    @sync_to_async
+    def approve_contracts_sync(self, contract_ids):
         try:
-            contract = models.Contract.objects.select_related(
-                "farmer", "buyer", "crop"
-            ).get(contract_id=data["contract_id"])
-
-            farmer_profile = FarmerProfile.objects.get(user=contract.farmer)
-            contractor_profile = ContractorProfile.objects.get(user=contract.buyer)
-
-            payload = {
-                "orderDate": "2025-04-02",
-                "farmerName": farmer_profile.name,
-                "farmerAddress": farmer_profile.address,
-                "farmerContact": farmer_profile.phoneno,
-                "customerName": contractor_profile.name,
-                "customerAddress": contractor_profile.address,
-                "customerContact": contractor_profile.phoneno,
-                "cropName": contract.crop.crop_name,
-                "quantity": contract.quantity,
-                "pricePerUnit": contract.nego_price,
-                "totalAmount": contract.quantity * contract.nego_price,
-                "orderId": str(contract.contract_id)[:8],
-                "contractId": str(contract.contract_id),
-                "deliveryDate": contract.delivery_date.strftime("%Y-%m-%d"),
-                "deliveryLocation": contract.delivery_address,
-                "agreementDate": "2025-04-10",
-                "additionalConditions": "\n".join(contract.terms or []),
-            }
+            return {"success": True, **approve_contracts(self.user, contract_ids)}
+        except ApprovalError as e:
+            return {"error": str(e)}
+        except OperationalError:
+            # lock timeout or deadlock with another writer; nothing was approved
+            logger.warning("Approval of %d contracts by %s hit a lock conflict", len(contract_ids), self.user.pk)
+            return {"error": "Contracts are being changed by someone else, please retry", "retry": True}
+        except Exception:
+            logger.exception("Could not approve contracts for %s", self.user.pk)
+            return {"error": "Failed to approve contract"}
 
-            files = {
-                "farmerSignature": farmer_profile.signature,
-                "customerSignature": contractor_profile.signature,
+    async def contract_notification(self, event):
+        await self.send_json({"contract": event["contract"]})
+
+    async def contract_delta(self, event):
+        await self.send_json({
+            "delta": event["events"],
+            "seq": event["seq"],
+            "contract": event["contract"],
+        })
+
+    async def contract_pdf_ready(self, event):
+        await self.send_json({
+            "pdf": {
+                "job_id": event["job_id"],
+                "contract_id": event["contract_id"],
+                "status": event["status"],
             }
+        })
 
-            # response = requests.post(
-            #     "http://localhost:6000/api/contracts/create",
-            #     data=payload,
-            #     files=files,
-            # )
+    async def delivery_reminder(self, event):
+        await self.send_json({"reminders": event["reminders"]})
 
-            # if response.status_code != 200:
-            #     print("PDF generation failed:", response.text)
-            #     return False
 
-            contract.status = True
-            contract.save()
+class ContractDetailConsumer(AsyncWebsocketConsumer):
+    """
+    Live payments and progress updates of one contract, for its two parties.
+    Authenticates from the ``?token=`` query string, or from a later
+    ``{"token": ...}`` message like ContractConsumer.
+    """
 
-            pdf_name = f"contract_{contract.contract_id}.pdf"
-            contract_doc = models.ContractDoc(contract=contract)
-            # contract_doc.document.save(pdf_name, ContentFile(response.content))
-            contract_doc.save()
+    async def connect(self):
+        self.contract_id = str(self.scope["url_route"]["kwargs"]["contract_id"])
+        self.group_name = None
+        await self.accept()
+        user = self.scope.get("user")
+        if user is not None and user.is_authenticated:
+            await self.subscribe(user)
 
-            return True
+    async def receive(self, text_data):
+        try:
+            data = json.loads(text_data)
+            if self.group_name:
+                await self.send_json({"subscribed": self.contract_id})
+                return
+            user = await sync_to_async(user_for_token)(data.get("token"))
+            if not user:
+                await self.send_json({"error": "Authentication failed"})
+                return
+            await self.subscribe(user)
         except Exception as e:
-            print("Error approving contract:", e)
-            return False
+            await self.send_json({"error": str(e)})
 
-    async def contract_notification(self, event):
-        contracts = await self.get_contracts()
-        await self.send_json({"data": contracts})
+    async def disconnect(self, close_code):
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def send_json(self, payload: dict):
+        await self.send(text_data=json.dumps(payload))
+
+    async def subscribe(self, user):
+        if not await self.is_party(user):
+            await self.send_json({"error": "Not a party to this contract"})
+            await self.close(code=4403)
+            return
+        self.group_name = models.contract_detail_group(self.contract_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.send_json({"subscribed": self.contract_id})
+
+    @sync_to_async
+    def is_party(self, user):
+        return user.is_staff or models.Contract.objects.filter(
+            Q(farmer=user) | Q(buyer=user), contract_id=self.contract_id
+        ).exists()
+
+    async def contract_payment(self, event):
+        await self.send_json({"op": event["op"], "payment": event["payment"], "ledger": event.get("ledger")})
+
+    async def contract_payments_imported(self, event):
+        await self.send_json({"op": "imported", "count": event["count"], "ledger": event.get("ledger")})
+
+    async def contract_progress(self, event):
+        await self.send_json({"op": event["op"], "progress": event["progress"]})
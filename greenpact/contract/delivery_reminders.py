@@ -0,0 +1,99 @@
+"""
+Reminders about upcoming, due and missed deliveries.
+
+Instead of a timer per contract, each tick runs a keyset range scan over
+``contract_delivery_due_idx`` for approved contracts whose delivery date is
+inside the reminder window, skipping those whose reminder for the current
+stage was already recorded in DeliveryReminder.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, Exists, OuterRef, Q, Value, When
+from django.utils import timezone
+from .models import Contract, DeliveryReminder, send_contract_pushes
+
+MESSAGES = {
+    DeliveryReminder.Kind.UPCOMING: "Delivery of {crop} is due on {date}",
+    DeliveryReminder.Kind.DUE: "Delivery of {crop} is due today",
+    DeliveryReminder.Kind.OVERDUE: "Delivery of {crop} was due on {date} and is overdue",
+}
+
+
+def due_contracts(today):
+    """
+    Approved contracts delivering between ``DELIVERY_REMINDER_OVERDUE_DAYS``
+    ago and ``DELIVERY_REMINDER_LEAD_DAYS`` ahead that still owe a reminder,
+    annotated with ``reminder_kind`` and ordered for keyset paging.
+    """
+    first = today - timedelta(days=settings.DELIVERY_REMINDER_OVERDUE_DAYS)
+    last = today + timedelta(days=settings.DELIVERY_REMINDER_LEAD_DAYS)
+    sent = DeliveryReminder.objects.filter(
+        contract=OuterRef("pk"), kind=OuterRef("reminder_kind"), delivery_date=OuterRef("delivery_date")
+    )
+    return (
+        Contract.objects.filter(status=True, delivery_date__range=(first, last))
+        .annotate(reminder_kind=Case(
+            When(delivery_date__lt=today, then=Value(DeliveryReminder.Kind.OVERDUE)),
+            When(delivery_date=today, then=Value(DeliveryReminder.Kind.DUE)),
+            default=Value(DeliveryReminder.Kind.UPCOMING),
+            output_field=CharField(),
+        ))
+        .filter(~Exists(sent))
+        .select_related("farmer", "buyer", "crop")
+        .order_by("delivery_date", "contract_id")
+    )
+
+
+def reminder_payload(contract):
+    return {
+        "contract_id": str(contract.contract_id),
+        "kind": contract.reminder_kind,
+        "delivery_date": contract.delivery_date.isoformat(),
+        "delivery_address": contract.delivery_address,
+        "message": MESSAGES[contract.reminder_kind].format(
+            crop=contract.crop.crop_name, date=contract.delivery_date.isoformat()
+        ),
+    }
+
+
+def send_delivery_reminders(today=None, batch=500):
+    """
+    Record and push every reminder that is due as of ``today``; returns how
+    many were sent. Rows are locked with SKIP LOCKED, so two schedulers
+    running at once split the work instead of sending a reminder twice.
+    """
+    today = today or timezone.localdate()
+    sent = 0
+    after = None
+    while True:
+        with transaction.atomic():
+            contracts = due_contracts(today)
+            if after is not None:
+                contracts = contracts.filter(
+                    Q(delivery_date__gt=after[0]) | Q(delivery_date=after[0], contract_id__gt=after[1])
+                )
+            contracts = list(contracts.select_for_update(skip_locked=True, of=("self",))[:batch])
+            if not contracts:
+                break
+            DeliveryReminder.objects.bulk_create([
+                DeliveryReminder(contract=c, kind=c.reminder_kind, delivery_date=c.delivery_date)
+                for c in contracts
+            ])
+            # one push per user per batch, both parties get the reminder
+            reminders = defaultdict(list)
+            for contract in contracts:
+                payload = reminder_payload(contract)
+                reminders[contract.farmer.username].append(payload)
+                reminders[contract.buyer.username].append(payload)
+            pushes = [
+                (username, {"type": "delivery_reminder", "reminders": items})
+                for username, items in reminders.items()
+            ]
+            transaction.on_commit(lambda pushes=pushes: send_contract_pushes(pushes), robust=True)
+        sent += len(contracts)
+        after = (contracts[-1].delivery_date, contracts[-1].contract_id)
+        if len(contracts) < batch:
+            break
+    return sent
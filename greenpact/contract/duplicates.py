@@ -0,0 +1,59 @@
+from django.db.models import F, Q, Window
+from django.db.models.functions import FirstValue
+from utils.references import normalized_reference_sql
+from .models import Transaction
+
+
+def refresh_reference_keys():
+    """
+    Recompute ``reference_key`` where it went stale, e.g. after a queryset
+    update of reference_number. A row whose new key is already taken on its
+    contract is flagged as a duplicate of that payment. Returns the number
+    of rows fixed.
+    """
+    stale = list(
+        Transaction.objects.annotate(key=normalized_reference_sql("reference_number"))
+        .exclude(reference_key=F("key"))
+        .order_by("id")
+        .values_list("id", "contract_id", "key")
+    )
+    for transaction_id, contract_id, key in stale:
+        changes = {"reference_key": key}
+        if key:
+            original_id = (
+                Transaction.objects.filter(contract_id=contract_id, reference_key=key, duplicate_of__isnull=True)
+                .exclude(id=transaction_id)
+                .values_list("id", flat=True)
+                .first()
+            )
+            if original_id is not None:
+                changes["duplicate_of_id"] = original_id
+        Transaction.objects.filter(id=transaction_id).update(**changes)
+    return len(stale)
+
+
+def find_duplicate_transactions():
+    """
+    ``(duplicate_id, original_id)`` for every unflagged payment that repeats
+    the reference of an earlier payment on the same contract.
+    """
+    return (
+        Transaction.objects.filter(duplicate_of__isnull=True)
+        .exclude(reference_key="")
+        .annotate(original_id=Window(
+            FirstValue("id"),
+            partition_by=[F("contract_id"), F("reference_key")],
+            order_by=F("id").asc(),
+        ))
+        .filter(~Q(id=F("original_id")))
+        .order_by("contract_id", "reference_key", "id")
+        .values_list("id", "original_id")
+    )
+
+
+def flag_duplicate_transactions(pairs):
+    Transaction.objects.bulk_update(
+        [Transaction(id=duplicate_id, duplicate_of_id=original_id) for duplicate_id, original_id in pairs],
+        ["duplicate_of"],
+        batch_size=1000,
+    )
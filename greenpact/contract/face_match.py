@@ -0,0 +1,122 @@
+"""
+Queued comparison of an uploaded photo with the farmer's profile image.
+
+This is a placeholder, not identity verification: the two images are
+compared by a 64-bit difference hash, which only tells whether they look
+alike overall (same photo, re-encoded or resized). It does not detect or
+compare faces, so results are reported as ``similar_image`` and must not
+be treated as proof of who is in the photo.
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+from django.conf import settings
+from PIL import Image
+from utils.image_cache import face_cache
+from utils.jobs import claim_jobs
+from utils.scratch import ScratchArea
+from .models import FaceMatchJob
+
+HASH_SIZE = 8
+
+
+class ReferenceUnavailable(Exception):
+    """The profile image could not be loaded; raised so the failure is not memoised."""
+
+    def __init__(self, public_id):
+        super().__init__(f"Could not load profile image {public_id}")
+        self.public_id = public_id
+
+
+def get_scratch():
+    return ScratchArea(
+        settings.FACE_MATCH_SCRATCH_DIR,
+        max_bytes=settings.FACE_MATCH_SCRATCH_MAX_BYTES,
+        max_file_bytes=settings.FACE_MATCH_MAX_UPLOAD_BYTES,
+    )
+
+
+def enqueue_face_match(user, upload, reference_image):
+    """
+    Stream ``upload`` into the scratch area and queue a comparison with the
+    profile image ``reference_image`` (a Cloudinary public_id). Nothing is
+    decoded here. Raises ScratchFull or UploadTooLarge.
+    """
+    scratch = get_scratch()
+    path = scratch.save(upload.chunks(), suffix=os.path.splitext(upload.name or "")[1][:10])
+    try:
+        return FaceMatchJob.objects.create(user=user, upload_path=path, reference_image=reference_image)
+    except Exception:
+        scratch.remove(path)
+        raise
+
+
+def image_hash(image):
+    """64-bit difference hash of a PIL image: brighter-than-right-neighbour bits."""
+    pixels = list(image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def upload_hash(path):
+    with Image.open(path) as image:
+        # JPEG can decode straight to a small greyscale draft
+        image.draft("L", face_cache.size)
+        image.thumbnail(face_cache.size)
+        return image_hash(image)
+
+
+@lru_cache(maxsize=1024)
+def reference_hash(public_id):
+    """
+    Hash of a profile image, from the shared downscaled cache. Raises
+    ReferenceUnavailable instead of returning a value, so only successful
+    lookups are kept by lru_cache.
+    """
+    data = face_cache.get(public_id)
+    if data is None:
+        raise ReferenceUnavailable(public_id)
+    with Image.open(BytesIO(data)) as image:
+        return image_hash(image)
+
+
+def _finish(job, status, matched=None, distance=None, error=""):
+    job.status = status
+    job.matched = matched
+    job.distance = distance
+    job.error = error
+    job.save(update_fields=["status", "matched", "distance", "error", "updated_at"])
+
+
+def run_face_match_jobs(batch_size=20):
+    """
+    Claim a batch of pending jobs, compare each upload with its reference
+    image and delete the upload. Returns the number of jobs handled.
+    """
+    jobs = claim_jobs(FaceMatchJob, batch_size)
+    scratch = get_scratch()
+    for job in jobs:
+        try:
+            if not os.path.exists(job.upload_path):
+                _finish(job, FaceMatchJob.Status.FAILED, error="Upload expired, please retry")
+                continue
+            try:
+                reference = reference_hash(job.reference_image)
+            except ReferenceUnavailable:
+                _finish(job, FaceMatchJob.Status.FAILED, error="Could not load profile image")
+                continue
+            distance = bin(upload_hash(job.upload_path) ^ reference).count("1")
+            _finish(
+                job, FaceMatchJob.Status.DONE,
+                matched=distance <= settings.FACE_MATCH_MAX_DISTANCE, distance=distance,
+            )
+        except Exception as e:
+            _finish(job, FaceMatchJob.Status.FAILED, error=f"Image comparison failed: {e}")
+        finally:
+            scratch.remove(job.upload_path)
+    return len(jobs)
@@ -0,0 +1,72 @@
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import ContractLedger, Installment
+
+# Walks every schedule once: a window SUM gives the amount due up to each
+# installment, which is compared with what the ledger says was paid. Only
+# rows whose status or outstanding amount changed are written.
+REFRESH_SQL = """
+WITH schedule AS (
+    SELECT i.id,
+           LEAST(
+               i.amount,
+               SUM(i.amount) OVER (
+                   PARTITION BY i.contract_id ORDER BY i.due_date, i.sequence
+               ) - COALESCE(l.total_paid, 0)
+           ) AS unpaid,
+           i.due_date
+    FROM {installment} i
+    LEFT JOIN {ledger} l ON l.contract_id = i.contract_id
+    {where}
+), computed AS (
+    SELECT id,
+           GREATEST(unpaid, 0) AS outstanding,
+           CASE WHEN unpaid <= 0 THEN %(paid)s
+                WHEN due_date < %(today)s THEN %(overdue)s
+                ELSE %(pending)s END AS status
+    FROM schedule
+)
+UPDATE {installment} AS target
+SET status = computed.status, outstanding = computed.outstanding
+FROM computed
+WHERE target.id = computed.id
+  AND (target.status <> computed.status OR target.outstanding <> computed.outstanding)
+"""
+
+
+def refresh_overdue_installments(today=None, contract_ids=None):
+    """
+    Recompute status and outstanding amount of every installment (or those
+    of ``contract_ids``) in one statement. Returns the number of rows changed.
+    """
+    params = {
+        "today": today or timezone.localdate(),
+        "paid": Installment.Status.PAID,
+        "overdue": Installment.Status.OVERDUE,
+        "pending": Installment.Status.PENDING,
+    }
+    where = ""
+    if contract_ids is not None:
+        where = "WHERE i.contract_id = ANY(%(contract_ids)s)"
+        params["contract_ids"] = list(contract_ids)
+    sql = REFRESH_SQL.format(
+        installment=Installment._meta.db_table,
+        ledger=ContractLedger._meta.db_table,
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def replace_schedule(contract, items):
+    """Swap the contract's schedule for ``items`` (dicts of due_date and amount)."""
+    items = sorted(items, key=lambda item: item["due_date"])
+    with transaction.atomic():
+        Installment.objects.filter(contract=contract).delete()
+        installments = Installment.objects.bulk_create([
+            Installment(contract=contract, sequence=number, due_date=item["due_date"], amount=item["amount"])
+            for number, item in enumerate(items, start=1)
+        ])
+        refresh_overdue_installments(contract_ids=[contract.contract_id])
+    return installments
@@ -0,0 +1,78 @@
+import os
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from django.core.management.base import BaseCommand
+from utils.contract_pdf import ContractPdfTemplate, render_contract_pdf
+from utils.jobs import init_django_worker
+
+
+def sample_context(i):
+    return {
+        "contract_id": f"00000000-0000-0000-0000-{i:012d}",
+        "created_date": str(date.today()),
+        "farmer_name": f"Farmer {i}",
+        "farmer_address": "Village Road, Ludhiana, Punjab",
+        "farmer_phone": "9876543210",
+        "buyer_name": f"Buyer {i}",
+        "buyer_address": "Market Yard, Azadpur, Delhi",
+        "buyer_phone": "9123456780",
+        "crop_name": "Wheat",
+        "quantity": 100 + i,
+        "nego_price": 2200,
+        "delivery_date": str(date.today()),
+        "delivery_address": "Warehouse 4, Azadpur Mandi, Delhi",
+        "terms": ["Moisture content below 12%", "Delivery in 50 kg bags"],
+    }
+
+
+def render_uncached(context):
+    """Pre-template behaviour: styles and boilerplate rebuilt on every call."""
+    return ContractPdfTemplate().render(context)
+
+
+class Command(BaseCommand):
+    help = "Benchmark contract PDF rendering throughput and peak memory."
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200, help="Contracts to render per scenario")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the batch scenario")
+
+    def report(self, label, count, elapsed, peak_bytes):
+        self.stdout.write(
+            f"{label:<28} {count / elapsed:8.1f} contracts/sec   peak {peak_bytes / 1024 / 1024:7.2f} MiB"
+        )
+
+    def run_single(self, label, render, contexts):
+        render(contexts[0])  # warm up imports and font metrics
+        started = time.perf_counter()
+        for context in contexts:
+            render(context)
+        elapsed = time.perf_counter() - started
+
+        # tracemalloc slows rendering down, so memory is measured in a separate pass
+        tracemalloc.start()
+        for context in contexts[:20]:
+            render(context)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.report(label, len(contexts), elapsed, peak)
+
+    def handle(self, *args, **options):
+        contexts = [sample_context(i) for i in range(options["count"])]
+
+        self.run_single("single (rebuild template)", render_uncached, contexts)
+        self.run_single("single (shared template)", render_contract_pdf, contexts)
+
+        workers = options["workers"]
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_django_worker) as pool:
+            list(pool.map(render_contract_pdf, contexts[:workers]))  # start workers
+            started = time.perf_counter()
+            list(pool.map(render_contract_pdf, contexts, chunksize=8))
+            elapsed = time.perf_counter() - started
+        # ru_maxrss is the largest single child, in KiB on Linux
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+        self.report(f"batch ({workers} processes)", len(contexts), elapsed, peak)
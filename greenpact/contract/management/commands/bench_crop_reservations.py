@@ -0,0 +1,96 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from contract.models import Contract
+from contract.reservations import CropShortage, check, take
+from crops.models import Crops
+from user.models import CustomUser
+
+
+def reserve_locked(crop_id, fields):
+    """Read-modify-write: the crop row stays locked while the contract is written."""
+    with transaction.atomic():
+        crop = Crops.objects.select_for_update().get(crop_id=crop_id)
+        if crop.quantity < fields["quantity"]:
+            raise CropShortage(crop_id, fields["quantity"])
+        Contract.objects.create(crop=crop, **fields)
+        crop.quantity -= fields["quantity"]
+        crop.save(update_fields=["quantity"])
+
+
+def reserve_conditional(crop_id, fields):
+    """What ContractSerializer.create does: conditional F() update, then the contract."""
+    # the serializer has the crop loaded already for its lookup
+    check(Crops.objects.get(crop_id=crop_id), fields["quantity"])
+    with transaction.atomic():
+        take(crop_id, fields["quantity"])
+        Contract.objects.create(crop_id=crop_id, reserved_quantity=fields["quantity"], **fields)
+
+
+class Command(BaseCommand):
+    help = "Benchmark many concurrent buyers contracting one hot crop listing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--buyers", type=int, default=16, help="Concurrent buyers (threads)")
+        parser.add_argument("--contracts", type=int, default=25, help="Contracts each buyer attempts")
+        parser.add_argument("--quantity", type=int, default=2, help="Quantity per contract")
+        parser.add_argument(
+            "--stock", type=int, help="Quantity listed; defaults to three quarters of the total demand"
+        )
+
+    def run(self, label, reserve, options):
+        tag = uuid.uuid4().hex[:8]
+        farmer = CustomUser.objects.create_user(username=f"bench_farmer_{tag}", type=CustomUser.Types.FARMER)
+        buyers = [
+            CustomUser.objects.create_user(username=f"bench_buyer_{tag}_{i}", type=CustomUser.Types.CONTRACTOR)
+            for i in range(options["buyers"])
+        ]
+        demand = options["buyers"] * options["contracts"] * options["quantity"]
+        stock = options["stock"] if options["stock"] is not None else demand * 3 // 4
+        crop = Crops.objects.create(
+            crop_name="Bench wheat", publisher=farmer, crop_price=2200, quantity=stock,
+            Description="benchmark listing", harvested_time=date.today(), location="Punjab",
+        )
+
+        def buyer_run(buyer):
+            accepted = rejected = 0
+            try:
+                for _ in range(options["contracts"]):
+                    try:
+                        reserve(crop.crop_id, {
+                            "farmer": farmer, "buyer": buyer, "nego_price": 2200,
+                            "quantity": options["quantity"], "delivery_address": "Azadpur Mandi, Delhi",
+                            "delivery_date": date.today(),
+                        })
+                        accepted += 1
+                    except CropShortage:
+                        rejected += 1
+            finally:
+                connection.close()
+            return accepted, rejected
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(buyers)) as pool:
+                results = list(pool.map(buyer_run, buyers))
+            elapsed = time.perf_counter() - started
+
+            accepted = sum(a for a, _ in results)
+            rejected = sum(r for _, r in results)
+            left = Crops.objects.values_list("quantity", flat=True).get(crop_id=crop.crop_id)
+            consistent = left == stock - accepted * options["quantity"] and left >= 0
+            self.stdout.write(
+                f"{label:<24} {(accepted + rejected) / elapsed:8.1f} attempts/sec   "
+                f"accepted {accepted:5d}   rejected {rejected:5d}   left {left:5d}   "
+                f"{'consistent' if consistent else 'OVERSOLD'}"
+            )
+        finally:
+            # contracts and the crop go with their users
+            CustomUser.objects.filter(pk__in=[farmer.pk] + [b.pk for b in buyers]).delete()
+
+    def handle(self, *args, **options):
+        self.run("select_for_update", reserve_locked, options)
+        self.run("conditional F()", reserve_conditional, options)
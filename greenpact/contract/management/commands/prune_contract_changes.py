@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from contract.models import ContractChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete contract change-feed entries older than the retention window. "
+        "Clients that resync from before the window get a full snapshot instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Days of changes to keep")
+        parser.add_argument("--interval", type=float, help="Keep running, pruning every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            cutoff = timezone.now() - timedelta(days=options["days"])
+            deleted, _ = ContractChange.objects.filter(created_at__lt=cutoff).delete()
+            self.stdout.write(f"Deleted {deleted} change(s) older than {options['days']} days")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,52 @@
+import csv
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from contract.reconciliation import MATCHED, REPORT_FIELDS, STATUSES, parse_statement, payments_for, reconcile
+from contract.transaction_import import upload_lines
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Reconcile recorded transactions against a bank statement CSV and write a CSV report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("statement", help="Path to the bank statement CSV")
+        parser.add_argument("--output", help="Report path; defaults to stdout")
+        parser.add_argument("--user", help="Only transactions on this user's contracts")
+        parser.add_argument("--date-from")
+        parser.add_argument("--date-to")
+        parser.add_argument("--skip-matched", action="store_true", help="Leave matched records out of the report")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = CustomUser.objects.get(username=options["user"])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']}")
+        dates = {}
+        for option in ("date_from", "date_to"):
+            if options[option]:
+                dates[option] = parse_date(options[option])
+                if dates[option] is None:
+                    raise CommandError(f"--{option.replace('_', '-')} must be YYYY-MM-DD")
+
+        output = open(options["output"], "w", newline="") if options["output"] else sys.stdout
+        summary = dict.fromkeys(STATUSES, 0)
+        try:
+            with open(options["statement"], "rb") as statement_file:
+                writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+                writer.writeheader()
+                records = reconcile(parse_statement(upload_lines(statement_file)), payments_for(user, **dates))
+                for record in records:
+                    summary[record["status"]] += 1
+                    if not (options["skip_matched"] and record["status"] == MATCHED):
+                        writer.writerow(record)
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(", ".join(f"{status}: {count}" for status, count in summary.items()))
@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from contract.installments import refresh_overdue_installments
+
+
+class Command(BaseCommand):
+    help = "Recompute paid/overdue status of every installment in one set-based pass."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, help="Keep running, refreshing every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            changed = refresh_overdue_installments()
+            self.stdout.write(f"Updated {changed} installment(s)")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
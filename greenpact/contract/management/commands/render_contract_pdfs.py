@@ -0,0 +1,43 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from contract.models import ContractPdfJob
+from contract.pdf_jobs import run_pending_jobs
+from utils.jobs import init_django_worker, requeue_stale_jobs
+from utils.pdf_cache import sweep_contract_pdfs
+
+# seconds between sweeps of superseded renders
+SWEEP_INTERVAL = 10 * 60
+
+
+class Command(BaseCommand):
+    help = "Render queued contract PDFs in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+        parser.add_argument("--batch", type=int, default=20)
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(ContractPdfJob)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        swept_at = 0
+        with ProcessPoolExecutor(max_workers=options["workers"], initializer=init_django_worker) as pool:
+            while True:
+                handled = run_pending_jobs(pool, options["batch"])
+                if handled:
+                    self.stdout.write(f"Processed {handled} PDF job(s)")
+                    continue
+                if time.monotonic() - swept_at > SWEEP_INTERVAL:
+                    removed = sweep_contract_pdfs(settings.CONTRACT_PDF_CACHE_MAX_AGE)
+                    if removed:
+                        self.stdout.write(f"Removed {removed} superseded PDF(s)")
+                    swept_at = time.monotonic()
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
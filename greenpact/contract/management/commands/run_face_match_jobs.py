@@ -0,0 +1,32 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from contract.face_match import get_scratch, run_face_match_jobs
+from contract.models import FaceMatchJob
+from utils.jobs import requeue_stale_jobs
+
+
+class Command(BaseCommand):
+    help = "Compare queued photo uploads with farmers' profile images."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=20)
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs(FaceMatchJob)
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        scratch = get_scratch()
+        while True:
+            handled = run_face_match_jobs(options["batch"])
+            if handled:
+                self.stdout.write(f"Processed {handled} face match job(s)")
+                continue
+            # uploads of jobs that never ran (e.g. a crash between save and insert)
+            scratch.sweep(settings.FACE_MATCH_SCRATCH_TTL)
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from contract.duplicates import find_duplicate_transactions, flag_duplicate_transactions, refresh_reference_keys
+
+
+class Command(BaseCommand):
+    help = "Find payments recorded twice under the same reference on a contract and flag them as duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only list the duplicates")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options["dry_run"]:
+                refreshed = refresh_reference_keys()
+                if refreshed:
+                    self.stdout.write(f"Refreshed {refreshed} stale reference key(s)")
+            pairs = list(find_duplicate_transactions())
+            for duplicate_id, original_id in pairs:
+                self.stdout.write(f"Transaction {duplicate_id} duplicates {original_id}")
+            if not options["dry_run"]:
+                flag_duplicate_transactions(pairs)
+        verb = "Found" if options["dry_run"] else "Flagged"
+        self.stdout.write(f"{verb} {len(pairs)} duplicate transaction(s)")
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from contract.delivery_reminders import send_delivery_reminders
+
+
+class Command(BaseCommand):
+    help = "Send reminders for upcoming, due and overdue deliveries with one range scan per tick."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500)
+        parser.add_argument("--interval", type=float, help="Keep running, scanning every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_delivery_reminders(batch=options["batch"])
+            self.stdout.write(f"Sent {sent} delivery reminder(s)")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
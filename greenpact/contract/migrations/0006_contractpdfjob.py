@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:41
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0005_remove_contract_pdf_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractPdfJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('digest', models.CharField(blank=True, max_length=64)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_jobs', to='contract.contract')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='contract_co_status_9d9a0a_idx')],
+            },
+        ),
+    ]
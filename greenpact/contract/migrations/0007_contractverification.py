@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:47
+
+import json
+import secrets
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+
+# Frozen copies of the contract.verification helpers as of this migration,
+# so later changes to that module cannot alter what it backfills.
+def build_summary(contract, farmer_name, buyer_name, crop_name):
+    return {
+        "contract_id": str(contract.contract_id),
+        "farmer_name": farmer_name,
+        "buyer_name": buyer_name,
+        "crop_name": crop_name,
+        "quantity": contract.quantity,
+        "nego_price": contract.nego_price,
+        "total_amount": contract.quantity * contract.nego_price,
+        "delivery_date": str(contract.delivery_date),
+        "status": "approved" if contract.status else "pending",
+        "issued_on": str(contract.created_at.date()),
+    }
+
+
+def sign_summary(summary):
+    payload = json.dumps(summary, sort_keys=True)
+    return salted_hmac("contract.verification.summary", payload).hexdigest()
+
+
+def backfill_verifications(apps, schema_editor):
+    Contract = apps.get_model('contract', 'Contract')
+    ContractVerification = apps.get_model('contract', 'ContractVerification')
+    FarmerProfile = apps.get_model('user', 'FarmerProfile')
+    ContractorProfile = apps.get_model('user', 'ContractorProfile')
+
+    farmer_names = dict(FarmerProfile.objects.values_list('user_id', 'name'))
+    contractor_names = dict(ContractorProfile.objects.values_list('user_id', 'name'))
+    rows = []
+    for contract in Contract.objects.select_related('farmer', 'buyer', 'crop').iterator():
+        summary = build_summary(
+            contract,
+            farmer_names.get(contract.farmer_id, contract.farmer.username),
+            contractor_names.get(contract.buyer_id, contract.buyer.username),
+            contract.crop.crop_name,
+        )
+        rows.append(ContractVerification(
+            contract=contract,
+            token=secrets.token_hex(10),
+            summary=summary,
+            signature=sign_summary(summary),
+        ))
+    ContractVerification.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0006_contractpdfjob'),
+        ('user', '0004_alter_contractorprofile_aadhar_image_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractVerification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, unique=True)),
+                ('summary', models.JSONField()),
+                ('signature', models.CharField(max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('contract', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='verification', to='contract.contract')),
+            ],
+        ),
+        migrations.RunPython(backfill_verifications, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:50
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Contract = apps.get_model('contract', 'Contract')
+    ContractCounter = apps.get_model('contract', 'ContractCounter')
+
+    counts = Counter()
+    for field in ('farmer_id', 'buyer_id'):
+        for row in Contract.objects.values(field).annotate(n=Count('pk')):
+            counts[row[field]] += row['n']
+    ContractCounter.objects.bulk_create(
+        [ContractCounter(user_id=user_id, count=n) for user_id, n in counts.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0007_contractverification'),
+        ('user', '0004_alter_contractorprofile_aadhar_image_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contract_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_ledgers(apps, schema_editor):
+    Contract = apps.get_model('contract', 'Contract')
+    Transaction = apps.get_model('contract', 'Transaction')
+    ContractLedger = apps.get_model('contract', 'ContractLedger')
+
+    paid = dict(
+        Transaction.objects.values_list('contract_id').annotate(total=Sum('amount'))
+    )
+    ledgers = []
+    for contract_id, nego_price, quantity in Contract.objects.values_list('contract_id', 'nego_price', 'quantity').iterator():
+        total_price = nego_price * quantity
+        total_paid = paid.get(contract_id) or 0
+        ledgers.append(ContractLedger(
+            contract_id=contract_id,
+            total_price=total_price,
+            total_paid=total_paid,
+            remaining_amount=total_price - total_paid,
+        ))
+    ContractLedger.objects.bulk_create(ledgers, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0009_contractchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractLedger',
+            fields=[
+                ('contract', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='contract.contract')),
+                ('total_price', models.BigIntegerField(default=0)),
+                ('total_paid', models.BigIntegerField(default=0)),
+                ('remaining_amount', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_ledgers, migrations.RunPython.noop),
+    ]
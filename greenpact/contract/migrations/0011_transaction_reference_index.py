@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0010_contractledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='reference_number',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0011_transaction_reference_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='duplicates', to='contract.transaction'),
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='reference_key',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
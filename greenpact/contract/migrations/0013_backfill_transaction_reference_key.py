@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:01
+
+from django.db import migrations
+from django.db.models import F, Func, Q, Value, Window
+from django.db.models.functions import FirstValue, Upper
+
+
+def backfill_reference_keys(apps, schema_editor):
+    Transaction = apps.get_model('contract', 'Transaction')
+
+    Transaction.objects.update(reference_key=Upper(Func(
+        F('reference_number'), Value('[^0-9A-Za-z]+'), Value(''), Value('g'), function='REGEXP_REPLACE',
+    )))
+    # keep the earliest payment per (contract, reference) and flag the rest
+    duplicates = (
+        Transaction.objects.exclude(reference_key='')
+        .annotate(original_id=Window(
+            FirstValue('id'), partition_by=[F('contract_id'), F('reference_key')], order_by=F('id').asc(),
+        ))
+        .filter(~Q(id=F('original_id')))
+        .values_list('id', 'original_id')
+    )
+    Transaction.objects.bulk_update(
+        [Transaction(id=duplicate_id, duplicate_of_id=original_id) for duplicate_id, original_id in duplicates],
+        ['duplicate_of'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0012_transaction_reference_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_reference_keys, migrations.RunPython.noop),
+    ]
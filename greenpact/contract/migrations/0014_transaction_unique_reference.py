@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separate from the backfill so Postgres builds the index outside its
+    # transaction, which still has deferred foreign-key checks pending.
+
+    dependencies = [
+        ('contract', '0013_backfill_transaction_reference_key'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('duplicate_of__isnull', True), models.Q(('reference_key', ''), _negated=True)), fields=('contract', 'reference_key'), name='unique_contract_payment_reference'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0014_transaction_unique_reference'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Installment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveSmallIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('overdue', 'Overdue')], default='pending', max_length=10)),
+                ('outstanding', models.BigIntegerField(default=0)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='contract.contract')),
+            ],
+            options={
+                'ordering': ['contract', 'sequence'],
+                'indexes': [models.Index(fields=['status', 'due_date'], name='contract_in_status_75a18c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('contract', 'sequence'), name='unique_installment_sequence')],
+            },
+        ),
+    ]
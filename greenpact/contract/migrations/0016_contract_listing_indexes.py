@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0015_installment'),
+        ('crops', '0003_alter_crops_crop_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['farmer', 'created_at', 'contract_id'], name='contract_farmer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['buyer', 'created_at', 'contract_id'], name='contract_buyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['created_at', 'contract_id'], name='contract_created_idx'),
+        ),
+    ]
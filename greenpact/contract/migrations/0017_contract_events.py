@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:20
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+HISTORY_FIELDS = (
+    'farmer_id', 'buyer_id', 'crop_id', 'nego_price', 'quantity',
+    'delivery_address', 'delivery_date', 'terms', 'status',
+)
+
+
+def backfill_created_events(apps, schema_editor):
+    # earlier edits were never recorded: each contract starts its log with
+    # its current state, payments so far included
+    Contract = apps.get_model('contract', 'Contract')
+    ContractEvent = apps.get_model('contract', 'ContractEvent')
+    ContractLedger = apps.get_model('contract', 'ContractLedger')
+
+    paid = dict(ContractLedger.objects.values_list('contract_id', 'total_paid'))
+    events = []
+    for row in Contract.objects.values('contract_id', *HISTORY_FIELDS).iterator():
+        fields = {field.removesuffix('_id'): row[field] for field in HISTORY_FIELDS}
+        fields['total_paid'] = paid.get(row['contract_id']) or 0
+        events.append(ContractEvent(contract_id=row['contract_id'], seq=1, kind='created', data={'fields': fields}))
+    ContractEvent.objects.bulk_create(events, batch_size=1000)
+    ContractEvent.objects.update(created_at=Subquery(
+        Contract.objects.filter(contract_id=OuterRef('contract_id')).values('created_at')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0016_contract_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContractEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('kind', models.CharField(choices=[('created', 'Created'), ('price_changed', 'Price changed'), ('terms_changed', 'Terms changed'), ('details_changed', 'Details changed'), ('approved', 'Approved'), ('paid', 'Paid'), ('payment_changed', 'Payment changed')], max_length=20)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='contract.contract')),
+            ],
+            options={
+                'ordering': ['contract', 'seq'],
+                'constraints': [models.UniqueConstraint(fields=('contract', 'seq'), name='unique_contract_event_seq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ContractSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField()),
+                ('state', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('contract', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='contract.contract')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('contract', 'seq'), name='unique_contract_snapshot_seq')],
+            },
+        ),
+        migrations.RunPython(backfill_created_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+import uploads.blobs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0018_facematchjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='farmerprogress',
+            name='image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='receipt',
+            field=uploads.blobs.DedupFileField(upload_to='receipts'),
+        ),
+    ]
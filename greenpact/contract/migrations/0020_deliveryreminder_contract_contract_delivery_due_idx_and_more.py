@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0019_alter_farmerprogress_image_alter_transaction_receipt'),
+        ('crops', '0003_alter_crops_crop_image'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('upcoming', 'Upcoming'), ('due', 'Due today'), ('overdue', 'Overdue')], max_length=10)),
+                ('delivery_date', models.DateField()),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(condition=models.Q(('status', True)), fields=['delivery_date', 'contract_id'], name='contract_delivery_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='deliveryreminder',
+            name='contract',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_reminders', to='contract.contract'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliveryreminder',
+            constraint=models.UniqueConstraint(fields=('contract', 'kind', 'delivery_date'), name='unique_delivery_reminder'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0020_deliveryreminder_contract_contract_delivery_due_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='reserved_quantity',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0021_contract_reserved_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contractpdfjob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0022_contractpdfjob_run_after'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contract',
+            name='verification_token',
+            field=models.CharField(editable=False, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import secrets
+from django.db import migrations
+
+
+def copy_tokens(apps, schema_editor):
+    """Keep the token already printed on each agreement; draw one where none exists."""
+    Contract = apps.get_model('contract', 'Contract')
+    ContractVerification = apps.get_model('contract', 'ContractVerification')
+    printed = dict(ContractVerification.objects.values_list('contract_id', 'token'))
+    batch = []
+    for contract in Contract.objects.filter(verification_token__isnull=True).only('contract_id').iterator(chunk_size=2000):
+        contract.verification_token = printed.get(contract.contract_id) or secrets.token_hex(10)
+        batch.append(contract)
+        if len(batch) >= 2000:
+            Contract.objects.bulk_update(batch, ['verification_token'])
+            batch = []
+    Contract.objects.bulk_update(batch, ['verification_token'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0023_contract_verification_token'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_tokens, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+import contract.verification
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contract', '0024_backfill_contract_verification_token'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contract',
+            name='verification_token',
+            field=models.CharField(default=contract.verification.new_verification_token, editable=False, max_length=32, unique=True),
+        ),
+    ]
@@ -1,11 +1,19 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Case, F, Max, Sum, Value, When
 from user.models import CustomUser
 import uuid
+from collections import defaultdict, namedtuple
 from crops.models import Crops
 from django.contrib.postgres.fields import ArrayField
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from cloudinary.models import CloudinaryField
+from uploads.blobs import DedupCloudinaryField, DedupFileField
+from cloudinary.utils import cloudinary_url
+from utils.pdf_cache import invalidate_contract_pdfs
+from utils.references import normalize_reference
+from .reservations import put_back
+from .verification import build_summary, new_verification_token, sign_summary
 
 class Contract(models.Model):
     contract_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -19,51 +27,632 @@ class Contract(models.Model):
     delivery_date = models.DateField()
     terms = ArrayField(models.TextField(), blank=True, default=list)
     status = models.BooleanField(default=False)
+    # quantity taken off the crop listing, given back when the contract is deleted
+    reserved_quantity = models.IntegerField(default=0)
+    # printed in the agreement's QR code; drawn once and never recomputed
+    verification_token = models.CharField(
+        max_length=32, unique=True, default=new_verification_token, editable=False
+    )
     # pdf_document = models.FileField(upload_to="contracts_pdfs/", null=True, blank=True)
-    def __str__(self):
-        return f"Contract {self.farmer} & {self.buyer}"
 
-    def _notify_counts(self, farmer_delta=0, buyer_delta=0):
-        channel_layer = get_channel_layer()
-        if not channel_layer:
-            return
+    class Meta:
+        # keyset pages of a user's contracts; contract_id breaks created_at ties
+        indexes = [
+            models.Index(fields=["farmer", "created_at", "contract_id"], name="contract_farmer_created_idx"),
+            models.Index(fields=["buyer", "created_at", "contract_id"], name="contract_buyer_created_idx"),
+            models.Index(fields=["created_at", "contract_id"], name="contract_created_idx"),
+            # range scan of send_delivery_reminders; only approved contracts are delivered
+            models.Index(
+                fields=["delivery_date", "contract_id"], name="contract_delivery_due_idx",
+                condition=models.Q(status=True),
+            ),
+        ]
 
-        farmer_contracts_count = (
-            Contract.objects.filter(farmer=self.farmer).count() + farmer_delta
-        )
-        buyer_contracts_count = (
-            Contract.objects.filter(buyer=self.buyer).count() + buyer_delta
-        )
+    # Fields printed on the agreement PDF; editing any of them invalidates the cached render.
+    PDF_FIELDS = (
+        "farmer_id", "buyer_id", "crop_id", "nego_price", "quantity",
+        "delivery_address", "delivery_date", "terms",
+    )
+    # Fields copied into the public verification summary.
+    SUMMARY_FIELDS = (
+        "farmer_id", "buyer_id", "crop_id", "nego_price", "quantity", "delivery_date", "status",
+    )
 
-        async_to_sync(channel_layer.group_send)(
-            f"contract_{self.farmer.username}",
-            {"type": "contract_notification", "contract": max(0, farmer_contracts_count)},
-        )
+    # Fields tracked by the event log and rebuilt by ContractEvent.replay.
+    HISTORY_FIELDS = (
+        "farmer_id", "buyer_id", "crop_id", "nego_price", "quantity",
+        "delivery_address", "delivery_date", "terms", "status",
+    )
 
-        async_to_sync(channel_layer.group_send)(
-            f"contract_{self.buyer.username}",
-            {"type": "contract_notification", "contract": max(0, buyer_contracts_count)},
-        )
+    def __str__(self):
+        return f"Contract {self.farmer} & {self.buyer}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def _changed_fields(self, fields):
+        loaded = getattr(self, "_loaded_values", None)
+        if loaded is None:
+            return set(fields)
+        return {
+            f for f in fields
+            if f in loaded and loaded[f] != getattr(self, f)
+        }
 
     def save(self, *args, **kwargs):
         is_new = self._state.adding
-        super().save(*args, **kwargs)
-        self._notify_counts()
+        pdf_stale = not is_new and bool(self._changed_fields(self.PDF_FIELDS))
+        summary_stale = is_new or bool(self._changed_fields(self.SUMMARY_FIELDS))
+        moved = set() if is_new else self._changed_fields(("farmer_id", "buyer_id"))
+        price_stale = is_new or bool(self._changed_fields(("nego_price", "quantity")))
+        history_changed = self._changed_fields(self.HISTORY_FIELDS)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if price_stale:
+                ContractLedger.set_price(self)
+            if history_changed:
+                record_contract_events(ContractEvent.for_contract_save(self, history_changed, is_new))
+            changes = []
+            for role in ("farmer", "buyer"):
+                user = getattr(self, role)
+                if is_new or f"{role}_id" in moved:
+                    changes.append(PartyChange(user, self.contract_id, ContractChange.Op.CREATED, 1))
+                    if not is_new:
+                        # the contract moved off the previous party's list
+                        old_user = CustomUser.objects.get(pk=self._loaded_values[f"{role}_id"])
+                        changes.append(PartyChange(old_user, self.contract_id, ContractChange.Op.DELETED, -1))
+                else:
+                    changes.append(PartyChange(user, self.contract_id, ContractChange.Op.UPDATED, 0))
+            # last: the counter rows stay locked from here until commit
+            record_contract_changes(changes)
+        if pdf_stale:
+            invalidate_contract_pdfs(self.contract_id)
+        if summary_stale:
+            ContractVerification.refresh(self)
+        self._loaded_values = {
+            f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields
+        }
 
     def delete(self, *args, **kwargs):
-        super().delete(*args, **kwargs)
-        self._notify_counts(farmer_delta=-1, buyer_delta=-1)
+        contract_id = self.contract_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            put_back(self.crop_id, self.reserved_quantity)
+            record_contract_changes([
+                PartyChange(self.farmer, contract_id, ContractChange.Op.DELETED, -1),
+                PartyChange(self.buyer, contract_id, ContractChange.Op.DELETED, -1),
+            ])
+        invalidate_contract_pdfs(contract_id)
+        return result
+
+
+class ContractCounter(models.Model):
+    """
+    Per-user contract total and the sequence number of the user's latest
+    contract change. Both move together in the single upsert issued by
+    ``record_contract_changes``.
+    """
+    user = models.OneToOneField(CustomUser, primary_key=True, related_name="contract_counter", on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+    seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.count} contracts"
+
+
+class ContractChange(models.Model):
+    """Append-only feed of contract changes per user, replayed by socket clients."""
+    class Op(models.TextChoices):
+        CREATED = "created", "Created"
+        UPDATED = "updated", "Updated"
+        DELETED = "deleted", "Deleted"
+
+    user = models.ForeignKey(CustomUser, related_name="contract_changes", on_delete=models.CASCADE)
+    seq = models.BigIntegerField()
+    contract_id = models.UUIDField()
+    op = models.CharField(max_length=10, choices=Op.choices)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "seq"], name="unique_contract_change_seq"),
+        ]
+
+    def __str__(self):
+        return f"{self.op} {self.contract_id} (#{self.seq})"
+
+    def as_event(self, payloads):
+        """``payloads`` comes from ``contract_payloads``; deleted contracts map to None."""
+        return {
+            "seq": self.seq,
+            "op": self.op,
+            "contract_id": str(self.contract_id),
+            "contract": None if self.op == self.Op.DELETED else payloads.get(self.contract_id),
+        }
+
+
+class ContractEvent(models.Model):
+    """
+    Append-only history of one contract. ``data`` holds the new values of the
+    changed fields, or the amount of a payment, so replaying the events of a
+    contract in ``seq`` order rebuilds its state at any point.
+    """
+    class Kind(models.TextChoices):
+        CREATED = "created", "Created"
+        PRICE_CHANGED = "price_changed", "Price changed"
+        TERMS_CHANGED = "terms_changed", "Terms changed"
+        DETAILS_CHANGED = "details_changed", "Details changed"
+        APPROVED = "approved", "Approved"
+        PAID = "paid", "Paid"
+        PAYMENT_CHANGED = "payment_changed", "Payment changed"
+
+    contract = models.ForeignKey(Contract, related_name="events", on_delete=models.CASCADE)
+    seq = models.IntegerField()
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["contract", "seq"], name="unique_contract_event_seq"),
+        ]
+        ordering = ["contract", "seq"]
+
+    def __str__(self):
+        return f"{self.kind} {self.contract_id} (#{self.seq})"
+
+    @classmethod
+    def for_contract_save(cls, contract, changed, is_new):
+        values = {
+            field.removesuffix("_id"): getattr(contract, field) for field in Contract.HISTORY_FIELDS
+            if field in changed
+        }
+        if is_new:
+            return [cls(contract=contract, kind=cls.Kind.CREATED, data={"fields": dict(values, total_paid=0)})]
+        # one event per kind of edit, so the history reads like the negotiation
+        groups = {
+            cls.Kind.PRICE_CHANGED: ("nego_price", "quantity"),
+            cls.Kind.TERMS_CHANGED: ("terms",),
+            cls.Kind.APPROVED: ("status",),
+        }
+        events = []
+        for kind, fields in groups.items():
+            part = {field: values.pop(field) for field in fields if field in values}
+            if kind == cls.Kind.APPROVED and not part.get("status", False):
+                values.update(part)
+            elif part:
+                events.append(cls(contract=contract, kind=kind, data={"fields": part}))
+        if values:
+            events.append(cls(contract=contract, kind=cls.Kind.DETAILS_CHANGED, data={"fields": values}))
+        return events
+
+    def apply(self, state):
+        """Fold this event into ``state`` (a dict, changed in place)."""
+        state.update(self.data.get("fields", {}))
+        if self.kind in (self.Kind.PAID, self.Kind.PAYMENT_CHANGED):
+            state["total_paid"] = state.get("total_paid", 0) + self.data["amount"]
+        return state
+
+    def as_dict(self):
+        return {
+            "seq": self.seq,
+            "kind": self.kind,
+            "data": self.data,
+            "created_at": self.created_at,
+        }
+
+
+class ContractSnapshot(models.Model):
+    """Folded contract state as of event ``seq``, written every SNAPSHOT_INTERVAL events."""
+    SNAPSHOT_INTERVAL = 20
+
+    contract = models.ForeignKey(Contract, related_name="snapshots", on_delete=models.CASCADE)
+    seq = models.IntegerField()
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["contract", "seq"], name="unique_contract_snapshot_seq"),
+        ]
+
+    def __str__(self):
+        return f"Snapshot {self.contract_id} (#{self.seq})"
+
+
+def record_contract_events(events):
+    """
+    Number and insert unsaved ``ContractEvent`` rows. The contracts' ledger
+    rows are locked, as payment writers already do, so concurrent writers of
+    one contract get consecutive ``seq`` values, and a snapshot is written whenever a contract's log
+    crosses a multiple of ``SNAPSHOT_INTERVAL``. Must run inside a transaction.
+    """
+    if not events:
+        return []
+    contract_ids = {event.contract_id for event in events}
+    ContractLedger.lock(contract_ids)
+    last = dict(
+        ContractEvent.objects.filter(contract_id__in=contract_ids)
+        .values("contract_id").annotate(last=Max("seq")).values_list("contract_id", "last")
+    )
+    due = []
+    interval = ContractSnapshot.SNAPSHOT_INTERVAL
+    for event in events:
+        previous = last.get(event.contract_id, 0)
+        event.seq = last[event.contract_id] = previous + 1
+        if event.seq % interval == 0:
+            due.append(event.contract_id)
+    rows = ContractEvent.objects.bulk_create(events)
+    for contract_id in due:
+        seq = last[contract_id] - last[contract_id] % interval
+        state, _ = contract_state(contract_id, seq)
+        ContractSnapshot.objects.create(contract_id=contract_id, seq=seq, state=state)
+    return rows
+
+
+def contract_state(contract_id, seq=None, at=None):
+    """
+    ``(state, events)``: the contract's state after event ``seq`` (or the
+    last event created at or before ``at``; the latest by default), rebuilt
+    from the nearest snapshot and the events after it, which are returned.
+    At most SNAPSHOT_INTERVAL events are read.
+    """
+    events = ContractEvent.objects.filter(contract_id=contract_id)
+    if at is not None:
+        events = events.filter(created_at__lte=at)
+    if seq is not None:
+        events = events.filter(seq__lte=seq)
+    seq = events.aggregate(last=Max("seq"))["last"]
+    if seq is None:
+        return None, []
+    snapshot = (
+        ContractSnapshot.objects.filter(contract_id=contract_id, seq__lte=seq)
+        .order_by("-seq").values_list("seq", "state").first()
+    )
+    base_seq, state = snapshot or (0, {})
+    tail = list(
+        ContractEvent.objects.filter(contract_id=contract_id, seq__gt=base_seq, seq__lte=seq).order_by("seq")
+    )
+    state = dict(state, seq=base_seq)
+    for event in tail:
+        event.apply(state)
+        state["seq"] = event.seq
+    return state, tail
+
+
+PartyChange = namedtuple("PartyChange", "user contract_id op count_delta")
+
+
+def contract_payloads(contract_ids):
+    """Serialized current state of the given contracts, keyed by contract id."""
+    from .serializers import CONTRACT_RELATED, ContractSerializer
+    contracts = Contract.objects.select_related(*CONTRACT_RELATED).filter(contract_id__in=set(contract_ids))
+    return {contract.contract_id: dict(ContractSerializer(contract).data) for contract in contracts}
+
+
+def record_contract_changes(changes):
+    """
+    Append ``PartyChange`` entries to each user's change feed, assigning
+    per-user sequence numbers and adjusting contract counts. The numbers come
+    from one ``INSERT ... ON CONFLICT DO UPDATE ... RETURNING`` over the
+    counter rows in user order, so callers should make this the last write of
+    their transaction: the rows stay locked only from here to commit. Each
+    user receives one coalesced push after commit, with the contracts
+    serialized then rather than inside the transaction.
+    Must run inside a transaction.
+    """
+    if not changes:
+        return []
+    usernames = {}
+    deltas = defaultdict(lambda: [0, 0])
+    for change in changes:
+        usernames[change.user.pk] = change.user.username
+        deltas[change.user.pk][0] += 1
+        deltas[change.user.pk][1] += change.count_delta
+    user_ids = sorted(deltas)
+    table = ContractCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (user_id, seq, count) VALUES "
+            + ", ".join(["(%s, %s, %s)"] * len(user_ids))
+            + f" ON CONFLICT (user_id) DO UPDATE SET seq = {table}.seq + EXCLUDED.seq,"
+            f" count = {table}.count + EXCLUDED.count"
+            " RETURNING user_id, seq, count",
+            [value for user_id in user_ids for value in (user_id, *deltas[user_id])],
+        )
+        counters = {user_id: (seq, count) for user_id, seq, count in cursor.fetchall()}
+
+    # hand out each user's block of numbers in the order the changes came in
+    next_seq = {user_id: counters[user_id][0] - deltas[user_id][0] for user_id in user_ids}
+    rows = []
+    for change in changes:
+        next_seq[change.user.pk] += 1
+        rows.append(ContractChange(
+            user_id=change.user.pk, seq=next_seq[change.user.pk],
+            contract_id=change.contract_id, op=change.op,
+        ))
+    ContractChange.objects.bulk_create(rows)
+
+    def push():
+        payloads = contract_payloads(row.contract_id for row in rows if row.op != ContractChange.Op.DELETED)
+        messages = defaultdict(list)
+        for row in rows:
+            messages[row.user_id].append(row.as_event(payloads))
+        send_contract_pushes([
+            (usernames[user_id], {
+                "type": "contract_delta",
+                "events": events,
+                "seq": counters[user_id][0],
+                "contract": max(0, counters[user_id][1]),
+            })
+            for user_id, events in messages.items()
+        ])
+
+    transaction.on_commit(push, robust=True)
+    return rows
+
+
+def send_contract_pushes(pushes):
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    for username, event in pushes:
+        async_to_sync(channel_layer.group_send)(f"contract_{username}", event)
+
+
+def contract_detail_group(contract_id):
+    return f"contract_detail_{contract_id}"
+
+
+def push_contract_detail(contract_id, event, with_ledger=False):
+    """
+    Send ``event`` to subscribers of the contract's detail socket once the
+    surrounding transaction commits. ``with_ledger`` attaches the committed
+    payment totals.
+    """
+    def send():
+        channel_layer = get_channel_layer()
+        if not channel_layer:
+            return
+        if with_ledger:
+            event["ledger"] = (
+                ContractLedger.objects.filter(contract_id=contract_id)
+                .values("total_price", "total_paid", "remaining_amount")
+                .first()
+            )
+        async_to_sync(channel_layer.group_send)(contract_detail_group(contract_id), event)
+
+    transaction.on_commit(send, robust=True)
 
 class Transaction(models.Model):
     contract=models.ForeignKey(Contract,on_delete=models.CASCADE)
-    receipt=models.FileField(upload_to="receipts")
+    receipt=DedupFileField(upload_to="receipts")
     description=models.TextField(blank=True)
     date=models.DateField()
     amount=models.IntegerField(default=0)
-    reference_number=models.CharField(max_length=255)
+    reference_number=models.CharField(max_length=255,db_index=True)
+    # normalised reference_number; one live payment per reference and contract
+    reference_key=models.CharField(max_length=255,blank=True,editable=False)
+    duplicate_of=models.ForeignKey("self",related_name="duplicates",on_delete=models.PROTECT,null=True,blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "reference_key"],
+                condition=models.Q(duplicate_of__isnull=True) & ~models.Q(reference_key=""),
+                name="unique_contract_payment_reference",
+            ),
+        ]
 
     def __str__(self):
         return f'receipt of {self.contract.contract_id}'
+
+    @classmethod
+    def find_original(cls, contract_id, reference_number):
+        """The recorded payment this reference repeats, or None."""
+        key = normalize_reference(reference_number)
+        if not key:
+            return None
+        return cls.objects.filter(
+            contract_id=contract_id, reference_key=key, duplicate_of__isnull=True
+        ).first()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = None if self._state.adding else getattr(self, "_loaded_values", {})
+        self.reference_key = normalize_reference(self.reference_number)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            record_contract_events(self._payment_events(loaded))
+            if loaded is None:
+                ContractLedger.add_payment(self.contract_id, self.amount)
+            elif "contract_id" not in loaded or "amount" not in loaded:
+                # loaded with deferred fields, so the previous amount is unknown
+                ContractLedger.rebuild(self.contract_id)
+            elif loaded["contract_id"] != self.contract_id:
+                ContractLedger.add_payment(loaded["contract_id"], -loaded["amount"])
+                ContractLedger.add_payment(self.contract_id, self.amount)
+            else:
+                ContractLedger.add_payment(self.contract_id, self.amount - loaded["amount"])
+            if loaded and loaded.get("contract_id", self.contract_id) != self.contract_id:
+                self._push_detail(ContractChange.Op.DELETED, contract_id=loaded["contract_id"])
+                self._push_detail(ContractChange.Op.CREATED)
+            else:
+                self._push_detail(ContractChange.Op.CREATED if loaded is None else ContractChange.Op.UPDATED)
+        self._loaded_values = {"contract_id": self.contract_id, "amount": self.amount}
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            self._push_detail(ContractChange.Op.DELETED)
+            payment_id = self.pk
+            result = super().delete(*args, **kwargs)
+            ContractLedger.add_payment(self.contract_id, -self.amount)
+            if self.amount:
+                record_contract_events([ContractEvent(
+                    contract_id=self.contract_id, kind=ContractEvent.Kind.PAYMENT_CHANGED,
+                    data={"transaction_id": payment_id, "amount": -self.amount},
+                )])
+        return result
+
+    def _payment_events(self, loaded):
+        """Events for saving this payment, given the values it was loaded with."""
+        if loaded is None:
+            return [ContractEvent(
+                contract_id=self.contract_id, kind=ContractEvent.Kind.PAID, data=self.event_data(),
+            )]
+        if "contract_id" not in loaded or "amount" not in loaded:
+            return []
+        moved = loaded["contract_id"] != self.contract_id
+        events = []
+        if moved and loaded["amount"]:
+            events.append(ContractEvent(
+                contract_id=loaded["contract_id"], kind=ContractEvent.Kind.PAYMENT_CHANGED,
+                data={"transaction_id": self.pk, "amount": -loaded["amount"]},
+            ))
+        delta = self.amount if moved else self.amount - loaded["amount"]
+        if delta:
+            events.append(ContractEvent(
+                contract_id=self.contract_id, kind=ContractEvent.Kind.PAYMENT_CHANGED,
+                data={"transaction_id": self.pk, "amount": delta},
+            ))
+        return events
+
+    def event_data(self):
+        return {
+            "transaction_id": self.pk,
+            "amount": self.amount,
+            "reference_number": self.reference_number,
+            "date": self.date,
+        }
+
+    def detail_payload(self):
+        return {
+            "id": self.pk,
+            "amount": self.amount,
+            "date": str(self.date),
+            "reference_number": self.reference_number,
+            "description": self.description,
+            "receipt": self.receipt.url if self.receipt else None,
+            "duplicate_of": self.duplicate_of_id,
+        }
+
+    def _push_detail(self, op, contract_id=None):
+        payment = {"id": self.pk} if op == ContractChange.Op.DELETED else self.detail_payload()
+        push_contract_detail(
+            contract_id or self.contract_id,
+            {"type": "contract_payment", "op": op, "payment": payment},
+            with_ledger=True,
+        )
+
+
+class ContractLedger(models.Model):
+    """
+    Running payment totals of a contract. Transactions and price changes move
+    the totals with F() updates inside the writing transaction, so progress
+    reads are a primary-key lookup instead of a Sum() over all payments.
+    """
+    contract = models.OneToOneField(Contract, primary_key=True, related_name="ledger", on_delete=models.CASCADE)
+    total_price = models.BigIntegerField(default=0)
+    total_paid = models.BigIntegerField(default=0)
+    remaining_amount = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Ledger {self.contract_id}: {self.total_paid}/{self.total_price}"
+
+    @staticmethod
+    def progress(row):
+        """Payment progress payload from a ledger instance or ``.values()`` row."""
+        if not isinstance(row, dict):
+            row = {
+                "contract_id": row.contract_id,
+                "total_price": row.total_price,
+                "total_paid": row.total_paid,
+                "remaining_amount": row.remaining_amount,
+            }
+        return {
+            "contract_id": str(row["contract_id"]),
+            "total_price": row["total_price"],
+            "total_paid": row["total_paid"],
+            "remaining_amount": row["remaining_amount"],
+            "payment_complete": row["remaining_amount"] <= 0,
+        }
+
+    @classmethod
+    def lock(cls, contract_ids):
+        """
+        Row-lock the ledgers of the given contracts, in key order, so
+        concurrent writers of payments to the same contract run one at a time.
+        Must run inside a transaction.
+        """
+        return list(
+            cls.objects.select_for_update().filter(contract_id__in=contract_ids)
+            .order_by("contract_id").values_list("contract_id", flat=True)
+        )
+
+    @classmethod
+    def add_payment(cls, contract_id, amount):
+        if not amount:
+            return
+        updated = cls.objects.filter(contract_id=contract_id).update(
+            total_paid=F("total_paid") + amount,
+            remaining_amount=F("remaining_amount") - amount,
+        )
+        if not updated:
+            cls.rebuild(contract_id)
+
+    @classmethod
+    def add_payments(cls, totals):
+        """Apply ``{contract_id: amount}`` in one UPDATE, e.g. after a bulk insert."""
+        totals = {contract_id: amount for contract_id, amount in totals.items() if amount}
+        if not totals:
+            return
+        delta = Case(
+            *[When(contract_id=contract_id, then=Value(amount)) for contract_id, amount in totals.items()],
+            default=Value(0),
+            output_field=models.BigIntegerField(),
+        )
+        cls.objects.filter(contract_id__in=totals).update(
+            total_paid=F("total_paid") + delta,
+            remaining_amount=F("remaining_amount") - delta,
+        )
+        found = set(cls.objects.filter(contract_id__in=totals).values_list("contract_id", flat=True))
+        for contract_id in totals.keys() - found:
+            cls.rebuild(contract_id)
+
+    @classmethod
+    def set_price(cls, contract):
+        total_price = contract.nego_price * contract.quantity
+        updated = cls.objects.filter(contract_id=contract.contract_id).update(
+            total_price=total_price,
+            remaining_amount=total_price - F("total_paid"),
+        )
+        if not updated:
+            cls.rebuild(contract.contract_id)
+
+    @classmethod
+    def rebuild(cls, contract_id):
+        """Recompute a ledger row from the transactions table, creating it if missing."""
+        contract = Contract.objects.only("nego_price", "quantity").get(contract_id=contract_id)
+        total_price = contract.nego_price * contract.quantity
+        total_paid = (
+            Transaction.objects.filter(contract_id=contract_id).aggregate(total=Sum("amount"))["total"] or 0
+        )
+        return cls.objects.update_or_create(
+            contract_id=contract_id,
+            defaults={
+                "total_price": total_price,
+                "total_paid": total_paid,
+                "remaining_amount": total_price - total_paid,
+            },
+        )[0]
     
 class FarmerProgress(models.Model):
     farmer=models.ForeignKey(CustomUser,on_delete=models.CASCADE)
@@ -71,8 +660,196 @@ class FarmerProgress(models.Model):
     current_status=models.CharField(max_length=255)
     date=models.DateField()
     notes=models.TextField(blank=True)
-    image = CloudinaryField('image', folder='progess/image/', null=True, blank=True)
+    image = DedupCloudinaryField('image', folder='progess/image/', null=True, blank=True)
 
     def __str__(self):
         return f'{self.current_status} by {self.farmer.username}'
 
+    def save(self, *args, **kwargs):
+        op = ContractChange.Op.CREATED if self._state.adding else ContractChange.Op.UPDATED
+        super().save(*args, **kwargs)
+        self._push_detail(op)
+
+    def delete(self, *args, **kwargs):
+        self._push_detail(ContractChange.Op.DELETED)
+        return super().delete(*args, **kwargs)
+
+    def detail_payload(self):
+        return {
+            "id": self.pk,
+            "current_status": self.current_status,
+            "date": str(self.date),
+            "notes": self.notes,
+            "image": cloudinary_url(self.image.public_id)[0] if self.image else None,
+        }
+
+    def _push_detail(self, op):
+        if self.contract_id is None:
+            return
+        progress = {"id": self.pk} if op == ContractChange.Op.DELETED else self.detail_payload()
+        push_contract_detail(self.contract_id, {"type": "contract_progress", "op": op, "progress": progress})
+
+
+
+class ContractPdfJob(models.Model):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    contract = models.ForeignKey(Contract, related_name="pdf_jobs", on_delete=models.CASCADE)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    digest = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    # a retried job waits until then, e.g. for a signature download to recover
+    run_after = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"PDF job {self.id} ({self.status})"
+
+
+class FaceMatchJob(models.Model):
+    """
+    A queued comparison of an uploaded photo with the farmer's profile image.
+    ``matched`` means the images hash alike, not that the same person is in
+    them (see contract.face_match). The upload waits in the scratch area until the run_face_match_jobs worker
+    picks the job up and deletes it.
+    """
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, related_name="face_match_jobs", on_delete=models.CASCADE)
+    upload_path = models.CharField(max_length=500)
+    reference_image = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    matched = models.BooleanField(null=True, blank=True)
+    distance = models.IntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"Face match {self.id} ({self.status})"
+
+
+class ContractVerification(models.Model):
+    """
+    Public lookup row for a contract. The summary is denormalised so the
+    verify endpoint answers from one unique-index hit with no joins.
+    """
+    token = models.CharField(max_length=32, unique=True)
+    contract = models.OneToOneField(Contract, related_name="verification", on_delete=models.CASCADE)
+    summary = models.JSONField()
+    signature = models.CharField(max_length=64)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Verification {self.token}"
+
+    @classmethod
+    def _build(cls, contract):
+        farmer_profile = getattr(contract.farmer, "farmer_profile", None)
+        contractor_profile = getattr(contract.buyer, "contractor_profile", None)
+        summary = build_summary(
+            contract,
+            farmer_profile.name if farmer_profile else contract.farmer.username,
+            contractor_profile.name if contractor_profile else contract.buyer.username,
+            contract.crop.crop_name,
+        )
+        return cls(
+            contract=contract,
+            token=contract.verification_token,
+            summary=summary,
+            signature=sign_summary(summary),
+        )
+
+    @classmethod
+    def refresh(cls, contract):
+        """Update the summary; the token is only written when the row is created."""
+        row = cls._build(contract)
+        return cls.objects.update_or_create(
+            contract=contract,
+            defaults={"summary": row.summary, "signature": row.signature},
+            create_defaults={"token": row.token, "summary": row.summary, "signature": row.signature},
+        )[0]
+
+    @classmethod
+    def refresh_many(cls, contracts):
+        """``refresh`` for several contracts in one upsert."""
+        return cls.objects.bulk_create(
+            [cls._build(contract) for contract in contracts],
+            update_conflicts=True,
+            unique_fields=["contract"],
+            update_fields=["summary", "signature", "updated_at"],
+        )
+
+
+class Installment(models.Model):
+    """
+    One scheduled payment of a contract. ``status`` and ``outstanding`` are
+    derived from the ledger by ``refresh_overdue_installments`` so the overdue
+    feed is a plain indexed read.
+    """
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        PAID = "paid", "Paid"
+        OVERDUE = "overdue", "Overdue"
+
+    contract = models.ForeignKey(Contract, related_name="installments", on_delete=models.CASCADE)
+    sequence = models.PositiveSmallIntegerField()
+    due_date = models.DateField()
+    amount = models.BigIntegerField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    outstanding = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["contract", "sequence"]
+        constraints = [
+            models.UniqueConstraint(fields=["contract", "sequence"], name="unique_installment_sequence"),
+        ]
+        indexes = [models.Index(fields=["status", "due_date"])]
+
+    def __str__(self):
+        return f"Installment {self.sequence} of {self.contract_id} ({self.status})"
+
+
+class DeliveryReminder(models.Model):
+    """
+    A delivery reminder already sent for a contract. Keyed by the delivery
+    date it was about, so moving the date schedules fresh reminders.
+    """
+    class Kind(models.TextChoices):
+        UPCOMING = "upcoming", "Upcoming"
+        DUE = "due", "Due today"
+        OVERDUE = "overdue", "Overdue"
+
+    contract = models.ForeignKey(Contract, related_name="delivery_reminders", on_delete=models.CASCADE)
+    kind = models.CharField(max_length=10, choices=Kind.choices)
+    delivery_date = models.DateField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contract", "kind", "delivery_date"], name="unique_delivery_reminder"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} reminder for {self.contract_id}"
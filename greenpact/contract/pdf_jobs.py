@@ -0,0 +1,192 @@
+import logging
+import os
+from datetime import timedelta
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from utils.contract_pdf import (
+    SignatureUnavailable, build_contract_context, contract_pdf_digest, get_or_render_contract_pdf, open_contract_pdf,
+)
+from utils.jobs import claim_jobs, init_django_worker
+from utils.pdf_cache import cached_pdf_path
+from .models import Contract, ContractPdfJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_contract_pdf(contract):
+    """
+    Queue a render for the contract and return the job. Only a row insert
+    happens here; the PDF itself is built by the ``render_contract_pdfs`` worker.
+    """
+    job = ContractPdfJob.objects.filter(
+        contract=contract, status=ContractPdfJob.Status.PENDING
+    ).first()
+    if job is None:
+        job = ContractPdfJob.objects.create(contract=contract)
+    return job
+
+
+def enqueue_contract_pdfs(contracts):
+    """``enqueue_contract_pdf`` for several contracts with one lookup and one insert."""
+    pending = set(
+        ContractPdfJob.objects.filter(
+            contract__in=contracts, status=ContractPdfJob.Status.PENDING
+        ).values_list("contract_id", flat=True)
+    )
+    return ContractPdfJob.objects.bulk_create([
+        ContractPdfJob(contract=contract)
+        for contract in contracts
+        if contract.contract_id not in pending
+    ])
+
+
+_render_pool = None
+
+
+def get_render_pool():
+    """Process pool shared by every request in this server process."""
+    global _render_pool
+    if _render_pool is None:
+        workers = getattr(settings, "CONTRACT_PDF_WORKERS", None) or os.cpu_count() or 1
+        _render_pool = ProcessPoolExecutor(max_workers=workers, initializer=init_django_worker)
+    return _render_pool
+
+
+def render_to_cache(context, digest):
+    """Executed inside a worker process; returns the cached file path."""
+    return get_or_render_contract_pdf(context, digest)
+
+
+def notify_pdf_ready(job, contract):
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    event = {
+        "type": "contract_pdf_ready",
+        "job_id": str(job.id),
+        "contract_id": str(contract.contract_id),
+        "status": job.status,
+    }
+    for user in (contract.farmer, contract.buyer):
+        async_to_sync(channel_layer.group_send)(f"contract_{user.username}", event)
+
+
+def _finish(job, contract, status, digest="", error=""):
+    job.status = status
+    job.digest = digest
+    job.error = error
+    job.save(update_fields=["status", "digest", "error", "updated_at"])
+    try:
+        notify_pdf_ready(job, contract)
+    except Exception:
+        logger.exception("Could not send PDF notification for job %s", job.id)
+
+
+def _retry_later(job, contract, error):
+    """
+    Put a job whose render hit a passing failure back in the queue with a
+    growing delay; it fails for good after CONTRACT_PDF_MAX_ATTEMPTS tries.
+    ``job.attempts`` was read before claim_jobs counted this attempt.
+    """
+    attempts = job.attempts + 1
+    if attempts >= settings.CONTRACT_PDF_MAX_ATTEMPTS:
+        _finish(job, contract, ContractPdfJob.Status.FAILED, error=error)
+        return
+    job.status = ContractPdfJob.Status.PENDING
+    job.error = error
+    job.run_after = timezone.now() + timedelta(seconds=settings.CONTRACT_PDF_RETRY_DELAY * attempts)
+    job.save(update_fields=["status", "error", "run_after", "updated_at"])
+
+
+def run_pending_jobs(executor, batch_size=20):
+    """
+    Claim a batch of pending jobs, render the misses on ``executor`` and record
+    the outcome. Returns the number of jobs handled.
+    """
+    jobs = claim_jobs(
+        ContractPdfJob, batch_size, Q(run_after__isnull=True) | Q(run_after__lte=timezone.now())
+    )
+    if not jobs:
+        return 0
+
+    contracts = Contract.objects.select_related("farmer", "buyer", "crop").in_bulk(
+        [job.contract_id for job in jobs]
+    )
+    futures = {}
+    for job in jobs:
+        contract = contracts.get(job.contract_id)
+        if contract is None:
+            continue
+        try:
+            context = build_contract_context(contract)
+            digest = contract_pdf_digest(context)
+        except Exception as e:
+            _finish(job, contract, ContractPdfJob.Status.FAILED, error=str(e))
+            continue
+        if cached_pdf_path(contract.contract_id, digest):
+            _finish(job, contract, ContractPdfJob.Status.DONE, digest=digest)
+            continue
+        futures[executor.submit(render_to_cache, context, digest)] = (job, contract, digest)
+
+    for future in as_completed(futures):
+        job, contract, digest = futures[future]
+        try:
+            future.result()
+            _finish(job, contract, ContractPdfJob.Status.DONE, digest=digest)
+        except SignatureUnavailable as e:
+            _retry_later(job, contract, str(e))
+        except Exception as e:
+            _finish(job, contract, ContractPdfJob.Status.FAILED, error=str(e))
+    return len(jobs)
+
+
+def iter_contract_pdfs(queryset, executor, errors, window=None):
+    """
+    Yield ``(arcname, file)`` for every contract in ``queryset`` as soon as its
+    PDF is available, opened at once so a concurrent invalidation cannot pull
+    it from under the consumer. Cached renders are yielded straight away;
+    misses are rendered on ``executor`` with at most ``window`` renders in
+    flight, so memory stays flat regardless of how many contracts match.
+    Contracts that fail to render are appended to ``errors``.
+    """
+    window = window or 2 * getattr(executor, "_max_workers", 1)
+    pending = {}
+
+    def collect(futures):
+        for future in futures:
+            arcname, context, digest = pending.pop(future)
+            try:
+                future.result()
+                # re-rendered here if it was invalidated since the worker stored it
+                pdf = open_contract_pdf(context, digest)
+            except Exception as e:
+                errors.append(f"{arcname}: {e}")
+                continue
+            yield arcname, pdf
+
+    for contract in queryset.iterator(chunk_size=200):
+        arcname = f"contract_{contract.contract_id}.pdf"
+        try:
+            context = build_contract_context(contract)
+            digest = contract_pdf_digest(context)
+        except Exception as e:
+            errors.append(f"{arcname}: {e}")
+            continue
+        if cached_pdf_path(contract.contract_id, digest):
+            try:
+                pdf = open_contract_pdf(context, digest)
+            except Exception as e:
+                errors.append(f"{arcname}: {e}")
+                continue
+            yield arcname, pdf
+            continue
+        pending[executor.submit(render_to_cache, context, digest)] = (arcname, context, digest)
+        if len(pending) >= window:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from collect(done)
+
+    yield from collect(as_completed(list(pending)))
@@ -0,0 +1,142 @@
+import csv
+from collections import Counter, defaultdict, namedtuple
+from decimal import Decimal, InvalidOperation
+from django.db.models import Q
+from utils.references import normalize_reference
+from .models import Transaction
+
+REFERENCE_COLUMNS = ("reference_number", "reference", "utr", "ref_no", "transaction_reference")
+AMOUNT_COLUMNS = ("amount", "credit", "credit_amount", "deposit")
+
+MATCHED = "matched"
+AMOUNT_MISMATCH = "amount_mismatch"
+# a recorded transaction the statement has no credit for
+MISSING = "missing"
+# a bank credit nobody recorded a transaction for
+UNRECORDED = "unrecorded"
+DUPLICATE = "duplicate"
+INVALID = "invalid"
+STATUSES = (MATCHED, AMOUNT_MISMATCH, MISSING, UNRECORDED, DUPLICATE, INVALID)
+
+REPORT_FIELDS = (
+    "status", "reference", "statement_line", "statement_amount",
+    "transaction_id", "contract_id", "amount",
+)
+
+StatementLine = namedtuple("StatementLine", "line reference amount")
+
+
+def _pick_column(fieldnames, candidates):
+    columns = {name.strip().lower(): name for name in fieldnames}
+    for candidate in candidates:
+        if candidate in columns:
+            return columns[candidate]
+    return None
+
+
+def parse_statement(lines):
+    """
+    Yield a ``StatementLine`` for every credit in a bank statement CSV.
+    Rows without a positive amount are debits and are skipped; an unreadable
+    amount comes back as None.
+    """
+    reader = csv.DictReader(lines)
+    reference_column = _pick_column(reader.fieldnames or (), REFERENCE_COLUMNS)
+    amount_column = _pick_column(reader.fieldnames or (), AMOUNT_COLUMNS)
+    if reference_column is None or amount_column is None:
+        raise ValueError(
+            f"Statement needs a reference column ({', '.join(REFERENCE_COLUMNS)}) "
+            f"and an amount column ({', '.join(AMOUNT_COLUMNS)})"
+        )
+    for row in reader:
+        raw_amount = (row.get(amount_column) or "").replace(",", "").strip()
+        if not raw_amount:
+            continue
+        try:
+            amount = Decimal(raw_amount)
+        except InvalidOperation:
+            amount = None
+        if amount is not None and amount <= 0:
+            continue
+        yield StatementLine(reader.line_num, (row.get(reference_column) or "").strip(), amount)
+
+
+def _record(status, credit=None, payment=None):
+    record = dict.fromkeys(REPORT_FIELDS)
+    record["status"] = status
+    if credit is not None:
+        record["reference"] = credit.reference
+        record["statement_line"] = credit.line
+        record["statement_amount"] = None if credit.amount is None else str(credit.amount)
+    if payment is not None:
+        transaction_id, contract_id, reference, amount = payment
+        record["reference"] = reference
+        record["transaction_id"] = transaction_id
+        record["contract_id"] = str(contract_id)
+        record["amount"] = amount
+    return record
+
+
+def reconcile(statement, payments):
+    """
+    Match statement credits against recorded payments and yield one report
+    record per credit or payment.
+
+    The statement is loaded into a hash index keyed by normalised reference,
+    then ``payments`` (``(id, contract_id, reference_number, amount)`` tuples,
+    typically streamed from the database) are checked against it in a single
+    pass, so the run is linear in the size of both inputs.
+    """
+    index = defaultdict(list)
+    for credit in statement:
+        key = normalize_reference(credit.reference)
+        if credit.amount is None or not key:
+            yield _record(INVALID, credit=credit)
+            continue
+        index[key].append(credit)
+
+    seen = Counter()
+    for payment in payments:
+        key = normalize_reference(payment[2])
+        credits = index.get(key) if key else None
+        if not credits:
+            yield _record(MISSING, payment=payment)
+            continue
+        seen[key] += 1
+        if seen[key] > 1:
+            yield _record(DUPLICATE, credit=credits[0], payment=payment)
+            continue
+        match = next((credit for credit in credits if credit.amount == payment[3]), None)
+        if match is not None:
+            yield _record(MATCHED, credit=match, payment=payment)
+        else:
+            yield _record(AMOUNT_MISMATCH, credit=credits[0], payment=payment)
+
+    for key, credits in index.items():
+        if not seen[key]:
+            yield _record(UNRECORDED, credit=credits[0])
+        for credit in credits[1:]:
+            yield _record(DUPLICATE, credit=credit)
+
+
+def payments_for(user=None, date_from=None, date_to=None):
+    """Stream ``(id, contract_id, reference_number, amount)`` rows to reconcile."""
+    qs = Transaction.objects.order_by("pk")
+    if user is not None:
+        qs = qs.filter(Q(contract__farmer=user) | Q(contract__buyer=user))
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+    return qs.values_list("id", "contract_id", "reference_number", "amount").iterator(chunk_size=2000)
+
+
+def build_report(records, limit=1000):
+    """Count records by status and keep up to ``limit`` records that need attention."""
+    summary = dict.fromkeys(STATUSES, 0)
+    issues = []
+    for record in records:
+        summary[record["status"]] += 1
+        if record["status"] != MATCHED and len(issues) < limit:
+            issues.append(record)
+    return {"summary": summary, "records": issues}
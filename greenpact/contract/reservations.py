@@ -0,0 +1,63 @@
+"""
+Crop quantity reservations.
+
+A contract takes its quantity off the crop listing with a single
+conditional ``UPDATE ... SET quantity = quantity - n WHERE quantity >= n``.
+There is no read before the write, so a listing can never be oversold and
+concurrent buyers of one listing only queue on its row between that UPDATE
+and their commit.
+
+Every path locks the crop row before the parties' ContractCounter rows,
+which ``record_contract_changes`` updates at the end of the contract's
+transaction: single creates and updates take the quantity before saving the
+contract, bulk creates before numbering the change feed, and deletes put it
+back before recording the change. Keeping this one order is what stops a
+single and a bulk create on the same listing and farmer from deadlocking.
+"""
+from collections import Counter
+from django.db.models import F
+from crops.models import Crops
+
+
+class CropShortage(Exception):
+    """Raised when a listing no longer has the quantity a contract asks for."""
+
+    def __init__(self, crop_id, requested):
+        super().__init__(f"Crop {crop_id} has less than {requested} left")
+        self.crop_id = crop_id
+        self.requested = requested
+
+
+def check(crop, quantity):
+    """
+    Fail fast, without a lock, when an already loaded listing is short, so
+    a sold-out listing does not cost a whole contract write and rollback.
+    ``take`` still has the final say.
+    """
+    if crop.quantity < quantity:
+        raise CropShortage(crop.crop_id, quantity)
+
+
+def take(crop_id, quantity):
+    if quantity <= 0:
+        return
+    taken = Crops.objects.filter(crop_id=crop_id, quantity__gte=quantity).update(quantity=F("quantity") - quantity)
+    if not taken:
+        raise CropShortage(crop_id, quantity)
+
+
+def put_back(crop_id, quantity):
+    if quantity > 0:
+        Crops.objects.filter(crop_id=crop_id).update(quantity=F("quantity") + quantity)
+
+
+def take_many(contracts):
+    """
+    Reserve the total quantity of ``contracts`` per crop. Crops are updated
+    in id order so two batches touching the same listings cannot deadlock.
+    """
+    demand = Counter()
+    for contract in contracts:
+        demand[contract.crop_id] += contract.reserved_quantity
+    for crop_id in sorted(demand):
+        take(crop_id, demand[crop_id])
@@ -1,6 +1,7 @@
 from django.urls import path
-from .consumers import ContractConsumer
+from .consumers import ContractConsumer, ContractDetailConsumer
 
 websocket_urlpatterns = [
     path("ws/contract/", ContractConsumer.as_asgi()),  
+    path("ws/contract/<uuid:contract_id>/", ContractDetailConsumer.as_asgi()),
 ]
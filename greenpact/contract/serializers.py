@@ -1,10 +1,25 @@
 # contracts/serializers.py
 from rest_framework import serializers
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from . import models
+from . import models, reservations
 from user.models import FarmerProfile, CustomUser
 from crops.models import Crops
 from cloudinary.utils import cloudinary_url
+from uploads.serializers import UploadSessionField, UploadSessionMixin
+from functools import lru_cache
+
+# Relations ContractSerializer reads for every row; list querysets must
+# select_related these so a page costs the same number of queries at any size.
+CONTRACT_RELATED = ("farmer__farmer_profile", "buyer__contractor_profile", "crop")
+
+
+@lru_cache(maxsize=4096)
+def _qr_code_url(stored_value):
+    # building a Cloudinary URL signs and formats the resource every time;
+    # the stored "image/upload/v.../id.png" value fully determines it
+    return FarmerProfile._meta.get_field("qr_code_image").parse_cloudinary_resource(stored_value).url
+
 
 class ContractSerializer(serializers.ModelSerializer):
     farmer_name = serializers.SerializerMethodField()
@@ -33,15 +48,16 @@ class ContractSerializer(serializers.ModelSerializer):
     def get_qr_code(self, obj):
         request = self.context.get("request")
         try:
-            prof = FarmerProfile.objects.get(user=obj.farmer)
-            # Check if qr_code_image field has a file associated with it
-            if prof.qr_code_image and hasattr(prof.qr_code_image, 'url'):
-                if request is not None:
-                    return request.build_absolute_uri(prof.qr_code_image.url)
-                return prof.qr_code_image.url
+            image = obj.farmer.farmer_profile.qr_code_image
+        except AttributeError:
             return None
-        except (FarmerProfile.DoesNotExist, AttributeError):
+        stored = image.get_prep_value() if hasattr(image, "get_prep_value") else None
+        if not stored:
             return None
+        url = _qr_code_url(stored)
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
 
     def get_farmer_name(self, obj):
         try:
@@ -89,25 +105,157 @@ class ContractSerializer(serializers.ModelSerializer):
         except Crops.DoesNotExist:
             raise serializers.ValidationError({"crop_id": "Invalid crop ID"})
 
-        return super().create(validated_data)
+        reservations.check(validated_data["crop"], validated_data["quantity"])
+        validated_data["reserved_quantity"] = validated_data["quantity"]
+        with transaction.atomic():
+            # crop row before the change counters Contract.save locks, as on every path
+            reservations.take(validated_data["crop"].crop_id, validated_data["reserved_quantity"])
+            contract = super().create(validated_data)
+        return contract
+
+    def update(self, instance, validated_data):
+        """Move the crop reservation along with a changed quantity."""
+        if "quantity" not in validated_data:
+            return super().update(instance, validated_data)
+        with transaction.atomic():
+            reserved = (
+                models.Contract.objects.select_for_update()
+                .values_list("reserved_quantity", flat=True)
+                .get(pk=instance.pk)
+            )
+            if not reserved:
+                # created before reservations existed
+                return super().update(instance, validated_data)
+            validated_data["reserved_quantity"] = validated_data["quantity"]
+            reservations.take(instance.crop_id, validated_data["quantity"] - reserved)
+            reservations.put_back(instance.crop_id, reserved - validated_data["quantity"])
+            contract = super().update(instance, validated_data)
+        return contract
+
+
+class BulkContractItemSerializer(serializers.ModelSerializer):
+    farmer_username = serializers.CharField()
+    crop_id = serializers.UUIDField()
+    terms = serializers.ListField(child=serializers.CharField(), required=False)
 
+    class Meta:
+        model = models.Contract
+        fields = [
+            "farmer_username",
+            "crop_id",
+            "nego_price",
+            "quantity",
+            "delivery_address",
+            "delivery_date",
+            "terms",
+        ]
 
-class TransactionSerializer(serializers.ModelSerializer):
+
+class BulkContractSerializer(serializers.Serializer):
+    """
+    One buyer contracting many farmers. Top-level contract fields are
+    defaults for every entry of ``contracts``; farmers and crops of the
+    whole batch are resolved with one query each. Any invalid entry rejects
+    the batch, with errors keyed by entry index.
+    """
+    MAX_CONTRACTS = 500
+    SHARED_FIELDS = ("crop_id", "nego_price", "quantity", "delivery_address", "delivery_date", "terms")
+
+    contracts = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_CONTRACTS
+    )
+
+    def validate(self, attrs):
+        shared = {field: self.initial_data[field] for field in self.SHARED_FIELDS if field in self.initial_data}
+        errors = {}
+        items = {}
+        for index, entry in enumerate(attrs["contracts"]):
+            item = BulkContractItemSerializer(data={**shared, **entry})
+            if item.is_valid():
+                items[index] = dict(item.validated_data)
+            else:
+                errors[index] = item.errors
+
+        farmers = {
+            farmer.username: farmer
+            for farmer in CustomUser.objects.select_related("farmer_profile").filter(
+                username__in={item["farmer_username"] for item in items.values()},
+                type=CustomUser.Types.FARMER,
+            )
+        }
+        crops = Crops.objects.in_bulk({item["crop_id"] for item in items.values()})
+        seen = set()
+        for index, item in items.items():
+            farmer = farmers.get(item.pop("farmer_username"))
+            crop = crops.get(item.pop("crop_id"))
+            if farmer is None:
+                errors[index] = {"farmer_username": "Invalid farmer username"}
+            elif crop is None:
+                errors[index] = {"crop_id": "Invalid crop ID"}
+            elif (farmer.pk, crop.pk) in seen:
+                errors[index] = {"farmer_username": "Farmer listed twice for this crop"}
+            else:
+                seen.add((farmer.pk, crop.pk))
+                item.update(farmer=farmer, crop=crop)
+        if errors:
+            raise serializers.ValidationError({"contracts": errors})
+        attrs["contracts"] = [items[index] for index in sorted(items)]
+        return attrs
+
+
+class DuplicateTransaction(Exception):
+    """Raised by TransactionSerializer.create when the payment is already recorded."""
+
+    def __init__(self, original):
+        super().__init__(f"Payment already recorded as transaction {original.pk}")
+        self.original = original
+
+
+class ConflictingTransaction(DuplicateTransaction):
+    """The reference is already recorded, but with a different amount or date."""
+
+
+class TransactionSerializer(UploadSessionMixin, serializers.ModelSerializer):
     buyer = serializers.SerializerMethodField(read_only=True)
     farmer = serializers.SerializerMethodField(read_only=True)
+    receipt_upload = UploadSessionField()
+    upload_fields = {"receipt_upload": "receipt"}
 
     class Meta:
         model = models.Transaction
         fields = "__all__"
         extra_kwargs = {
             "contract": {"required": False},
+            "receipt": {"required": False},
+            "duplicate_of": {"read_only": True},
         }
 
+    def validate(self, attrs):
+        if self.instance is not None and "reference_number" in attrs:
+            original = models.Transaction.find_original(self.instance.contract_id, attrs["reference_number"])
+            if original is not None and original.pk != self.instance.pk:
+                raise serializers.ValidationError(
+                    {"reference_number": "This payment is already recorded for the contract"}
+                )
+        return attrs
+
     def create(self, validated_data):
         contract_id = self.initial_data.get("contract_id")
         contract = get_object_or_404(models.Contract, contract_id=contract_id)
         validated_data["contract"] = contract
-        return super().create(validated_data)
+        with transaction.atomic():
+            # Retries of the same payment queue up on the ledger row, and the
+            # receipt only reaches storage once the reference is known to be new.
+            models.ContractLedger.lock([contract.contract_id])
+            original = models.Transaction.find_original(
+                contract.contract_id, validated_data.get("reference_number")
+            )
+            if original is not None:
+                # only an identical payment counts as a retry of the first post
+                if (original.amount, original.date) != (validated_data.get("amount"), validated_data.get("date")):
+                    raise ConflictingTransaction(original)
+                raise DuplicateTransaction(original)
+            return super().create(validated_data)
 
     def get_buyer(self, obj):
         return obj.contract.buyer.username if obj.contract and obj.contract.buyer else None
@@ -116,8 +264,10 @@ class TransactionSerializer(serializers.ModelSerializer):
         return obj.contract.farmer.username if obj.contract and obj.contract.farmer else None
 
 
-class FarmerProgressSerializer(serializers.ModelSerializer):
+class FarmerProgressSerializer(UploadSessionMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
+    image_upload = UploadSessionField()
+    upload_fields = {"image_upload": "image"}
 
     class Meta:
         model = models.FarmerProgress
@@ -168,7 +318,37 @@ class TransactionListSerializer(serializers.ModelSerializer):
         ]
 
     def get_receipt(self, obj):
+        # bulk imported payments have no receipt file
+        if not obj.receipt:
+            return None
         request = self.context.get("request")
         if request:
             return request.build_absolute_uri(obj.receipt.url)
         return obj.receipt.url
+
+
+class InstallmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.Installment
+        fields = ["id", "sequence", "due_date", "amount", "status", "outstanding"]
+        read_only_fields = ["id", "sequence", "status", "outstanding"]
+
+    def validate_amount(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Amount must be positive")
+        return value
+
+
+class InstallmentScheduleSerializer(serializers.Serializer):
+    installments = InstallmentSerializer(many=True)
+
+    def validate_installments(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one installment is required")
+        contract = self.context["contract"]
+        total_price = contract.nego_price * contract.quantity
+        if sum(item["amount"] for item in value) > total_price:
+            raise serializers.ValidationError(
+                f"Installments add up to more than the contract total of {total_price}"
+            )
+        return value
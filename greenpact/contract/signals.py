@@ -0,0 +1,51 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from user.models import FarmerProfile, ContractorProfile
+from utils.pdf_cache import invalidate_contract_pdfs
+from .models import Contract, ContractVerification
+
+# Profile fields printed on the agreement PDF.
+PROFILE_PDF_FIELDS = ("name", "address", "phoneno", "signature")
+
+
+def _comparable(value):
+    # CloudinaryResource has no __eq__, compare by public_id instead
+    return getattr(value, "public_id", value)
+
+
+def _changed_profile_fields(sender, instance):
+    if instance.pk is None:
+        return set()
+    old = sender.objects.filter(pk=instance.pk).values(*PROFILE_PDF_FIELDS).first()
+    if old is None:
+        return set()
+    return {f for f in PROFILE_PDF_FIELDS if _comparable(old[f]) != _comparable(getattr(instance, f))}
+
+
+def _party_contracts(sender, user_id):
+    if sender is FarmerProfile:
+        return Contract.objects.filter(farmer_id=user_id)
+    return Contract.objects.filter(buyer_id=user_id)
+
+
+@receiver(pre_save, sender=FarmerProfile)
+@receiver(pre_save, sender=ContractorProfile)
+def profile_pre_save(sender, instance, **kwargs):
+    instance._contract_fields_changed = _changed_profile_fields(sender, instance)
+
+
+@receiver(post_save, sender=FarmerProfile)
+@receiver(post_save, sender=ContractorProfile)
+def profile_post_save(sender, instance, **kwargs):
+    changed = getattr(instance, "_contract_fields_changed", set())
+    if not changed:
+        return
+    contracts = _party_contracts(sender, instance.user_id).select_related(
+        "farmer__farmer_profile", "buyer__contractor_profile", "crop"
+    )
+    contracts = list(contracts)
+    for contract in contracts:
+        invalidate_contract_pdfs(contract.contract_id)
+    if "name" in changed:
+        # one upsert for all of the party's contracts
+        ContractVerification.refresh_many(contracts)
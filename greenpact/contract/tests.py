@@ -1,11 +1,44 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.core.files.uploadedfile import SimpleUploadedFile
-from contract.models import Contract, Transaction, FarmerProgress
+from contract.models import Contract, Transaction, FarmerProgress, ContractPdfJob, ContractVerification, ContractCounter, ContractChange, ContractLedger, Installment, ContractEvent, ContractSnapshot, FaceMatchJob, DeliveryReminder, contract_payloads, contract_state
+from contract.face_match import get_scratch, reference_hash, run_face_match_jobs
+from contract.installments import refresh_overdue_installments
+from contract.delivery_reminders import send_delivery_reminders
+from contract.reservations import CropShortage
+from contract.management.commands.bench_crop_reservations import reserve_conditional
+from contract.consumers import ContractConsumer, ContractDetailConsumer
+from asgiref.testing import ApplicationCommunicator
+import json
+from channels.db import database_sync_to_async
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import AccessToken
+from contract.pdf_jobs import run_pending_jobs
+from contract.management.commands.bench_contract_pdf import sample_context
+from utils.contract_pdf import SignatureUnavailable, get_contract_template, render_contract_pdf
+from utils import pdf_cache
+from utils.image_cache import ImageCache, face_cache, signature_cache
+from unittest import mock
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from utils.scratch import ScratchArea, ScratchFull
 from crops.models import Crops
 from user.models import CustomUser, FarmerProfile, ContractorProfile
-from datetime import date
+from django.test import override_settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from datetime import date, timedelta
+from django.utils import timezone
+import os
+import shutil
+import tempfile
+import csv
+import io
+import zipfile
 
 
 class ContractModelTests(TestCase):
@@ -67,3 +100,1651 @@ class ContractViewTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('data', response.data)
+
+
+def use_temp_dir(test, setting):
+    """Point ``setting`` at a fresh temporary directory for the rest of ``test``."""
+    path = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, path, ignore_errors=True)
+    override = override_settings(**{setting: path})
+    override.enable()
+    test.addCleanup(override.disable)
+    return path
+
+
+def create_parties(test):
+    """Give ``test`` the farmer, contractor and Wheat listing most contract tests start from."""
+    test.farmer_user = CustomUser.objects.create_user(
+        username="farmer", password="testpass123", type=CustomUser.Types.FARMER
+    )
+    test.contractor_user = CustomUser.objects.create_user(
+        username="contractor", password="testpass123", type=CustomUser.Types.CONTRACTOR
+    )
+    test.crop = Crops.objects.create(
+        crop_name="Wheat", publisher=test.farmer_user, crop_price=5000,
+        quantity=100, Description="Wheat", harvested_time=date.today(), location="Punjab"
+    )
+
+
+def make_contract(test, **fields):
+    """A contract between the parties from ``create_parties``; ``fields`` override the defaults."""
+    return Contract.objects.create(**{
+        "farmer": test.farmer_user, "buyer": test.contractor_user, "crop": test.crop,
+        "nego_price": 5200, "quantity": 10, "delivery_address": "Mumbai",
+        "delivery_date": date.today(), **fields,
+    })
+
+
+class ContractPdfCacheTests(APITestCase):
+    """Test cases for the cached contract PDF download"""
+
+    def setUp(self):
+        self.cache_dir = use_temp_dir(self, "CONTRACT_PDF_CACHE_DIR")
+        create_parties(self)
+        self.farmer_profile = FarmerProfile.objects.create(
+            user=self.farmer_user, name="Farmer", address="Address",
+            phoneno="1234567890", is_verfied=True
+        )
+        self.contract = make_contract(self, quantity=100)
+        self.url = f'/contracts/contract_pdf/{self.contract.contract_id}/'
+
+    def cached_files(self):
+        directory = os.path.join(self.cache_dir, str(self.contract.contract_id))
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    def test_download_is_cached_and_revalidated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+        etag = response["ETag"]
+        self.assertEqual(self.cached_files(), [f"{etag.strip(chr(34))}.pdf"])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_contract_edit_invalidates_cache(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.contract.nego_price = 5300
+        self.contract.save()
+        self.assertEqual(self.cached_files(), [])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_status_change_keeps_cache(self):
+        self.client.get(self.url)
+        self.contract.status = True
+        self.contract.save()
+        self.assertEqual(len(self.cached_files()), 1)
+
+    def test_profile_edit_invalidates_cache(self):
+        self.client.get(self.url)
+        self.farmer_profile.name = "Renamed Farmer"
+        self.farmer_profile.save()
+        self.assertEqual(self.cached_files(), [])
+
+    def test_render_removed_before_open_is_rendered_again(self):
+        real_store = pdf_cache.store_pdf
+
+        def store_then_invalidate(contract_id, digest, pdf_bytes):
+            path = real_store(contract_id, digest, pdf_bytes)
+            if not getattr(store_then_invalidate, "done", False):
+                # a concurrent save clears the cache right after this render
+                store_then_invalidate.done = True
+                pdf_cache.invalidate_contract_pdfs(contract_id)
+            return path
+
+        with mock.patch("utils.contract_pdf.store_pdf", side_effect=store_then_invalidate):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"%PDF"))
+
+    def test_storing_keeps_other_renders_until_swept(self):
+        directory = os.path.join(self.cache_dir, str(self.contract.contract_id))
+        old = pdf_cache.store_pdf(self.contract.contract_id, "old", b"%PDF old")
+        pdf_cache.store_pdf(self.contract.contract_id, "new", b"%PDF new")
+        self.assertEqual(sorted(self.cached_files()), ["new.pdf", "old.pdf"])
+
+        os.utime(old, (1, 1))
+        os.utime(os.path.join(directory, "new.pdf"), (2, 2))
+        self.assertEqual(pdf_cache.sweep_contract_pdfs(60), 1)
+        self.assertEqual(self.cached_files(), ["new.pdf"])
+        # the newest render stays however old it is
+        self.assertEqual(pdf_cache.sweep_contract_pdfs(60), 0)
+
+
+class ContractPdfJobTests(APITestCase):
+    """Test cases for the background PDF rendering queue"""
+
+    def setUp(self):
+        self.cache_dir = use_temp_dir(self, "CONTRACT_PDF_CACHE_DIR")
+        create_parties(self)
+
+    def test_create_enqueues_and_worker_renders(self):
+        self.client.force_authenticate(user=self.contractor_user)
+        response = self.client.post('/contracts/', {
+            "farmer_username": "farmer", "crop_id": str(self.crop.crop_id),
+            "nego_price": 5200, "quantity": 10, "delivery_address": "Mumbai",
+            "delivery_date": str(date.today()),
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        job = ContractPdfJob.objects.get(id=response.data["pdf_job_id"])
+        self.assertEqual(job.status, ContractPdfJob.Status.PENDING)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            self.assertEqual(run_pending_jobs(pool), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ContractPdfJob.Status.DONE)
+        self.assertTrue(os.path.exists(
+            os.path.join(self.cache_dir, str(job.contract_id), f"{job.digest}.pdf")
+        ))
+
+        response = self.client.get(f'/contracts/contract_pdf/jobs/{job.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["status"], "done")
+        self.assertIn("download_url", response.data["data"])
+
+    @override_settings(CONTRACT_PDF_MAX_ATTEMPTS=2)
+    def test_unloadable_signature_is_retried_not_cached(self):
+        contract = make_contract(self, )
+        job = ContractPdfJob.objects.create(contract=contract)
+        context = dict(sample_context(1), contract_id=str(contract.contract_id), farmer_signature="signature/f")
+        with mock.patch("contract.pdf_jobs.build_contract_context", return_value=context), \
+                mock.patch.object(signature_cache, "download", side_effect=OSError("offline")), \
+                ThreadPoolExecutor(max_workers=1) as pool:
+            self.assertEqual(run_pending_jobs(pool), 1)
+            job.refresh_from_db()
+            self.assertEqual(job.status, ContractPdfJob.Status.PENDING)
+            self.assertGreater(job.run_after, timezone.now())
+            # not due yet
+            self.assertEqual(run_pending_jobs(pool), 0)
+
+            ContractPdfJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(run_pending_jobs(pool), 1)
+        signature_cache._failures.clear()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ContractPdfJob.Status.FAILED)
+        self.assertIn("signature/f", job.error)
+        self.assertFalse(os.path.exists(os.path.join(self.cache_dir, str(contract.contract_id))))
+
+
+class ContractPdfExportTests(APITestCase):
+    """Test cases for the bulk ZIP export of contract PDFs"""
+
+    def setUp(self):
+        self.cache_dir = use_temp_dir(self, "CONTRACT_PDF_CACHE_DIR")
+        create_parties(self)
+        self.other_user = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.contracts = [
+            make_contract(self, buyer=buyer, status=approved)
+            for buyer, approved in (
+                (self.contractor_user, True),
+                (self.contractor_user, False),
+                (self.other_user, True),
+            )
+        ]
+
+    def export(self, **params):
+        response = self.client.get('/contracts/contract_pdf/export/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        return sorted(archive.namelist()), archive
+
+    def test_export_is_limited_to_own_contracts(self):
+        self.client.force_authenticate(user=self.contractor_user)
+        names, archive = self.export()
+        self.assertEqual(names, sorted(f"contract_{c.contract_id}.pdf" for c in self.contracts[:2]))
+        self.assertTrue(archive.read(names[0]).startswith(b"%PDF"))
+
+    def test_export_filters(self):
+        self.client.force_authenticate(user=self.farmer_user)
+        names, _ = self.export(status="true", buyer="other")
+        self.assertEqual(names, [f"contract_{self.contracts[2].contract_id}.pdf"])
+
+    def test_invalid_date_filter(self):
+        self.client.force_authenticate(user=self.farmer_user)
+        response = self.client.get('/contracts/contract_pdf/export/', {"date_from": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ContractPdfTemplateTests(TestCase):
+    """Test cases for the reusable PDF template"""
+
+    def test_template_is_built_once_and_reused(self):
+        self.assertIs(get_contract_template(), get_contract_template())
+
+    def test_repeated_renders_are_independent(self):
+        first = render_contract_pdf(sample_context(1))
+        render_contract_pdf(dict(sample_context(2), terms=[]))
+        self.assertTrue(first.startswith(b"%PDF"))
+        self.assertIn(b"Contract_00000000-0000-0000-0000-000000000001", render_contract_pdf(sample_context(1)))
+
+
+def png_bytes(size=(800, 300), color="black"):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, format="PNG")
+    return out.getvalue()
+
+
+class SignatureImageCacheTests(TestCase):
+    """Test cases for the signature image LRU cache"""
+
+    def setUp(self):
+        self.cache_dir = use_temp_dir(self, "IMAGE_CACHE_DIR")
+
+    def tearDown(self):
+        signature_cache._failures.clear()
+
+    def test_image_is_downloaded_once_and_downscaled(self):
+        cache = ImageCache("test", size=(360, 120))
+        with mock.patch.object(cache, "download", return_value=png_bytes()) as download:
+            first = cache.get("signature/abc")
+            second = cache.get("signature/abc")
+        self.assertEqual(download.call_count, 1)
+        self.assertEqual(first, second)
+        self.assertEqual(Image.open(io.BytesIO(first)).size, (320, 120))
+
+        # a fresh process still hits the disk copy
+        with mock.patch.object(ImageCache, "download") as download:
+            self.assertEqual(ImageCache("test", size=(360, 120)).get("signature/abc"), first)
+        download.assert_not_called()
+
+    def test_cache_levels_are_bounded(self):
+        cache = ImageCache("test", size=(50, 50), max_memory_items=2, max_disk_items=3)
+        with mock.patch.object(cache, "download", return_value=png_bytes()):
+            for i in range(5):
+                cache.get(f"signature/{i}")
+        self.assertEqual(list(cache._memory), ["signature/3", "signature/4"])
+        self.assertEqual(len(os.listdir(cache.directory)), 3)
+
+    def test_download_failure_is_remembered_briefly(self):
+        cache = ImageCache("test", size=(50, 50), failure_ttl=60)
+        with mock.patch.object(cache, "download", side_effect=OSError("offline")) as download:
+            self.assertIsNone(cache.get("signature/missing"))
+            self.assertIsNone(cache.get("signature/missing"))
+        self.assertEqual(download.call_count, 1)
+
+        cache._failures["signature/missing"] -= 61
+        with mock.patch.object(cache, "download", return_value=png_bytes()):
+            self.assertIsNotNone(cache.get("signature/missing"))
+        self.assertEqual(cache._failures, {})
+
+    def test_missing_signature_fails_the_render(self):
+        # no signature on file leaves room to sign by hand
+        self.assertTrue(render_contract_pdf(sample_context(1)).startswith(b"%PDF"))
+        with mock.patch.object(signature_cache, "download", side_effect=OSError("offline")):
+            with self.assertRaises(SignatureUnavailable):
+                render_contract_pdf(dict(sample_context(1), farmer_signature="signature/missing"))
+
+    def test_signature_is_embedded(self):
+        with mock.patch.object(signature_cache, "download", return_value=png_bytes()):
+            plain = render_contract_pdf(sample_context(1))
+            signed = render_contract_pdf(dict(sample_context(1), farmer_signature="signature/farmer"))
+        self.assertNotIn(b"/Subtype /Image", plain)
+        self.assertIn(b"/Subtype /Image", signed)
+
+
+def gradient_bytes(size=(300, 300), reverse=False, format="PNG"):
+    image = Image.linear_gradient("L").rotate(90 if reverse else -90).resize(size)
+    out = io.BytesIO()
+    image.convert("RGB").save(out, format=format)
+    return out.getvalue()
+
+
+class FaceMatchJobTests(APITestCase):
+    """Test cases for the queued profile image comparison"""
+
+    def setUp(self):
+        self.scratch_dir = use_temp_dir(self, "FACE_MATCH_SCRATCH_DIR")
+        self.addCleanup(get_scratch().remove, get_scratch().lock_path)
+        self.cache_dir = use_temp_dir(self, "IMAGE_CACHE_DIR")
+        reference_hash.cache_clear()
+        face_cache._memory.clear()
+        self.farmer_user = CustomUser.objects.create_user(
+            username="farmer", password="testpass123", type=CustomUser.Types.FARMER
+        )
+        FarmerProfile.objects.create(
+            user=self.farmer_user, name="Farmer", address="Pune", phoneno="9100000000",
+            image="image/upload/v1/farmer/image/face.png",
+        )
+        self.client.force_authenticate(user=self.farmer_user)
+
+    def upload(self, data, name="photo.jpg"):
+        return self.client.post("/contracts/facematch/", {"image": SimpleUploadedFile(name, data)}, format="multipart")
+
+    def result(self, job_id):
+        return self.client.get(f"/contracts/facematch/{job_id}/").data
+
+    def test_upload_is_queued_compared_and_removed(self):
+        same = self.upload(gradient_bytes((640, 480), format="JPEG"))
+        other = self.upload(gradient_bytes(reverse=True))
+        self.assertEqual(same.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(self.result(same.data["job_id"])["status"], "pending")
+        self.assertEqual(len(os.listdir(self.scratch_dir)), 2)
+
+        with mock.patch.object(face_cache, "download", return_value=gradient_bytes()) as download:
+            self.assertEqual(run_face_match_jobs(), 2)
+        download.assert_called_once_with("farmer/image/face")
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+
+        matched = self.result(same.data["job_id"])
+        self.assertEqual(matched["status"], "done")
+        self.assertTrue(matched["similar_image"])
+        self.assertNotIn("Verification", matched)
+        self.assertFalse(self.result(other.data["job_id"])["similar_image"])
+
+    def test_unavailable_profile_image_is_retried(self):
+        first = self.upload(gradient_bytes()).data["job_id"]
+        with mock.patch.object(face_cache, "download", side_effect=OSError("offline")):
+            run_face_match_jobs()
+        self.assertEqual(self.result(first)["error"], "Could not load profile image")
+
+        face_cache._failures.clear()
+        second = self.upload(gradient_bytes()).data["job_id"]
+        with mock.patch.object(face_cache, "download", return_value=gradient_bytes()):
+            run_face_match_jobs()
+        self.assertTrue(self.result(second)["similar_image"])
+
+    def test_expired_upload_fails(self):
+        job_id = self.upload(gradient_bytes()).data["job_id"]
+        FaceMatchJob.objects.filter(id=job_id).update(upload_path=os.path.join(self.scratch_dir, "gone.jpg"))
+        run_face_match_jobs()
+        self.assertEqual(self.result(job_id)["status"], "failed")
+
+    def test_scratch_space_is_bounded(self):
+        with override_settings(FACE_MATCH_MAX_UPLOAD_BYTES=100):
+            self.assertEqual(self.upload(gradient_bytes()).status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(os.listdir(self.scratch_dir), [])
+
+        with override_settings(FACE_MATCH_SCRATCH_MAX_BYTES=6 * 1024 * 1024, FACE_MATCH_MAX_UPLOAD_BYTES=4 * 1024 * 1024):
+            self.assertEqual(self.upload(b"x" * 3 * 1024 * 1024).status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(self.upload(b"x").status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        old = os.path.join(self.scratch_dir, os.listdir(self.scratch_dir)[0])
+        os.utime(old, (0, 0))
+        self.assertEqual(get_scratch().sweep(60), 1)
+
+    def test_concurrent_saves_share_the_budget(self):
+        # both uploads would fit the budget alone, not together
+        scratch = ScratchArea(self.scratch_dir, max_bytes=6 * 1024 * 1024, max_file_bytes=4 * 1024 * 1024)
+        both_writing = threading.Barrier(2)
+
+        def chunks():
+            yield b"x" * 1024
+            try:
+                both_writing.wait(timeout=2)
+            except threading.BrokenBarrierError:
+                pass
+            yield b"x" * 1024
+
+        def save():
+            try:
+                return scratch.save(chunks())
+            except ScratchFull:
+                return None
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            paths = list(pool.map(lambda _: save(), range(2)))
+        self.assertEqual(sum(path is not None for path in paths), 1)
+        self.assertEqual(scratch.usage(), 2048)
+
+    def test_jobs_are_private(self):
+        job_id = self.upload(gradient_bytes()).data["job_id"]
+        other = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.FARMER
+        )
+        self.client.force_authenticate(user=other)
+        response = self.client.get(f"/contracts/facematch/{job_id}/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ContractVerificationTests(APITestCase):
+    """Test cases for the public contract verification endpoint"""
+
+    def setUp(self):
+        create_parties(self)
+        self.farmer_profile = FarmerProfile.objects.create(
+            user=self.farmer_user, name="Farmer", address="Address",
+            phoneno="1234567890", is_verfied=True
+        )
+        self.contract = make_contract(self, quantity=100)
+        self.url = f'/contracts/verify/{self.contract.verification_token}/'
+
+    def test_verify_without_login(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"]["farmer_name"], "Farmer")
+        self.assertEqual(response.data["data"]["status"], "pending")
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_unknown_token(self):
+        response = self.client.get('/contracts/verify/doesnotexist/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_summary_follows_contract_and_profile(self):
+        old_signature = self.contract.verification.signature
+        self.contract.status = True
+        self.contract.save()
+        self.farmer_profile.name = "Renamed"
+        self.farmer_profile.save()
+
+        verification = ContractVerification.objects.get(contract=self.contract)
+        self.assertEqual(verification.token, self.contract.verification_token)
+        self.assertEqual(verification.summary["status"], "approved")
+        self.assertEqual(verification.summary["farmer_name"], "Renamed")
+        self.assertNotEqual(verification.signature, old_signature)
+
+    def test_profile_rename_refreshes_all_summaries_at_once(self):
+        def rename(name):
+            self.farmer_profile.name = name
+            with CaptureQueriesContext(connection) as queries:
+                self.farmer_profile.save()
+            return len(queries)
+
+        one = rename("First")
+        for _ in range(3):
+            make_contract(self)
+        self.assertEqual(rename("Second"), one)
+        self.assertEqual(
+            set(ContractVerification.objects.values_list("summary__farmer_name", flat=True)), {"Second"}
+        )
+
+    def test_token_survives_secret_key_rotation(self):
+        token = self.contract.verification_token
+        with override_settings(SECRET_KEY="rotated" * 8):
+            self.contract.status = True
+            self.contract.save()
+            ContractVerification.refresh_many([self.contract])
+            self.contract.refresh_from_db()
+            self.assertEqual(self.contract.verification_token, token)
+            self.assertEqual(ContractVerification.objects.get(contract=self.contract).token, token)
+            self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+
+class ContractCounterTests(TestCase):
+    """Test cases for the per-user contract counters and their notifications"""
+
+    def setUp(self):
+        create_parties(self)
+
+    def count(self, user):
+        return ContractCounter.objects.get(user=user).count
+
+    def test_counters_follow_create_and_delete(self):
+        first = make_contract(self)
+        make_contract(self)
+        self.assertEqual(self.count(self.farmer_user), 2)
+        self.assertEqual(self.count(self.contractor_user), 2)
+
+        first.delete()
+        self.assertEqual(self.count(self.farmer_user), 1)
+        self.assertEqual(self.count(self.contractor_user), 1)
+
+    def test_notifications_are_sent_after_commit(self):
+        channel_layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch("contract.models.get_channel_layer", return_value=channel_layer):
+            with self.captureOnCommitCallbacks() as callbacks:
+                make_contract(self)
+            channel_layer.group_send.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        pushed = {call.args[0]: call.args[1] for call in channel_layer.group_send.call_args_list}
+        self.assertEqual(set(pushed), {"contract_farmer", "contract_contractor"})
+        self.assertEqual(pushed["contract_farmer"]["type"], "contract_delta")
+        self.assertEqual(pushed["contract_farmer"]["contract"], 1)
+
+
+class ContractChangeFeedTests(TestCase):
+    """Test cases for the per-user contract change feed"""
+
+    def setUp(self):
+        create_parties(self)
+
+    def test_changes_are_sequenced_per_user(self):
+        contract = make_contract(self)
+        contract.nego_price = 5300
+        contract.save()
+        contract.delete()
+
+        changes = ContractChange.objects.filter(user=self.farmer_user).order_by("seq")
+        self.assertEqual([(c.seq, c.op) for c in changes], [(1, "created"), (2, "updated"), (3, "deleted")])
+        # payloads are filled in from the committed contract when read
+        contract = make_contract(self, nego_price=5400)
+        payloads = contract_payloads([contract.contract_id])
+        event = ContractChange.objects.get(user=self.farmer_user, seq=4).as_event(payloads)
+        self.assertEqual(event["contract"]["nego_price"], 5400)
+        self.assertIsNone(changes[2].as_event(payloads)["contract"])
+        counter = ContractCounter.objects.get(user=self.contractor_user)
+        self.assertEqual((counter.seq, counter.count), (4, 1))
+
+
+    def test_prune_keeps_the_retention_window(self):
+        make_contract(self)
+        ContractChange.objects.filter(user=self.farmer_user).update(
+            created_at=timezone.now() - timedelta(days=31)
+        )
+        call_command("prune_contract_changes", days=30, stdout=io.StringIO())
+        self.assertEqual(list(ContractChange.objects.values_list("user__username", flat=True)), ["contractor"])
+
+
+class ContractLedgerTests(APITestCase):
+    """Test cases for the denormalised payment ledger and batch progress"""
+
+    def setUp(self):
+        create_parties(self)
+        self.other_user = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.contract = self.create_contract(self.contractor_user)
+
+    def create_contract(self, buyer):
+        return make_contract(self, buyer=buyer, nego_price=100)
+
+    def pay(self, contract, amount):
+        return Transaction.objects.create(
+            contract=contract, receipt="receipts/test.pdf", date=date.today(),
+            amount=amount, reference_number=f"REF{Transaction.objects.count()}"
+        )
+
+    def ledger(self, contract):
+        ledger = ContractLedger.objects.get(contract=contract)
+        return ledger.total_price, ledger.total_paid, ledger.remaining_amount
+
+    def test_ledger_follows_transactions(self):
+        self.assertEqual(self.ledger(self.contract), (1000, 0, 1000))
+        payment = self.pay(self.contract, 300)
+        self.pay(self.contract, 200)
+        self.assertEqual(self.ledger(self.contract), (1000, 500, 500))
+
+        payment = Transaction.objects.get(pk=payment.pk)
+        payment.amount = 100
+        payment.save()
+        self.assertEqual(self.ledger(self.contract), (1000, 300, 700))
+
+        other = self.create_contract(self.other_user)
+        payment.contract = other
+        payment.save()
+        self.assertEqual(self.ledger(self.contract), (1000, 200, 800))
+        self.assertEqual(self.ledger(other), (1000, 100, 900))
+
+        payment.delete()
+        self.assertEqual(self.ledger(other), (1000, 0, 1000))
+
+    def test_price_change_keeps_payments(self):
+        self.pay(self.contract, 400)
+        self.contract.quantity = 20
+        self.contract.save()
+        self.assertEqual(self.ledger(self.contract), (2000, 400, 1600))
+
+    def test_progress_detail_rebuilds_missing_ledger(self):
+        self.pay(self.contract, 1000)
+        ContractLedger.objects.all().delete()
+        self.client.force_authenticate(user=self.farmer_user)
+        response = self.client.get(f"/contracts/progress/detail/{self.contract.contract_id}/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_paid"], 1000)
+        self.assertTrue(response.data["payment_complete"])
+
+    def test_batch_progress_is_one_query_and_scoped_to_caller(self):
+        foreign = self.create_contract(self.other_user)
+        self.pay(self.contract, 250)
+        self.client.force_authenticate(user=self.contractor_user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                "/contracts/progress/batch/",
+                {"contract_ids": f"{self.contract.contract_id},{foreign.contract_id}"},
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertEqual(response.data["data"][0]["remaining_amount"], 750)
+        self.assertEqual(response.data["missing"], [str(foreign.contract_id)])
+
+        response = self.client.post(
+            "/contracts/progress/batch/", {"contract_ids": ["not-a-uuid"]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_progress_defaults_to_all_own_contracts(self):
+        self.create_contract(self.other_user)
+        self.client.force_authenticate(user=self.farmer_user)
+        response = self.client.get("/contracts/progress/batch/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 2)
+        self.assertNotIn("missing", response.data)
+
+
+class TransactionImportTests(APITestCase):
+    """Test cases for the bulk CSV/JSONL payment import"""
+
+    def setUp(self):
+        create_parties(self)
+        self.other_user = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.contract = make_contract(self, nego_price=100)
+        self.foreign = make_contract(self, buyer=self.other_user, nego_price=100)
+        self.client.force_authenticate(user=self.contractor_user)
+
+    def upload(self, name, content):
+        return self.client.post(
+            "/contracts/transaction/import/",
+            {"file": SimpleUploadedFile(name, content.encode("utf-8"))},
+            format="multipart",
+        )
+
+    def test_csv_import_reports_row_errors(self):
+        content = "\n".join([
+            "\ufeffcontract_id,amount,date,reference_number,description",
+            f"{self.contract.contract_id},300,2025-01-05,UTR1,first",
+            f"{self.contract.contract_id},abc,2025-01-06,UTR2,",
+            f"{self.foreign.contract_id},100,2025-01-06,UTR3,",
+            f"{self.contract.contract_id},200,2025-13-01,UTR4,",
+            f'{self.contract.contract_id},150,2025-01-07,UTR5,"multi',
+            'line"',
+        ])
+        with mock.patch("contract.transaction_import.CHUNK_SIZE", 1):
+            response = self.upload("payments.csv", content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["failed"]), (2, 3))
+        self.assertEqual([e["row"] for e in report["errors"]], [3, 4, 5])
+        self.assertIn("amount", report["errors"][0]["errors"])
+        self.assertEqual(report["errors"][1]["errors"]["contract_id"], "Unknown contract")
+        self.assertIn("date", report["errors"][2]["errors"])
+
+        payments = Transaction.objects.filter(contract=self.contract).order_by("date")
+        self.assertEqual([p.reference_number for p in payments], ["UTR1", "UTR5"])
+        self.assertEqual(payments[1].description, "multi\nline")
+        ledger = ContractLedger.objects.get(contract=self.contract)
+        self.assertEqual((ledger.total_paid, ledger.remaining_amount), (450, 550))
+
+        response = self.client.get("/contracts/alltransaction/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data["data"][0]["receipt"])
+
+    def test_jsonl_import(self):
+        lines = [
+            json.dumps({"contract_id": str(self.contract.contract_id), "amount": 250,
+                        "date": "2025-02-01", "reference_number": "UTR9"}),
+            "",
+            "[1, 2]",
+            "{broken",
+        ]
+        response = self.upload("payments.jsonl", "\n".join(lines))
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["failed"]), (1, 2))
+        self.assertEqual([e["row"] for e in report["errors"]], [3, 4])
+        self.assertEqual(ContractLedger.objects.get(contract=self.contract).total_paid, 250)
+
+    def test_unreadable_lines_after_a_committed_chunk_are_row_errors(self):
+        content = b"\n".join([
+            b"contract_id,amount,date,reference_number",
+            f"{self.contract.contract_id},300,2025-01-05,UTR1".encode(),
+            f"{self.contract.contract_id},100,2025-01-06,UTR\xff".encode("latin-1"),
+            f"{self.contract.contract_id},100,2025-01-06,".encode() + b"x" * (csv.field_size_limit() + 1),
+            f"{self.contract.contract_id},200,2025-01-07,UTR4".encode(),
+        ])
+        with mock.patch("contract.transaction_import.CHUNK_SIZE", 1):
+            response = self.client.post(
+                "/contracts/transaction/import/",
+                {"file": SimpleUploadedFile("payments.csv", content)},
+                format="multipart",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["failed"]), (2, 2))
+        self.assertEqual([e["row"] for e in report["errors"]], [3, 4])
+        self.assertEqual(report["errors"][0]["errors"]["row"], "Not valid UTF-8")
+        self.assertIn("Malformed CSV", report["errors"][1]["errors"]["row"])
+
+        response = self.client.post(
+            "/contracts/transaction/import/",
+            {"file": SimpleUploadedFile("payments.jsonl", b'{"amount": 1}\n\xff\n')},
+            format="multipart",
+        )
+        self.assertEqual([e["row"] for e in response.data["data"]["errors"]], [1, 2])
+
+    def test_rejects_bad_uploads(self):
+        self.assertEqual(self.upload("payments.txt", "x").status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload("payments.csv", "contract_id,amount\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("reference_number", response.data["error"])
+
+        self.client.force_authenticate(user=self.farmer_user)
+        self.assertEqual(self.upload("payments.csv", "x").status_code, status.HTTP_403_FORBIDDEN)
+
+
+class StreamingExportTests(APITestCase):
+    """Test cases for the CSV/JSONL exports of transactions and contracts"""
+
+    def setUp(self):
+        create_parties(self)
+        FarmerProfile.objects.create(
+            user=self.farmer_user, name="Farmer Name", address="Address",
+            phoneno="1234567890", is_verfied=True
+        )
+        self.contracts = [make_contract(self, nego_price=100, terms=["Net 30", "FOB"]) for _ in range(3)]
+        for i, contract in enumerate(self.contracts):
+            Transaction.objects.create(
+                contract=contract, receipt=f"receipts/{i}.pdf" if i else "", date=date.today(),
+                amount=100 * (i + 1), reference_number=f"UTR{i}"
+            )
+        self.staff_user = CustomUser.objects.create_user(
+            username="staff", password="testpass123", type=CustomUser.Types.CONTRACTOR, is_staff=True
+        )
+        self.client.force_authenticate(user=self.staff_user)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_transactions_csv(self):
+        response = self.client.get("/contracts/alltransaction/", {"export": "csv"})
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn('filename="transactions.csv"', response["Content-Disposition"])
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([r["reference_number"] for r in rows], ["UTR0", "UTR1", "UTR2"])
+        self.assertEqual(rows[0]["receipt"], "")
+        self.assertTrue(rows[1]["receipt"].endswith("receipts/1.pdf"))
+        self.assertEqual(rows[2]["buyer_name"], "contractor")
+
+    def test_contracts_jsonl(self):
+        response = self.client.get("/contracts/allcontracts/", {"export": "jsonl"})
+        rows = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["farmer_name"], "Farmer Name")
+        self.assertEqual(rows[0]["buyer_name"], "contractor")
+        self.assertEqual(rows[0]["terms"], ["Net 30", "FOB"])
+
+        rows = list(csv.DictReader(io.StringIO(self.read(
+            self.client.get("/contracts/allcontracts/", {"export": "csv"})
+        ))))
+        self.assertEqual(rows[0]["terms"], "Net 30; FOB")
+
+    def test_unknown_export(self):
+        response = self.client.get("/contracts/allcontracts/", {"export": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_exports_are_staff_only(self):
+        self.client.force_authenticate(user=self.contractor_user)
+        for url in ("/contracts/alltransaction/", "/contracts/allcontracts/"):
+            for export in ("csv", "jsonl"):
+                response = self.client.get(url, {"export": export})
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReconciliationTests(APITestCase):
+    """Test cases for reconciling transactions against bank statements"""
+
+    def setUp(self):
+        create_parties(self)
+        self.contract = make_contract(self, nego_price=100, quantity=100)
+        for reference, amount in (("UTR-001", 500), ("utr 002", 700), ("UTR003", 900)):
+            original = Transaction.objects.create(
+                contract=self.contract, receipt="", date=date.today(),
+                amount=amount, reference_number=reference
+            )
+        Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(),
+            amount=900, reference_number="UTR003", duplicate_of=original
+        )
+        self.statement = "\n".join([
+            "Date,Narration,Ref_No,Debit,Credit",
+            "05/01/2025,NEFT,UTR001,,500.00",
+            '06/01/2025,NEFT,UTR002,,"750.00"',
+            "07/01/2025,NEFT,UTR003,,900",
+            "08/01/2025,NEFT,UTR004,,1000",
+            "08/01/2025,NEFT,UTR004,,1000",
+            "09/01/2025,ATM,ATM99,200,",
+            "10/01/2025,NEFT,UTR005,,abc",
+        ])
+
+    def test_reconcile_endpoint(self):
+        self.client.force_authenticate(user=self.contractor_user)
+        response = self.client.post(
+            "/contracts/transaction/reconcile/",
+            {"file": SimpleUploadedFile("statement.csv", self.statement.encode("utf-8"))},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.data["data"]
+        self.assertEqual(report["summary"], {
+            "matched": 2, "amount_mismatch": 1, "missing": 0,
+            "unrecorded": 1, "duplicate": 2, "invalid": 1,
+        })
+        mismatch = next(r for r in report["records"] if r["status"] == "amount_mismatch")
+        self.assertEqual((mismatch["amount"], mismatch["statement_amount"]), (700, "750.00"))
+        self.assertNotIn("matched", {r["status"] for r in report["records"]})
+
+        self.client.force_authenticate(user=CustomUser.objects.create_user(
+            username="stranger", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        ))
+        response = self.client.post(
+            "/contracts/transaction/reconcile/",
+            {"file": SimpleUploadedFile("statement.csv", b"Date,Narration\n")},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reconcile_command_writes_report(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            statement = os.path.join(tmp, "statement.csv")
+            output = os.path.join(tmp, "report.csv")
+            with open(statement, "w") as f:
+                f.write(self.statement)
+            call_command(
+                "reconcile_transactions", statement, output=output,
+                user="farmer", skip_matched=True, stderr=io.StringIO(),
+            )
+            with open(output) as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(
+            sorted(r["status"] for r in rows),
+            ["amount_mismatch", "duplicate", "duplicate", "invalid", "unrecorded"],
+        )
+
+
+class DuplicatePaymentTests(APITestCase):
+    """Test cases for duplicate payment detection by normalised reference"""
+
+    def setUp(self):
+        use_temp_dir(self, "MEDIA_ROOT")
+        create_parties(self)
+        self.contract = make_contract(self, nego_price=100, quantity=100)
+        self.client.force_authenticate(user=self.contractor_user)
+
+    def post_payment(self, reference, amount=500, paid_on="2025-01-05"):
+        return self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id),
+            "receipt": SimpleUploadedFile("receipt.pdf", b"%PDF-1.4 receipt"),
+            "date": paid_on,
+            "amount": amount,
+            "reference_number": reference,
+        }, format="multipart")
+
+    def test_retried_post_is_answered_without_storing_receipt(self):
+        storage = Transaction._meta.get_field("receipt").storage
+        with mock.patch.object(storage, "save", wraps=storage.save) as save:
+            first = self.post_payment("UTR-0001 23")
+            retry = self.post_payment("utr000123")
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(retry.status_code, status.HTTP_200_OK)
+        self.assertTrue(retry.data["duplicate"])
+        self.assertEqual(retry.data["transaction_id"], first.data["transaction_id"])
+        self.assertEqual(save.call_count, 1)
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(ContractLedger.objects.get(contract=self.contract).total_paid, 500)
+
+    def test_reused_reference_with_other_amount_or_date_conflicts(self):
+        first = self.post_payment("UTR-7")
+        other_amount = self.post_payment("utr7", amount=700)
+        other_date = self.post_payment("utr7", paid_on="2025-01-06")
+
+        for response in (other_amount, other_date):
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(response.data["transaction_id"], first.data["transaction_id"])
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(ContractLedger.objects.get(contract=self.contract).total_paid, 500)
+
+    def test_update_onto_recorded_reference_is_rejected(self):
+        Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(), amount=100, reference_number="UTR1"
+        )
+        other = Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(), amount=100, reference_number="UTR2"
+        )
+        response = self.client.put(
+            f"/contracts/transaction/{other.pk}/", {"reference_number": "utr-1"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("reference_number", response.data["Error"])
+
+    def test_import_skips_recorded_and_repeated_references(self):
+        Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(), amount=100, reference_number="UTR1"
+        )
+        cid = self.contract.contract_id
+        content = "\n".join([
+            "contract_id,amount,date,reference_number",
+            f"{cid},100,2025-01-05,utr-1",
+            f"{cid},200,2025-01-05,UTR2",
+            f"{cid},200,2025-01-05,UTR 2",
+            f"{cid},200,2025-01-05,---",
+        ])
+        response = self.client.post(
+            "/contracts/transaction/import/",
+            {"file": SimpleUploadedFile("payments.csv", content.encode("utf-8"))},
+            format="multipart",
+        )
+        report = response.data["data"]
+        self.assertEqual((report["created"], report["failed"]), (1, 3))
+        self.assertEqual(sorted(e["row"] for e in report["errors"]), [2, 4, 5])
+        self.assertEqual(ContractLedger.objects.get(contract=self.contract).total_paid, 300)
+
+    def test_scan_flags_existing_duplicates(self):
+        first = Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(), amount=100, reference_number="UTR1"
+        )
+        second = Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(), amount=100, reference_number="UTR2"
+        )
+        # a queryset update bypasses save(), leaving the reference keys stale
+        Transaction.objects.filter(pk=second.pk).update(reference_number="utr 1")
+
+        out = io.StringIO()
+        call_command("scan_duplicate_transactions", dry_run=True, stdout=out)
+        self.assertIn("Found 0", out.getvalue())
+
+        call_command("scan_duplicate_transactions", stdout=out)
+        second.refresh_from_db()
+        self.assertEqual(second.reference_key, "UTR1")
+        self.assertEqual(second.duplicate_of, first)
+
+
+class InstallmentTests(APITestCase):
+    """Test cases for installment schedules and the overdue feed"""
+
+    def setUp(self):
+        create_parties(self)
+        self.contract = make_contract(self, nego_price=100, quantity=30)
+        self.url = f"/contracts/installments/{self.contract.contract_id}/"
+
+    def set_schedule(self, items):
+        self.client.force_authenticate(user=self.contractor_user)
+        return self.client.put(self.url, {"installments": items}, format="json")
+
+    def pay(self, amount):
+        Transaction.objects.create(
+            contract=self.contract, receipt="", date=date.today(),
+            amount=amount, reference_number=f"UTR{Transaction.objects.count()}"
+        )
+
+    def statuses(self):
+        return list(Installment.objects.filter(contract=self.contract).values_list("status", "outstanding"))
+
+    def test_schedule_validation_and_permissions(self):
+        response = self.set_schedule([{"due_date": "2025-01-01", "amount": 4000}])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.client.force_authenticate(user=self.farmer_user)
+        response = self.client.put(self.url, {"installments": [{"due_date": "2025-01-01", "amount": 10}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_overdue_job_compares_cumulative_schedule_with_payments(self):
+        today = date.today()
+        past, later = today - timedelta(days=10), today + timedelta(days=10)
+        response = self.set_schedule([
+            {"due_date": str(later), "amount": 1000},
+            {"due_date": str(past - timedelta(days=5)), "amount": 1000},
+            {"due_date": str(past), "amount": 1000},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([i["sequence"] for i in response.data["data"]], [1, 2, 3])
+        self.assertEqual(self.statuses(), [("overdue", 1000), ("overdue", 1000), ("pending", 1000)])
+
+        self.pay(1500)
+        refresh_overdue_installments()
+        self.assertEqual(self.statuses(), [("paid", 0), ("overdue", 500), ("pending", 1000)])
+        self.assertEqual(refresh_overdue_installments(), 0)
+
+        self.client.force_authenticate(user=self.farmer_user)
+        response = self.client.get("/contracts/installments/overdue/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["total_outstanding"], 500)
+        self.assertEqual(response.data["data"][0]["days_overdue"], 10)
+
+        cached = self.client.get("/contracts/installments/overdue/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.pay(500)
+        refresh_overdue_installments()
+        response = self.client.get("/contracts/installments/overdue/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["data"], [])
+
+
+class ContractListingTests(APITestCase):
+    """Test cases for keyset pagination and filters of the contract listings"""
+
+    def setUp(self):
+        create_parties(self)
+        self.other_user = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.contracts = [
+            make_contract(
+                self,
+                buyer=self.other_user if i % 3 == 0 else self.contractor_user, nego_price=100,
+                delivery_date=date.today() + timedelta(days=i), status=i % 2 == 0,
+            )
+            for i in range(7)
+        ]
+        # identical timestamps must still page without gaps or repeats
+        Contract.objects.filter(pk__in=[c.pk for c in self.contracts[:4]]).update(
+            created_at=self.contracts[0].created_at
+        )
+        self.client.force_authenticate(user=self.farmer_user)
+
+    def walk(self, params):
+        ids, cursor = [], None
+        while True:
+            page = dict(params, limit=2, **({"cursor": cursor} if cursor else {}))
+            response = self.client.get("/contracts/", page)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["data"]), 2)
+            ids += [c["contract_id"] for c in response.data["data"]]
+            cursor = response.data["next_cursor"]
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_contract_once_newest_first(self):
+        ids = self.walk({})
+        expected = [
+            str(c.contract_id) for c in Contract.objects.order_by("-created_at", "-contract_id")
+        ]
+        self.assertEqual(ids, expected)
+
+    def test_filters(self):
+        self.assertEqual(len(self.walk({"counterparty": "other"})), 3)
+        self.assertEqual(len(self.walk({"status": "true"})), 4)
+        delivery_to = str(date.today() + timedelta(days=2))
+        self.assertEqual(len(self.walk({"delivery_to": delivery_to, "crop": str(self.crop.crop_id)})), 3)
+
+        response = self.client.get("/contracts/", {"counterparty": "other"})
+        self.assertEqual(len(response.data["data"]), 3)
+        self.assertNotIn("next_cursor", response.data)
+
+        response = self.client.get("/contracts/allcontracts/", {"counterparty": "contractor", "limit": 10})
+        self.assertEqual(len(response.data["data"]), 4)
+
+    def test_bad_parameters(self):
+        for params in ({"cursor": "garbage"}, {"limit": "x"}, {"status": "maybe"}, {"crop": "1"}):
+            response = self.client.get("/contracts/", params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+
+class ContractListQueryTests(APITestCase):
+    """Test cases for the query budget of the contract listings"""
+
+    # contracts page + nothing per row: the profiles and crop come joined in
+    LIST_QUERIES = 1
+
+    def setUp(self):
+        self.contractor_user = CustomUser.objects.create_user(
+            username="contractor", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        ContractorProfile.objects.create(
+            user=self.contractor_user, name="Contractor Name", address="Mumbai",
+            phoneno="9000000000", gstin="27AAAAA0000A1Z5"
+        )
+        self.crop = None
+        self.farmers = []
+
+    def add_contracts(self, count):
+        for i in range(count):
+            farmer = CustomUser.objects.create_user(
+                username=f"farmer{len(self.farmers)}", password="testpass123", type=CustomUser.Types.FARMER
+            )
+            if len(self.farmers) % 2 == 0:
+                FarmerProfile.objects.create(
+                    user=farmer, name=f"Farmer {len(self.farmers)}", address="Pune",
+                    phoneno=f"91000000{len(self.farmers):02d}",
+                    qr_code_image=f"image/upload/v1/qr_codes/qr{len(self.farmers)}.png",
+                )
+            self.farmers.append(farmer)
+            if self.crop is None:
+                self.crop = Crops.objects.create(
+                    crop_name="Wheat", publisher=farmer, crop_price=5000,
+                    quantity=100, Description="Wheat", harvested_time=date.today(), location="Punjab"
+                )
+            Contract.objects.create(
+                farmer=farmer, buyer=self.contractor_user, crop=self.crop, nego_price=100,
+                quantity=10, delivery_address="Mumbai", delivery_date=date.today(),
+            )
+
+    def assert_budget(self, url, params=None):
+        self.client.force_authenticate(user=self.contractor_user)
+        for count in (1, 5):
+            self.add_contracts(count)
+            with self.assertNumQueries(self.LIST_QUERIES):
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["data"]
+
+    def test_contract_list(self):
+        data = self.assert_budget("/contracts/")
+        self.assertEqual(len(data), 6)
+        by_name = {c["farmer_name"]: c for c in data}
+        self.assertTrue(by_name["Farmer 0"]["qr_code"].endswith("/qr_codes/qr0.png"))
+        self.assertIsNone(by_name["farmer1"]["qr_code"])
+        self.assertEqual({c["buyer_name"] for c in data}, {"Contractor Name"})
+
+    def test_contract_list_pages(self):
+        data = self.assert_budget("/contracts/", {"limit": 50})
+        self.assertEqual(len(data), 6)
+
+    def test_all_contracts(self):
+        data = self.assert_budget("/contracts/allcontracts/")
+        self.assertEqual(len(data), 6)
+
+
+class BulkContractTests(APITestCase):
+    """Test cases for creating contracts with many farmers at once"""
+
+    def setUp(self):
+        self.contractor_user = CustomUser.objects.create_user(
+            username="contractor", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.farmers = [
+            CustomUser.objects.create_user(
+                username=f"farmer{i}", password="testpass123", type=CustomUser.Types.FARMER
+            )
+            for i in range(8)
+        ]
+        self.crop = Crops.objects.create(
+            crop_name="Wheat", publisher=self.farmers[0], crop_price=5000,
+            quantity=100, Description="Wheat", harvested_time=date.today(), location="Punjab"
+        )
+        self.client.force_authenticate(user=self.contractor_user)
+
+    def payload(self, farmers, **overrides):
+        return dict({
+            "crop_id": str(self.crop.crop_id),
+            "nego_price": 5000,
+            "quantity": 10,
+            "delivery_address": "Mumbai",
+            "delivery_date": str(date.today()),
+            "contracts": [{"farmer_username": farmer.username} for farmer in farmers],
+        }, **overrides)
+
+    def test_bulk_create_with_batched_side_effects(self):
+        payload = self.payload(self.farmers[:3])
+        payload["contracts"][1]["quantity"] = 20
+        response = self.client.post("/contracts/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ids = [row["contract_id"] for row in response.data["data"]]
+        self.assertEqual(len(ids), 3)
+        self.assertTrue(all(row["pdf_job_id"] for row in response.data["data"]))
+
+        self.assertEqual(Contract.objects.get(pk=ids[1]).quantity, 20)
+        self.assertEqual(ContractLedger.objects.get(pk=ids[1]).remaining_amount, 100000)
+        self.assertEqual(ContractVerification.objects.filter(contract_id__in=ids).count(), 3)
+        self.assertEqual(ContractPdfJob.objects.filter(contract_id__in=ids).count(), 3)
+        self.assertEqual(ContractEvent.objects.filter(contract_id__in=ids, kind="created").count(), 3)
+        counter = ContractCounter.objects.get(user=self.contractor_user)
+        self.assertEqual((counter.count, counter.seq), (3, 3))
+        self.assertEqual(ContractCounter.objects.get(user=self.farmers[0]).count, 1)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        def run(farmers):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post("/contracts/bulk/", self.payload(farmers), format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        run(self.farmers[:1])  # the first request also caches the buyer's profile lookup
+        self.assertEqual(run(self.farmers[1:3]), run(self.farmers[3:8]))
+
+    def test_invalid_entries_reject_the_batch(self):
+        payload = self.payload(self.farmers[:2])
+        payload["contracts"] += [
+            {"farmer_username": "nobody"},
+            {"farmer_username": self.farmers[0].username},
+            {"farmer_username": self.farmers[3].username, "quantity": "many"},
+            {"farmer_username": self.contractor_user.username},
+        ]
+        response = self.client.post("/contracts/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data["Error"]["contracts"]), {2, 3, 4, 5})
+        self.assertEqual(Contract.objects.count(), 0)
+
+        self.client.force_authenticate(user=self.farmers[0])
+        response = self.client.post("/contracts/bulk/", self.payload(self.farmers[:1]), format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CropReservationTests(APITestCase):
+    """Test cases for reserving crop quantity when contracts are made"""
+
+    def setUp(self):
+        create_parties(self)
+        self.client.force_authenticate(user=self.contractor_user)
+
+    def left(self):
+        self.crop.refresh_from_db()
+        return self.crop.quantity
+
+    def create(self, quantity):
+        return self.client.post("/contracts/", {
+            "farmer_username": "farmer", "crop_id": str(self.crop.crop_id), "nego_price": 5000,
+            "quantity": quantity, "delivery_address": "Mumbai", "delivery_date": str(date.today()),
+        }, format="json")
+
+    def test_create_update_and_delete_move_the_reservation(self):
+        self.assertEqual(self.create(60).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.left(), 40)
+        contract = Contract.objects.get()
+        self.assertEqual(contract.reserved_quantity, 60)
+
+        response = self.create(50)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Contract.objects.count(), 1)
+        self.assertEqual(self.left(), 40)
+
+        url = f"/contracts/{contract.contract_id}/"
+        self.assertEqual(self.client.put(url, {"quantity": 70}, format="json").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.left(), 30)
+        self.assertEqual(self.client.put(url, {"quantity": 101}, format="json").status_code, status.HTTP_409_CONFLICT)
+        contract.refresh_from_db()
+        self.assertEqual((contract.quantity, contract.reserved_quantity), (70, 70))
+        self.assertEqual(self.client.put(url, {"quantity": 20}, format="json").status_code, status.HTTP_200_OK)
+        self.assertEqual(self.left(), 80)
+
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.left(), 100)
+
+    def test_crop_is_locked_before_change_counters(self):
+        # single and bulk creates must lock in the same order or they can deadlock
+        def lock_order(post):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(post().status_code, status.HTTP_200_OK)
+            sql = [q["sql"] for q in queries.captured_queries]
+            crop = next(i for i, q in enumerate(sql) if q.startswith(f'UPDATE "{Crops._meta.db_table}"'))
+            counters = next(i for i, q in enumerate(sql) if ContractCounter._meta.db_table in q and "ON CONFLICT" in q)
+            return crop < counters
+
+        self.assertTrue(lock_order(lambda: self.create(10)))
+        contract = Contract.objects.get()
+        self.assertTrue(lock_order(lambda: self.client.put(
+            f"/contracts/{contract.contract_id}/", {"quantity": 20}, format="json"
+        )))
+        self.assertTrue(lock_order(lambda: self.client.post("/contracts/bulk/", {
+            "crop_id": str(self.crop.crop_id), "nego_price": 5000, "quantity": 5,
+            "delivery_address": "Mumbai", "delivery_date": str(date.today()),
+            "contracts": [{"farmer_username": "farmer"}],
+        }, format="json")))
+
+    def test_bulk_creation_reserves_all_or_nothing(self):
+        farmers = [self.farmer_user] + [
+            CustomUser.objects.create_user(username=f"farmer{i}", type=CustomUser.Types.FARMER)
+            for i in range(2)
+        ]
+        payload = {
+            "crop_id": str(self.crop.crop_id), "nego_price": 5000, "quantity": 40,
+            "delivery_address": "Mumbai", "delivery_date": str(date.today()),
+            "contracts": [{"farmer_username": farmer.username} for farmer in farmers],
+        }
+        response = self.client.post("/contracts/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual((Contract.objects.count(), self.left()), (0, 100))
+
+        payload["quantity"] = 30
+        response = self.client.post("/contracts/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.left(), 10)
+
+
+class CropReservationContentionTests(TransactionTestCase):
+    """Concurrent buyers of one listing never oversell it"""
+
+    def test_concurrent_buyers(self):
+        farmer = CustomUser.objects.create_user(username="farmer", type=CustomUser.Types.FARMER)
+        buyers = [
+            CustomUser.objects.create_user(username=f"buyer{i}", type=CustomUser.Types.CONTRACTOR)
+            for i in range(8)
+        ]
+        crop = Crops.objects.create(
+            crop_name="Wheat", publisher=farmer, crop_price=5000,
+            quantity=25, Description="Wheat", harvested_time=date.today(), location="Punjab"
+        )
+
+        def buy(buyer):
+            accepted = 0
+            try:
+                for _ in range(5):
+                    try:
+                        reserve_conditional(crop.crop_id, {
+                            "farmer": farmer, "buyer": buyer, "nego_price": 5000, "quantity": 1,
+                            "delivery_address": "Mumbai", "delivery_date": date.today(),
+                        })
+                        accepted += 1
+                    except CropShortage:
+                        pass
+            finally:
+                connection.close()
+            return accepted
+
+        with ThreadPoolExecutor(max_workers=len(buyers)) as pool:
+            accepted = sum(pool.map(buy, buyers))
+        self.assertEqual(accepted, 25)
+        self.assertEqual(Contract.objects.count(), 25)
+        crop.refresh_from_db()
+        self.assertEqual(crop.quantity, 0)
+
+
+class ContractHistoryTests(APITestCase):
+    """Test cases for the contract event log, snapshots and history endpoint"""
+
+    def setUp(self):
+        create_parties(self)
+        self.contract = make_contract(self, nego_price=5000)
+        self.client.force_authenticate(user=self.contractor_user)
+
+    def history(self, **params):
+        return self.client.get(f"/contracts/{self.contract.contract_id}/history/", params)
+
+    def test_events_for_edits_approval_and_payments(self):
+        self.contract.nego_price = 5100
+        self.contract.terms = ["Advance on signing"]
+        self.contract.save()
+        self.contract.status = True
+        self.contract.save()
+        payment = Transaction.objects.create(
+            contract=self.contract, date=date.today(), amount=700, reference_number="UTR-1", receipt="",
+        )
+        payment.amount = 500
+        payment.save()
+
+        kinds = list(self.contract.events.values_list("kind", flat=True))
+        self.assertEqual(kinds, ["created", "price_changed", "terms_changed", "approved", "paid", "payment_changed"])
+
+        response = self.history()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data["data"]
+        self.assertEqual(data["seq"], 6)
+        self.assertEqual(data["state"]["nego_price"], 5100)
+        self.assertEqual(data["state"]["terms"], ["Advance on signing"])
+        self.assertTrue(data["state"]["status"])
+        self.assertEqual(data["state"]["total_paid"], 500)
+
+        before = self.history(seq=1).data["data"]["state"]
+        self.assertEqual(before["nego_price"], 5000)
+        self.assertFalse(before["status"])
+
+    def test_snapshots_bound_the_replay(self):
+        for price in range(5001, 5046):
+            self.contract.nego_price = price
+            self.contract.save()
+        self.assertEqual(
+            list(ContractSnapshot.objects.filter(contract=self.contract).values_list("seq", flat=True).order_by("seq")),
+            [20, 40],
+        )
+        state, events = contract_state(self.contract.contract_id)
+        self.assertEqual(state["nego_price"], 5045)
+        self.assertEqual([e.seq for e in events], [41, 42, 43, 44, 45, 46])
+        state, events = contract_state(self.contract.contract_id, seq=25)
+        self.assertEqual(state["nego_price"], 5024)
+        self.assertEqual(len(events), 5)
+
+        response = self.history(seq=40)
+        self.assertEqual(response.data["data"]["events"], [])
+        self.assertEqual(response.data["data"]["state"]["nego_price"], 5039)
+
+    def test_access_and_bad_parameters(self):
+        self.assertEqual(self.history(at="1999-01-01T00:00:00").status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.history(at="yesterday").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.history(seq="x").status_code, status.HTTP_400_BAD_REQUEST)
+        outsider = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.client.force_authenticate(user=outsider)
+        self.assertEqual(self.history().status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DeliveryReminderTests(TestCase):
+    """Test cases for the delivery reminder scan"""
+
+    def setUp(self):
+        create_parties(self)
+        self.today = date(2026, 3, 10)
+
+    def create_contract(self, days, approved=True):
+        return make_contract(
+            self,
+            nego_price=5000, delivery_date=self.today + timedelta(days=days), status=approved
+        )
+
+    def send(self, today=None, batch=500):
+        channel_layer = mock.Mock(group_send=mock.AsyncMock())
+        with mock.patch("contract.models.get_channel_layer", return_value=channel_layer):
+            with self.captureOnCommitCallbacks(execute=True):
+                sent = send_delivery_reminders(today=today or self.today, batch=batch)
+        pushes = [call.args for call in channel_layer.group_send.call_args_list]
+        return sent, pushes
+
+    def test_reminders_follow_the_delivery_date(self):
+        upcoming = self.create_contract(2)
+        due = self.create_contract(0)
+        overdue = self.create_contract(-1)
+        self.create_contract(10)       # too far ahead
+        self.create_contract(-30)      # long past the overdue window
+        self.create_contract(1, approved=False)
+
+        sent, pushes = self.send()
+        self.assertEqual(sent, 3)
+        self.assertEqual({group for group, _ in pushes}, {"contract_farmer", "contract_contractor"})
+        reminders = {r["contract_id"]: r for r in dict(pushes)["contract_farmer"]["reminders"]}
+        self.assertEqual(reminders[str(upcoming.contract_id)]["kind"], "upcoming")
+        self.assertEqual(reminders[str(due.contract_id)]["message"], "Delivery of Wheat is due today")
+        self.assertEqual(reminders[str(overdue.contract_id)]["kind"], "overdue")
+
+        # nothing is sent twice
+        self.assertEqual(self.send(), (0, []))
+
+        # the upcoming delivery becomes due, and moving a date starts over
+        overdue.delivery_date = self.today + timedelta(days=1)
+        overdue.save()
+        sent, pushes = self.send(today=self.today + timedelta(days=2))
+        self.assertEqual(sent, 3)
+        kinds = {r["contract_id"]: r["kind"] for r in dict(pushes)["contract_contractor"]["reminders"]}
+        self.assertEqual(kinds, {
+            str(upcoming.contract_id): "due",
+            str(due.contract_id): "overdue",
+            str(overdue.contract_id): "overdue",
+        })
+        self.assertEqual(DeliveryReminder.objects.filter(contract=overdue).count(), 2)
+
+    def test_scan_pages_by_delivery_date(self):
+        for days in (0, 0, 1, 2, 3):
+            self.create_contract(days)
+        with CaptureQueriesContext(connection) as queries:
+            sent, pushes = self.send(batch=2)
+        self.assertEqual(sent, 5)
+        self.assertEqual(len(pushes), 6)
+        self.assertEqual(DeliveryReminder.objects.count(), 5)
+        scans = [q["sql"] for q in queries.captured_queries if "SKIP LOCKED" in q["sql"]]
+        self.assertEqual(len(scans), 3)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ContractConsumerDeltaTests(TransactionTestCase):
+    """Test cases for snapshot, live deltas and resync over the contract socket"""
+
+    class Socket(ApplicationCommunicator):
+        # minimal WebSocket client; channels.testing needs daphne installed
+        def __init__(self, consumer=ContractConsumer, path="/ws/contract/", **scope):
+            super().__init__(consumer.as_asgi(), {"type": "websocket", "path": path, "headers": [], **scope})
+
+        async def connect(self):
+            await self.send_input({"type": "websocket.connect"})
+            return await self.receive_output()
+
+        async def send_json_to(self, payload):
+            await self.send_input({"type": "websocket.receive", "text": json.dumps(payload)})
+
+        async def receive_json_from(self):
+            return json.loads((await self.receive_output(timeout=5))["text"])
+
+        async def disconnect(self):
+            await self.send_input({"type": "websocket.disconnect", "code": 1000})
+            await self.wait()
+
+    def setUp(self):
+        create_parties(self)
+        self.contract = make_contract(self)
+        self.token = str(AccessToken.for_user(self.farmer_user))
+
+    def test_snapshot_delta_and_resync(self):
+        async def scenario():
+            communicator = self.Socket()
+            await communicator.connect()
+            await communicator.send_json_to({"token": self.token, "action": "fetch_contracts"})
+            snapshot = await communicator.receive_json_from()
+            self.assertEqual(snapshot["seq"], 1)
+            self.assertEqual(len(snapshot["data"]), 1)
+
+            def edit():
+                self.contract.nego_price = 5300
+                self.contract.save()
+            await database_sync_to_async(edit)()
+            delta = await communicator.receive_json_from()
+            self.assertEqual(delta["seq"], 2)
+            self.assertEqual(delta["delta"][0]["op"], "updated")
+            self.assertEqual(delta["delta"][0]["contract"]["nego_price"], 5300)
+
+            await communicator.send_json_to({"action": "resync", "since": 1})
+            resync = await communicator.receive_json_from()
+            self.assertEqual([e["seq"] for e in resync["delta"]], [2])
+
+            await database_sync_to_async(ContractChange.objects.filter(seq=1).delete)()
+            await communicator.send_json_to({"action": "resync", "since": 0})
+            fallback = await communicator.receive_json_from()
+            self.assertIn("data", fallback)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_bulk_approval(self):
+        second = Contract.objects.create(
+            farmer=self.farmer_user, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5100, quantity=5, delivery_address="Pune", delivery_date=date.today()
+        )
+        approved = Contract.objects.create(
+            farmer=self.farmer_user, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5000, quantity=5, delivery_address="Pune", delivery_date=date.today(), status=True
+        )
+        other_farmer = CustomUser.objects.create_user(
+            username="farmer2", password="testpass123", type=CustomUser.Types.FARMER
+        )
+        foreign = Contract.objects.create(
+            farmer=other_farmer, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5000, quantity=5, delivery_address="Pune", delivery_date=date.today()
+        )
+        ids = [str(c.contract_id) for c in (self.contract, second, approved, foreign)]
+        failing = Contract.objects.create(
+            farmer=self.farmer_user, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5000, quantity=5, delivery_address="Pune", delivery_date=date.today()
+        )
+
+        async def scenario():
+            communicator = self.Socket()
+            await communicator.connect()
+            await communicator.send_json_to({"token": self.token, "action": "approve_contracts", "contract_ids": ids})
+            messages = [await communicator.receive_json_from(), await communicator.receive_json_from()]
+            result = next(m for m in messages if "success" in m)
+            delta = next(m for m in messages if "delta" in m)
+            self.assertEqual(result["approved"], ids[:2])
+            self.assertEqual(result["already_approved"], [ids[2]])
+            self.assertEqual(result["not_found"], [ids[3]])
+            # one push for the whole batch
+            self.assertEqual(sorted(e["contract_id"] for e in delta["delta"]), sorted(ids[:2]))
+            self.assertTrue(all(e["contract"]["status"] for e in delta["delta"]))
+
+            await communicator.send_json_to({"action": "approve_contracts", "contract_ids": ["nope"]})
+            self.assertEqual(await communicator.receive_json_from(), {"error": "contract_ids must be UUIDs"})
+            await communicator.send_json_to({"action": "approve_contracts", "contract_ids": []})
+            self.assertEqual(
+                await communicator.receive_json_from(), {"error": "contract_ids must be a non-empty list"}
+            )
+            with mock.patch("contract.approvals.enqueue_contract_pdfs", side_effect=RuntimeError("boom")), \
+                    self.assertLogs("contract.consumers", "ERROR"):
+                await communicator.send_json_to({"action": "approve_contracts", "contract_ids": [str(failing.contract_id)]})
+                self.assertEqual(await communicator.receive_json_from(), {"error": "Failed to approve contract"})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+        self.assertEqual(Contract.objects.filter(status=True).count(), 3)
+        self.assertFalse(Contract.objects.get(pk=foreign.pk).status)
+        self.assertEqual(ContractPdfJob.objects.filter(contract_id__in=ids[:2]).count(), 2)
+        self.assertEqual(ContractVerification.objects.get(contract=second).summary["status"], "approved")
+        self.assertEqual(ContractChange.objects.filter(user=self.contractor_user, op="updated").count(), 2)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class ContractDetailConsumerTests(TransactionTestCase):
+    """Test cases for the per-contract payments and progress socket"""
+
+    def setUp(self):
+        create_parties(self)
+        self.other_user = CustomUser.objects.create_user(
+            username="other", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.contract = make_contract(self, nego_price=100)
+
+    def socket(self, user):
+        return ContractConsumerDeltaTests.Socket(
+            ContractDetailConsumer,
+            f"/ws/contract/{self.contract.contract_id}/",
+            url_route={"kwargs": {"contract_id": self.contract.contract_id}},
+            user=user,
+        )
+
+    def test_payments_and_progress_are_pushed_after_commit(self):
+        async def scenario():
+            communicator = self.socket(self.contractor_user)
+            await communicator.connect()
+            self.assertEqual(
+                await communicator.receive_json_from(), {"subscribed": str(self.contract.contract_id)}
+            )
+
+            def pay():
+                with transaction.atomic():
+                    payment = Transaction.objects.create(
+                        contract=self.contract, receipt="", date=date.today(),
+                        amount=400, reference_number="UTR1"
+                    )
+                    # nothing is sent before the payment is committed
+                    self.assertTrue(communicator.output_queue.empty())
+                return payment
+            payment = await database_sync_to_async(pay)()
+            event = await communicator.receive_json_from()
+            self.assertEqual(event["op"], "created")
+            self.assertEqual(event["payment"]["id"], payment.pk)
+            self.assertEqual(event["ledger"]["remaining_amount"], 600)
+
+            await database_sync_to_async(FarmerProgress.objects.create)(
+                farmer=self.farmer_user, contract=self.contract,
+                current_status="Sowing", date=date.today()
+            )
+            event = await communicator.receive_json_from()
+            self.assertEqual((event["op"], event["progress"]["current_status"]), ("created", "Sowing"))
+
+            payment_id = payment.pk
+            await database_sync_to_async(payment.delete)()
+            event = await communicator.receive_json_from()
+            self.assertEqual((event["op"], event["payment"]), ("deleted", {"id": payment_id}))
+            self.assertEqual(event["ledger"]["total_paid"], 0)
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_outsiders_cannot_subscribe(self):
+        async def scenario():
+            communicator = self.socket(AnonymousUser())
+            await communicator.connect()
+            await communicator.send_json_to({"token": str(AccessToken.for_user(self.other_user))})
+            self.assertEqual(await communicator.receive_json_from(), {"error": "Not a party to this contract"})
+            self.assertEqual((await communicator.receive_output(timeout=5))["type"], "websocket.close")
+
+        async_to_sync(scenario)()
@@ -0,0 +1,200 @@
+import csv
+import json
+import uuid
+from collections import defaultdict
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from utils.references import normalize_reference
+from .models import ContractEvent, ContractLedger, Transaction, push_contract_detail, record_contract_events
+
+REQUIRED_FIELDS = ("contract_id", "amount", "date", "reference_number")
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 500
+
+
+def upload_lines(upload):
+    """Decode an uploaded file line by line without reading it into memory."""
+    for number, line in enumerate(upload):
+        yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+
+class UnreadableRow(str):
+    """Stands in for a line that could not be decoded or parsed; the string says why."""
+
+
+def _lenient_lines(upload, progress):
+    """
+    Like ``upload_lines``, but a line that is not valid UTF-8 is recorded in
+    ``progress["unreadable"]`` and replaced by a blank line, so one bad line
+    fails alone instead of aborting an import whose earlier chunks are
+    already committed. ``progress["line"]`` is the last line handed out.
+    """
+    for number, line in enumerate(upload, start=1):
+        progress["line"] = number
+        try:
+            yield line.decode("utf-8-sig" if number == 1 else "utf-8")
+        except UnicodeDecodeError:
+            progress["unreadable"].append(number)
+            yield "\n"
+
+
+def iter_csv_rows(upload):
+    progress = {"line": 0, "unreadable": []}
+    reader = csv.DictReader(_lenient_lines(upload, progress))
+    try:
+        fieldnames = reader.fieldnames
+    except csv.Error as e:
+        raise ValueError(f"CSV header could not be read: {e}")
+    missing = set(REQUIRED_FIELDS) - set(fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV header is missing: {', '.join(sorted(missing))}")
+    while True:
+        try:
+            line, row = None, next(reader)
+        except StopIteration:
+            line, row = None, None
+        except csv.Error as e:
+            # the reader's own line_num lags behind on errors
+            line, row = progress["line"], UnreadableRow(f"Malformed CSV: {e}")
+        while progress["unreadable"]:
+            yield progress["unreadable"].pop(0), UnreadableRow("Not valid UTF-8")
+        if row is None:
+            break
+        yield line or reader.line_num, row
+
+
+def iter_jsonl_rows(upload):
+    progress = {"line": 0, "unreadable": []}
+    for number, line in enumerate(_lenient_lines(upload, progress), start=1):
+        if progress["unreadable"]:
+            yield progress["unreadable"].pop(), UnreadableRow("Not valid UTF-8")
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None
+            continue
+        yield number, row if isinstance(row, dict) else None
+
+
+def clean_row(row, allowed_contracts):
+    """Validate one imported row; returns ``(Transaction, None)`` or ``(None, errors)``."""
+    if isinstance(row, UnreadableRow):
+        return None, {"row": str(row)}
+    if row is None:
+        return None, {"row": "Not a JSON object"}
+
+    errors = {}
+    try:
+        contract_id = uuid.UUID(str(row.get("contract_id", "")).strip())
+        if contract_id not in allowed_contracts:
+            errors["contract_id"] = "Unknown contract"
+    except ValueError:
+        errors["contract_id"] = "Invalid contract ID"
+
+    try:
+        amount = int(str(row.get("amount", "")).strip())
+    except ValueError:
+        errors["amount"] = "A valid integer is required"
+
+    try:
+        paid_on = parse_date(str(row.get("date", "")).strip())
+    except ValueError:
+        paid_on = None
+    if paid_on is None:
+        errors["date"] = "Date must be YYYY-MM-DD"
+
+    reference_number = str(row.get("reference_number") or "").strip()
+    if not reference_number:
+        errors["reference_number"] = "This field is required"
+    elif len(reference_number) > 255:
+        errors["reference_number"] = "Ensure this field has no more than 255 characters"
+    elif not normalize_reference(reference_number):
+        errors["reference_number"] = "Must contain letters or digits"
+
+    if errors:
+        return None, errors
+    return Transaction(
+        contract_id=contract_id,
+        amount=amount,
+        date=paid_on,
+        reference_number=reference_number,
+        reference_key=normalize_reference(reference_number),
+        description=str(row.get("description") or ""),
+    ), None
+
+
+def _fail(report, line, errors):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"row": line, "errors": errors})
+
+
+def _flush(pending, report):
+    """Insert a chunk of ``(line, payment)`` pairs, skipping references already on record."""
+    contract_ids = {payment.contract_id for _, payment in pending}
+    with transaction.atomic():
+        ContractLedger.lock(contract_ids)
+        recorded = set(
+            Transaction.objects.filter(
+                contract_id__in=contract_ids,
+                reference_key__in={payment.reference_key for _, payment in pending},
+                duplicate_of__isnull=True,
+            ).values_list("contract_id", "reference_key")
+        )
+        fresh = []
+        for line, payment in pending:
+            if (payment.contract_id, payment.reference_key) in recorded:
+                _fail(report, line, {"reference_number": "Payment already recorded for this contract"})
+            else:
+                fresh.append(payment)
+
+        totals = defaultdict(int)
+        counts = defaultdict(int)
+        for payment in fresh:
+            totals[payment.contract_id] += payment.amount
+            counts[payment.contract_id] += 1
+        Transaction.objects.bulk_create(fresh)
+        ContractLedger.add_payments(totals)
+        record_contract_events([
+            ContractEvent(contract_id=payment.contract_id, kind=ContractEvent.Kind.PAID, data=payment.event_data())
+            for payment in fresh
+        ])
+        # one summary event per contract instead of a push per imported row
+        for contract_id, count in counts.items():
+            push_contract_detail(
+                contract_id, {"type": "contract_payments_imported", "count": count}, with_ledger=True
+            )
+    report["created"] += len(fresh)
+
+
+def import_transactions(rows, allowed_contracts, chunk_size=CHUNK_SIZE):
+    """
+    Insert valid ``(line, row)`` pairs with ``bulk_create`` in chunks and
+    collect per-row errors. ``allowed_contracts`` is the prefetched set of
+    contract IDs the importer may record payments against. Rows without
+    errors are saved even when other rows fail; payments whose reference is
+    already recorded, or repeated in the file, are reported as errors.
+    """
+    report = {"created": 0, "failed": 0, "errors": []}
+    pending = []
+    seen = set()
+    for line, row in rows:
+        payment, errors = clean_row(row, allowed_contracts)
+        if errors:
+            _fail(report, line, errors)
+            continue
+        key = (payment.contract_id, payment.reference_key)
+        if key in seen:
+            _fail(report, line, {"reference_number": "Repeated earlier in this file"})
+            continue
+        seen.add(key)
+        pending.append((line, payment))
+        if len(pending) >= chunk_size:
+            _flush(pending, report)
+            pending = []
+    if pending:
+        _flush(pending, report)
+    return report
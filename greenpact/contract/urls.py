@@ -3,15 +3,27 @@ from . import views
 urlpatterns = [
     path('',views.ContractView.as_view()),
     path('<uuid:pk>/',views.ContractView.as_view()),
+    path('bulk/',views.ContractBulkView.as_view()),
+    path('<uuid:pk>/history/',views.ContractHistoryView.as_view()),
     path('transaction/<uuid:pk>/',views.TransactionView.as_view()),
+    path('transaction/<int:pk>/',views.TransactionView.as_view()),
     path('transaction/',views.TransactionView.as_view()),
+    path('transaction/import/',views.TransactionImportView.as_view()),
+    path('transaction/reconcile/',views.TransactionReconcileView.as_view()),
     path('progress/detail/<uuid:pk>/',views.GetProgressView.as_view()),
+    path('progress/batch/',views.ProgressBatchView.as_view()),
     path('progress/<uuid:pk>/',views.FarmerProgressView.as_view()),
     path('progress/',views.FarmerProgressView.as_view()),
     path('allprogress/',views.AllFarmerProgressView.as_view()),
     path('alltransaction/',views.AllTransactionView.as_view()),
     path('facematch/',views.FaceMatchView.as_view()),
+    path('facematch/<uuid:pk>/',views.FaceMatchJobView.as_view()),
     path('transaction/user/',views.TransactionUser.as_view()),
     path('allcontracts/',views.AllContracts.as_view()),
     path('contract_pdf/<uuid:pk>/',views.ContractDocView.as_view()),
+    path('contract_pdf/jobs/<uuid:pk>/',views.ContractPdfJobView.as_view()),
+    path('contract_pdf/export/',views.ContractPdfExportView.as_view()),
+    path('verify/<str:token>/',views.ContractVerifyView.as_view()),
+    path('installments/overdue/',views.OverdueInstallmentView.as_view()),
+    path('installments/<uuid:pk>/',views.InstallmentView.as_view()),
 ]
@@ -0,0 +1,33 @@
+import json
+import secrets
+from django.utils.crypto import salted_hmac
+
+TOKEN_LENGTH = 20
+
+
+def new_verification_token():
+    """
+    Random token for a contract's QR code. It is stored, not derived from
+    SECRET_KEY, so rotating the key leaves printed agreements verifiable.
+    """
+    return secrets.token_hex(TOKEN_LENGTH // 2)
+
+
+def build_summary(contract, farmer_name, buyer_name, crop_name):
+    return {
+        "contract_id": str(contract.contract_id),
+        "farmer_name": farmer_name,
+        "buyer_name": buyer_name,
+        "crop_name": crop_name,
+        "quantity": contract.quantity,
+        "nego_price": contract.nego_price,
+        "total_amount": contract.quantity * contract.nego_price,
+        "delivery_date": str(contract.delivery_date),
+        "status": "approved" if contract.status else "pending",
+        "issued_on": str(contract.created_at.date()),
+    }
+
+
+def sign_summary(summary):
+    payload = json.dumps(summary, sort_keys=True)
+    return salted_hmac("contract.verification.summary", payload).hexdigest()
@@ -2,24 +2,96 @@ from django.shortcuts import render,get_object_or_404,get_list_or_404
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from . import models
-from django.db.models import Sum
 from . import serializers
 from django.http import Http404
 from user.models import FarmerProfile
-import tempfile
-from utils.contract_pdf import generate_contract_pdf_bytes
+from utils.contract_pdf import SignatureUnavailable, build_contract_context, contract_pdf_digest, open_contract_pdf
 from django.http import HttpResponse, FileResponse
-import io
+from django.utils.http import parse_etags
+from . import reconciliation, transaction_import
+from .bulk_contracts import create_contracts
+from .face_match import enqueue_face_match
+from .installments import replace_schedule
+from .pdf_jobs import enqueue_contract_pdf, get_render_pool, iter_contract_pdfs
+from .reservations import CropShortage
+from utils.pagination import keyset_page, parse_page_size
+from utils.scratch import ScratchFull, UploadTooLarge
+from utils.streaming import export_response, stream_zip, streaming_response
+from django.db.models import F, Q
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_date, parse_datetime
+import uuid
+import hashlib
+from django.utils import timezone
+from django.conf import settings
+
+# Rows fetched per round trip by the server-side cursor of streamed exports.
+EXPORT_CHUNK_SIZE = 2000
+
+def filter_contracts(qs, params, counterparty_fields):
+    """
+    Apply the listing filters: status, crop, delivery_from/delivery_to and
+    counterparty (a username matched against ``counterparty_fields``).
+    Raises ValueError on malformed values.
+    """
+    if params.get("status"):
+        if params["status"] not in ("true", "false"):
+            raise ValueError("status must be true or false")
+        qs = qs.filter(status=params["status"] == "true")
+    if params.get("crop"):
+        try:
+            qs = qs.filter(crop_id=uuid.UUID(params["crop"]))
+        except ValueError:
+            raise ValueError("crop must be a crop ID")
+    for param, lookup in (("delivery_from", "delivery_date__gte"), ("delivery_to", "delivery_date__lte")):
+        if params.get(param):
+            value = parse_date(params[param])
+            if value is None:
+                raise ValueError(f"{param} must be YYYY-MM-DD")
+            qs = qs.filter(**{lookup: value})
+    if params.get("counterparty"):
+        match = Q()
+        for field in counterparty_fields:
+            match |= Q(**{f"{field}__username": params["counterparty"]})
+        qs = qs.filter(match)
+    return qs
+
+
+def contract_list_response(request, qs, counterparty_fields):
+    """
+    Filtered contract listing. Passing ``limit`` or ``cursor`` switches to
+    keyset pages (newest first) with a ``next_cursor``; without them the
+    full list is returned as before.
+    """
+    params = request.query_params
+    try:
+        qs = filter_contracts(qs, params, counterparty_fields)
+        paginate = "limit" in params or "cursor" in params
+        if paginate:
+            contracts, next_cursor = keyset_page(
+                qs, params.get("cursor"), parse_page_size(params.get("limit")), pk_field="contract_id"
+            )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not paginate:
+        contracts = qs
+    serial = serializers.ContractSerializer(contracts, many=True, context={"request": request})
+    data = {"data": serial.data}
+    if paginate:
+        data["next_cursor"] = next_cursor
+    return Response(data, status=status.HTTP_200_OK)
+
 
 class ContractView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset_for_user(self, user):
-        qs = models.Contract.objects.select_related("farmer", "buyer", "crop")
+        qs = models.Contract.objects.select_related(*serializers.CONTRACT_RELATED)
         if user.type == "farmer":
             return qs.filter(farmer=user)
         return qs.filter(buyer=user)
@@ -27,14 +99,13 @@ class ContractView(APIView):
     def get(self, request, pk=None):
         try:
             if pk is None:
-                contracts = self.get_queryset_for_user(request.user)
-                serial = serializers.ContractSerializer(
-                    contracts, many=True, context={"request": request}
+                counterparty = "buyer" if request.user.type == "farmer" else "farmer"
+                return contract_list_response(
+                    request, self.get_queryset_for_user(request.user), [counterparty]
                 )
-                return Response({"data": serial.data}, status=status.HTTP_200_OK)
 
             contract = get_object_or_404(
-                models.Contract.objects.select_related("farmer", "buyer", "crop"),
+                models.Contract.objects.select_related(*serializers.CONTRACT_RELATED),
                 contract_id=pk,
             )
             serial = serializers.ContractSerializer(
@@ -54,21 +125,17 @@ class ContractView(APIView):
                 # Save contract instance
                 contract = serial.save()
 
-                # ✅ Generate and attach PDF
-                try:
-                    attach_contract_pdf(contract)
-                except Exception as pdf_err:
-                    # You can decide:
-                    # - either fail the whole request
-                    # - or just log and still succeed
-                    print("Error generating contract PDF:", pdf_err)
+                # PDF rendering happens in the render_contract_pdfs worker
+                job = enqueue_contract_pdf(contract)
 
                 return Response(
-                    {"Success": "Contract Successfully Created"},
+                    {"Success": "Contract Successfully Created", "pdf_job_id": str(job.id)},
                     status=status.HTTP_200_OK,
                 )
 
             return Response({"Error": serial.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except CropShortage as e:
+            return Response({"Error": str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({"Error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -94,6 +161,8 @@ class ContractView(APIView):
                     status=status.HTTP_200_OK,
                 )
             return Response({"Error": serial.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except CropShortage as e:
+            return Response({"Error": str(e)}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({"Error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
@@ -124,11 +193,22 @@ class TransactionView(APIView):
         
     def post(self,request):
         try:
-            serial=serializers.TransactionSerializer(data=request.data)
+            serial=serializers.TransactionSerializer(data=request.data, context={'request': request})
             if serial.is_valid():
                 serial.save()
-                return Response({'Sucess':'Transaction added'},status=status.HTTP_200_OK)
+                return Response({'Sucess':'Transaction added','transaction_id':serial.instance.pk},status=status.HTTP_200_OK)
             return Response({'Error':serial.errors},status=status.HTTP_400_BAD_REQUEST)
+        except serializers.ConflictingTransaction as e:
+            return Response(
+                {'Error':'A different payment is already recorded with this reference','transaction_id':e.original.pk},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except serializers.DuplicateTransaction as e:
+            # retried upload: answer as if it succeeded, without storing the receipt again
+            return Response(
+                {'Sucess':'Transaction already recorded','transaction_id':e.original.pk,'duplicate':True},
+                status=status.HTTP_200_OK,
+            )
         except Http404:
             return Response({'Error': 'No Contract found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
@@ -137,7 +217,7 @@ class TransactionView(APIView):
     def put(self,request,pk):
         try:
             transaction=get_object_or_404(models.Transaction,id=pk)
-            serial=serializers.TransactionSerializer(transaction,data=request.data,partial=True)
+            serial=serializers.TransactionSerializer(transaction,data=request.data,partial=True, context={'request': request})
             if serial.is_valid():
                 serial.save()
                 return Response({'Sucess':'Transaction Updated'},status=status.HTTP_200_OK)
@@ -157,6 +237,75 @@ class TransactionView(APIView):
         except Exception as e:
                 return Response({'Error':str(e)},status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class TransactionImportView(APIView):
+    """
+    Record many payments at once from a CSV or JSON Lines upload sent as
+    ``file``. Columns: contract_id, amount, date, reference_number and an
+    optional description.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.type == "farmer":
+            return Response(
+                {"Access Denied": "Only contractors can import payments"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        try:
+            name = upload.name.lower()
+            if name.endswith((".jsonl", ".ndjson")):
+                rows = transaction_import.iter_jsonl_rows(upload)
+            elif name.endswith(".csv"):
+                rows = transaction_import.iter_csv_rows(upload)
+            else:
+                return Response({"error": "Upload a .csv or .jsonl file"}, status=status.HTTP_400_BAD_REQUEST)
+
+            allowed = set(
+                models.Contract.objects.filter(buyer=request.user).values_list("contract_id", flat=True)
+            )
+            report = transaction_import.import_transactions(rows, allowed)
+            return Response({"data": report}, status=status.HTTP_200_OK)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class TransactionReconcileView(APIView):
+    """
+    Check recorded payments against a bank statement CSV sent as ``file``.
+    Optional ``date_from`` / ``date_to`` limit the transactions considered.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            dates = {}
+            for param in ("date_from", "date_to"):
+                if request.data.get(param):
+                    dates[param] = parse_date(request.data[param])
+                    if dates[param] is None:
+                        raise ValueError(f"{param} must be YYYY-MM-DD")
+            payments = reconciliation.payments_for(
+                None if request.user.is_staff else request.user, **dates
+            )
+            statement = reconciliation.parse_statement(transaction_import.upload_lines(upload))
+            report = reconciliation.build_report(reconciliation.reconcile(statement, payments))
+            return Response({"data": report}, status=status.HTTP_200_OK)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 # class ContractDocView(APIView):
 #     authentication_classes=[JWTAuthentication]
 #     permission_classes=[IsAuthenticated]
@@ -173,20 +322,70 @@ class GetProgressView(APIView):
     permission_classes=[IsAuthenticated]
     def get(sel,request,pk):
         try:
-            contract=get_object_or_404(models.Contract,contract_id=pk)
-            total_paid = models.Transaction.objects.filter(contract=contract).aggregate(total=Sum('amount'))['total'] or 0
-            total_price=contract.nego_price*contract.quantity 
-            remaining_amount = total_price - total_paid
-            return Response({
-                "contract_id": str(contract.contract_id),
-                "total_price": total_price,
-                "total_paid": total_paid,
-                "remaining_amount": remaining_amount,
-                "payment_complete": remaining_amount <= 0
-            }, status=status.HTTP_200_OK)
+            ledger = models.ContractLedger.objects.filter(contract_id=pk).first()
+            if ledger is None:
+                contract = get_object_or_404(models.Contract, contract_id=pk)
+                ledger = models.ContractLedger.rebuild(contract.contract_id)
+            return Response(models.ContractLedger.progress(ledger), status=status.HTTP_200_OK)
+        except Http404:
+            return Response({'Error': 'No Contract found'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({'Error':str(e)},status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
+
+class ProgressBatchView(APIView):
+    """
+    Payment progress for many contracts in one query. Pass ``contract_ids``
+    (comma separated on GET, a list on POST); without it every contract of
+    the caller is returned.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    MAX_IDS = 1000
+
+    def parse_ids(self, raw):
+        if raw is None or raw == "":
+            return None
+        if isinstance(raw, str):
+            raw = [part for part in raw.split(",") if part.strip()]
+        if not isinstance(raw, list):
+            raise ValueError("contract_ids must be a list")
+        if len(raw) > self.MAX_IDS:
+            raise ValueError(f"At most {self.MAX_IDS} contract_ids per request")
+        try:
+            return {uuid.UUID(str(value).strip()) for value in raw}
+        except ValueError:
+            raise ValueError("contract_ids must be UUIDs")
+
+    def progress(self, request, raw_ids):
+        try:
+            contract_ids = self.parse_ids(raw_ids)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            qs = models.ContractLedger.objects.all()
+            if contract_ids is not None:
+                qs = qs.filter(contract_id__in=contract_ids)
+            if contract_ids is None or not request.user.is_staff:
+                qs = qs.filter(Q(contract__farmer=request.user) | Q(contract__buyer=request.user))
+            rows = qs.values("contract_id", "total_price", "total_paid", "remaining_amount")
+            data = [models.ContractLedger.progress(row) for row in rows]
+
+            response = {"data": data}
+            if contract_ids is not None:
+                found = {row["contract_id"] for row in data}
+                response["missing"] = sorted(str(i) for i in contract_ids if str(i) not in found)
+            return Response(response, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def get(self, request):
+        return self.progress(request, request.query_params.get("contract_ids"))
+
+    def post(self, request):
+        return self.progress(request, request.data.get("contract_ids"))
+
 class FarmerProgressView(APIView):
     authentication_classes=[JWTAuthentication]
     permission_classes=[IsAuthenticated]
@@ -246,8 +445,29 @@ class AllFarmerProgressView(APIView):
 class AllTransactionView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    EXPORT_FIELDS = ["contract_id", "buyer_name", "receipt", "date", "amount", "reference_number", "description"]
+
+    def export_rows(self, request):
+        storage = models.Transaction._meta.get_field("receipt").storage
+        rows = models.Transaction.objects.order_by("pk").values(
+            "contract_id", "receipt", "date", "amount", "reference_number", "description",
+            buyer_name=F("contract__buyer__username"),
+        )
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            row["receipt"] = request.build_absolute_uri(storage.url(row["receipt"])) if row["receipt"] else None
+            yield row
 
     def get(self, request):
+        export = request.query_params.get("export")
+        if export:
+            if not request.user.is_staff:
+                return Response({"error": "Exports are limited to staff"}, status=status.HTTP_403_FORBIDDEN)
+            try:
+                return export_response(
+                    request, export, self.export_rows(request), self.EXPORT_FIELDS, "transactions"
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         try:
             transactions = models.Transaction.objects.select_related("contract__buyer")
             serializer = serializers.TransactionListSerializer(transactions, many=True,context={'request': request})
@@ -256,6 +476,12 @@ class AllTransactionView(APIView):
             return Response({"error": str(e)}, status=500)
 
 class FaceMatchView(APIView):
+    """
+    Queue a comparison of the uploaded photo with the farmer's profile image.
+    This is an image similarity check, not identity verification.
+    The request only streams the upload to scratch space; poll
+    ``facematch/<job_id>/`` for the result.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
@@ -270,26 +496,45 @@ class FaceMatchView(APIView):
             except FarmerProfile.DoesNotExist:
                 return Response({"error": "Farmer profile not found"}, status=404)
 
-            print(f"Farmer Profile: {farmer_profile}")
-            try:
-                stored_image_path = farmer_profile.image.url
-                print(f"Stored Image Path: {stored_image_path}")
-            except Exception as e:
-                return Response({"error": f"Could not download stored image: {str(e)}"}, status=500)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_uploaded:
-                for chunk in image.chunks():
-                    temp_uploaded.write(chunk)
-                uploaded_image_path = temp_uploaded.name
-                print(f"Uploaded Image Path: {uploaded_image_path}")
+            image_field = FarmerProfile._meta.get_field("image")
+            reference = getattr(image_field.to_python(farmer_profile.image or None), "public_id", None)
+            if not reference:
+                return Response({"error": "Profile image not set"}, status=status.HTTP_400_BAD_REQUEST)
             try:
-                result = True
-                return Response({"Verification": result}, status=status.HTTP_200_OK)
-            except Exception as e:
-                return Response({"error": f"Face verification failed: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+                job = enqueue_face_match(request.user, image, reference)
+            except UploadTooLarge as e:
+                return Response({"error": str(e)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            except ScratchFull as e:
+                return Response(
+                    {"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "30"}
+                )
+            return Response(
+                {"job_id": str(job.id), "status": job.status}, status=status.HTTP_202_ACCEPTED
+            )
 
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class FaceMatchJobView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            job = get_object_or_404(models.FaceMatchJob, id=pk, user=request.user)
+            data = {"job_id": str(job.id), "status": job.status}
+            if job.status == models.FaceMatchJob.Status.DONE:
+                data["similar_image"] = job.matched
+                data["distance"] = job.distance
+            elif job.status == models.FaceMatchJob.Status.FAILED:
+                data["error"] = job.error
+            return Response(data, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class TransactionUser(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -310,14 +555,38 @@ class TransactionUser(APIView):
 class AllContracts(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    EXPORT_FIELDS = [
+        "contract_id", "farmer_name", "buyer_name", "crop_name", "nego_price", "quantity",
+        "created_at", "delivery_address", "delivery_date", "terms", "status",
+    ]
+
+    def export_rows(self, export):
+        rows = models.Contract.objects.order_by("created_at").values(
+            "contract_id", "nego_price", "quantity", "created_at", "delivery_address",
+            "delivery_date", "terms", "status",
+            farmer_name=Coalesce("farmer__farmer_profile__name", "farmer__username"),
+            buyer_name=Coalesce("buyer__contractor_profile__name", "buyer__username"),
+            crop_name=F("crop__crop_name"),
+        )
+        for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            if export == "csv":
+                row["terms"] = "; ".join(row["terms"])
+            yield row
 
     def get(self, request):
+        export = request.query_params.get("export")
+        if export:
+            if not request.user.is_staff:
+                return Response({"error": "Exports are limited to staff"}, status=status.HTTP_403_FORBIDDEN)
+            try:
+                return export_response(
+                    request, export, self.export_rows(export), self.EXPORT_FIELDS, "contracts"
+                )
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            contracts = models.Contract.objects.all().select_related("farmer", "buyer", "crop")
-            serial = serializers.ContractSerializer(
-                contracts, many=True, context={"request": request}
-            )
-            return Response({"data": serial.data}, status=status.HTTP_200_OK)
+            contracts = models.Contract.objects.all().select_related(*serializers.CONTRACT_RELATED)
+            return contract_list_response(request, contracts, ["farmer", "buyer"])
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -325,12 +594,291 @@ class ContractDocView(APIView):
 
     def get(self,request,pk):
         try:
-            contract=get_object_or_404(models.Contract,contract_id=pk)
-            pdf_bytes = generate_contract_pdf_bytes(contract)
-            return FileResponse(
-                io.BytesIO(pdf_bytes),
+            contract=get_object_or_404(
+                models.Contract.objects.select_related(*serializers.CONTRACT_RELATED),
+                contract_id=pk,
+            )
+            context = build_contract_context(contract)
+            digest = contract_pdf_digest(context)
+            etag = f'"{digest}"'
+
+            if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+            if etag in if_none_match or "*" in if_none_match:
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response["ETag"] = etag
+                return response
+
+            response = FileResponse(
+                open_contract_pdf(context, digest),
                 as_attachment=True,
                 filename=f"contract_{contract.contract_id}.pdf"
             )
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
+        except SignatureUnavailable as e:
+            return Response(
+                {"error": str(e)},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(settings.IMAGE_CACHE_FAILURE_TTL)},
+            )
+        except Http404:
+            return Response({"error": "No Contract found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class ContractPdfJobView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            job = get_object_or_404(
+                models.ContractPdfJob.objects.select_related("contract"), id=pk
+            )
+            contract = job.contract
+            if request.user.id not in (contract.farmer_id, contract.buyer_id) and not request.user.is_staff:
+                return Response({"error": "Not a party to this contract"}, status=status.HTTP_403_FORBIDDEN)
+            data = {
+                "job_id": str(job.id),
+                "contract_id": str(contract.contract_id),
+                "status": job.status,
+                "error": job.error,
+                "updated_at": job.updated_at,
+            }
+            if job.status == models.ContractPdfJob.Status.DONE:
+                data["download_url"] = request.build_absolute_uri(
+                    f"/contracts/contract_pdf/{contract.contract_id}/"
+                )
+            return Response({"data": data}, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "No job found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ContractPdfExportView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self, request):
+        qs = models.Contract.objects.select_related(*serializers.CONTRACT_RELATED).order_by("created_at")
+        if not request.user.is_staff:
+            qs = qs.filter(Q(farmer=request.user) | Q(buyer=request.user))
+
+        params = request.query_params
+        if params.get("buyer"):
+            qs = qs.filter(buyer__username=params["buyer"])
+        if params.get("farmer"):
+            qs = qs.filter(farmer__username=params["farmer"])
+        if params.get("status") in ("true", "false"):
+            qs = qs.filter(status=params["status"] == "true")
+        for param, lookup in (("date_from", "created_at__date__gte"), ("date_to", "created_at__date__lte")):
+            if params.get(param):
+                value = parse_date(params[param])
+                if value is None:
+                    raise ValueError(f"{param} must be YYYY-MM-DD")
+                qs = qs.filter(**{lookup: value})
+        return qs
+
+    def get(self, request):
+        try:
+            qs = self.get_queryset(request)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            def entries():
+                errors = []
+                yield from iter_contract_pdfs(qs, get_render_pool(), errors)
+                if errors:
+                    yield "errors.txt", "\n".join(errors).encode("utf-8")
+
+            return streaming_response(
+                request, stream_zip(entries()), "application/zip", filename="contracts.zip"
+            )
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ContractVerifyView(APIView):
+    """Public check of a printed agreement by its QR token; no login needed."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, token):
+        try:
+            verification = (
+                models.ContractVerification.objects.filter(token=token)
+                .values("summary", "signature")
+                .first()
+            )
+            if verification is None:
+                return Response({"error": "Unknown verification code"}, status=status.HTTP_404_NOT_FOUND)
+            response = Response(
+                {"verified": True, "data": verification["summary"], "signature": verification["signature"]},
+                status=status.HTTP_200_OK,
+            )
+            response["ETag"] = f'"{verification["signature"]}"'
+            response["Cache-Control"] = "public, max-age=300"
+            return response
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class InstallmentView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_contract(self, request, pk):
+        contract = get_object_or_404(models.Contract, contract_id=pk)
+        if request.user.id not in (contract.farmer_id, contract.buyer_id) and not request.user.is_staff:
+            return None
+        return contract
+
+    def get(self, request, pk):
+        try:
+            contract = self.get_contract(request, pk)
+            if contract is None:
+                return Response({"error": "Not a party to this contract"}, status=status.HTTP_403_FORBIDDEN)
+            serial = serializers.InstallmentSerializer(contract.installments.all(), many=True)
+            return Response({"data": serial.data}, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "No Contract found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def put(self, request, pk):
+        """Replace the whole schedule; only the buyer may set it."""
+        try:
+            contract = self.get_contract(request, pk)
+            if contract is None or request.user.id != contract.buyer_id:
+                return Response(
+                    {"Access Denied": "Only the buyer can set the installment schedule"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            serial = serializers.InstallmentScheduleSerializer(data=request.data, context={"contract": contract})
+            if not serial.is_valid():
+                return Response({"error": serial.errors}, status=status.HTTP_400_BAD_REQUEST)
+            installments = replace_schedule(contract, serial.validated_data["installments"])
+            data = serializers.InstallmentSerializer(
+                models.Installment.objects.filter(pk__in=[i.pk for i in installments]), many=True
+            ).data
+            return Response({"Success": "Schedule saved", "data": data}, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "No Contract found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ContractBulkView(APIView):
+    """Create contracts with many farmers in one request (cooperative deals)."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            if request.user.type == "farmer":
+                return Response(
+                    {"Error": "Farmer does not have permission to create contract"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            serial = serializers.BulkContractSerializer(data=request.data)
+            if not serial.is_valid():
+                return Response({"Error": serial.errors}, status=status.HTTP_400_BAD_REQUEST)
+            contracts, jobs = create_contracts(request.user, serial.validated_data["contracts"])
+            job_ids = {job.contract_id: str(job.id) for job in jobs}
+            return Response(
+                {
+                    "Success": f"{len(contracts)} Contracts Successfully Created",
+                    "data": [
+                        {"contract_id": str(c.contract_id), "pdf_job_id": job_ids.get(c.contract_id)}
+                        for c in contracts
+                    ],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except CropShortage as e:
+            return Response({"Error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Exception as e:
+            return Response({"Error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ContractHistoryView(APIView):
+    """
+    State of a contract after event ``?seq=`` or as of ``?at=`` (latest by
+    default), rebuilt from the nearest snapshot, with the events replayed
+    on top of it.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        try:
+            contract = get_object_or_404(models.Contract, contract_id=pk)
+            if request.user.id not in (contract.farmer_id, contract.buyer_id) and not request.user.is_staff:
+                return Response({"error": "Not a party to this contract"}, status=status.HTTP_403_FORBIDDEN)
+            params = request.query_params
+            seq = at = None
+            if params.get("seq"):
+                try:
+                    seq = int(params["seq"])
+                except ValueError:
+                    return Response({"error": "seq must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+            if params.get("at"):
+                at = parse_datetime(params["at"])
+                if at is None:
+                    return Response({"error": "at must be an ISO datetime"}, status=status.HTTP_400_BAD_REQUEST)
+                if timezone.is_naive(at):
+                    at = timezone.make_aware(at)
+            state, events = models.contract_state(contract.contract_id, seq=seq, at=at)
+            if state is None:
+                return Response({"error": "No history at that point"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                "data": {
+                    "seq": state.pop("seq"),
+                    "state": state,
+                    "events": [event.as_dict() for event in events],
+                }
+            }, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "No Contract found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class OverdueInstallmentView(APIView):
+    """
+    Overdue installments on the caller's contracts, as last computed by
+    ``refresh_overdue_installments``. Answers 304 while nothing changed.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            rows = list(
+                models.Installment.objects.filter(status=models.Installment.Status.OVERDUE)
+                .filter(Q(contract__farmer=request.user) | Q(contract__buyer=request.user))
+                .order_by("due_date", "id")
+                .values("id", "contract_id", "sequence", "due_date", "amount", "outstanding")
+            )
+            today = timezone.localdate()
+            for row in rows:
+                row["days_overdue"] = (today - row["due_date"]).days
+
+            etag = '"%s"' % hashlib.sha1(
+                repr([(r["id"], r["outstanding"], r["days_overdue"]) for r in rows]).encode("utf-8")
+            ).hexdigest()
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = Response(
+                    {"data": rows, "total_outstanding": sum(r["outstanding"] for r in rows)},
+                    status=status.HTTP_200_OK,
+                )
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
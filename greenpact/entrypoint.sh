@@ -37,6 +37,26 @@ python manage.py migrate
 echo "Starting Daphne (WebSocket server) on port 5000..."
 daphne -b 0.0.0.0 -p 5000 greenpact.asgi:application &
 
+# Start the contract PDF render worker in the background
+echo "Starting contract PDF worker..."
+python manage.py render_contract_pdfs &
+
+# Start the face verification worker in the background
+echo "Starting face match worker..."
+python manage.py run_face_match_jobs &
+
+# Recompute overdue installments every five minutes
+echo "Starting installment overdue job..."
+python manage.py refresh_overdue_installments --interval 300 &
+
+# Send delivery reminders every fifteen minutes
+echo "Starting delivery reminder job..."
+python manage.py send_delivery_reminders --interval 900 &
+
+# Keep 30 days of the contract change feed, pruned hourly
+echo "Starting contract change feed pruning..."
+python manage.py prune_contract_changes --days 30 --interval 3600 &
+
 # Wait a moment for Daphne to start
 sleep 2
 
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'channels',
     'greenbot',
     'complaints',
+    'uploads',
     'cloudinary_storage',
     'cloudinary',
 ]
@@ -172,3 +173,48 @@ CLOUDINARY_STORAGE = {
 
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+
+# Rendered contract PDFs, keyed by a hash of everything printed on them.
+CONTRACT_PDF_CACHE_DIR = os.getenv('CONTRACT_PDF_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'contract_pdfs'))
+# Superseded renders older than this (seconds) are swept by the render worker.
+CONTRACT_PDF_CACHE_MAX_AGE = 24 * 60 * 60
+# Renders that could not load a signature are retried after
+# CONTRACT_PDF_RETRY_DELAY * attempt seconds, up to CONTRACT_PDF_MAX_ATTEMPTS tries.
+CONTRACT_PDF_MAX_ATTEMPTS = 5
+CONTRACT_PDF_RETRY_DELAY = 60
+# Worker processes used to render PDFs for bulk exports (defaults to the CPU count).
+CONTRACT_PDF_WORKERS = int(os.getenv('CONTRACT_PDF_WORKERS', '0')) or None
+
+# Downscaled signature images embedded in contract PDFs.
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'images'))
+IMAGE_CACHE_MAX_MEMORY_ITEMS = 256
+IMAGE_CACHE_MAX_DISK_ITEMS = 5000
+# Seconds a failed download is remembered before it is tried again.
+IMAGE_CACHE_FAILURE_TTL = 60
+
+# Photos queued for comparison with the profile image wait here for the run_face_match_jobs worker.
+FACE_MATCH_SCRATCH_DIR = os.getenv('FACE_MATCH_SCRATCH_DIR', os.path.join(BASE_DIR, 'cache', 'face_uploads'))
+FACE_MATCH_SCRATCH_MAX_BYTES = int(os.getenv('FACE_MATCH_SCRATCH_MAX_BYTES', str(200 * 1024 * 1024)))
+FACE_MATCH_MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+# Uploads older than this (seconds) are swept, and their jobs fail as expired.
+FACE_MATCH_SCRATCH_TTL = 15 * 60
+# Largest hash distance (of 64 bits) still counted as a match.
+FACE_MATCH_MAX_DISTANCE = 12
+
+# Delivery reminders: days ahead to warn about a delivery, and how long after
+# a missed delivery date the overdue reminder may still go out.
+DELIVERY_REMINDER_LEAD_DAYS = 3
+DELIVERY_REMINDER_OVERDUE_DAYS = 7
+
+# Resumable chunked uploads (receipts, progress photos, complaint proofs)
+# are assembled here before being handed to the storage backend.
+UPLOAD_SESSION_DIR = os.getenv('UPLOAD_SESSION_DIR', os.path.join(BASE_DIR, 'cache', 'uploads'))
+UPLOAD_MAX_SIZE = 25 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 256 * 1024
+UPLOAD_MIN_CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 2 * 1024 * 1024
+# Unfinished sessions are dropped after a day by prune_upload_sessions.
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+
+# Printed as a QR code on every agreement.
+CONTRACT_VERIFY_BASE_URL = os.getenv('CONTRACT_VERIFY_BASE_URL', 'http://localhost:8000/contracts/verify/')
@@ -16,6 +16,7 @@ urlpatterns = [
     path('contracts/',include('contract.urls')),
     path('greenbot/',include('greenbot.urls')),
     path('complaints/',include('complaints.urls')),
+    path('uploads/',include('uploads.urls')),
     re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
     re_path(r'^static/(?P<path>.*)$', serve, {'document_root': settings.STATIC_ROOT}),
 ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+import uploads.blobs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ratings', '0004_alter_ratingimage_image'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ratingimage',
+            name='image',
+            field=uploads.blobs.DedupCloudinaryField(max_length=255, verbose_name='image'),
+        ),
+    ]
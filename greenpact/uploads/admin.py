@@ -0,0 +1,6 @@
+from django.contrib import admin
+from .models import MediaBlob, UploadSession
+
+# Register your models here.
+admin.site.register(UploadSession)
+admin.site.register(MediaBlob)
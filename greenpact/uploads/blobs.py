@@ -0,0 +1,229 @@
+"""
+Content-addressed storage for uploaded media.
+
+Every upload is hashed; the first copy of some content is stored and
+recorded as a MediaBlob, later copies reuse it without being written or
+sent to Cloudinary again. Model rows pointing at a blob hold a reference,
+counted by the signal handlers below, and the stored object is deleted once
+the last row lets go of it.
+"""
+import hashlib
+import os
+import cloudinary.uploader
+from cloudinary.models import CloudinaryField
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+FILE_BACKEND = "file"
+CLOUDINARY_BACKEND = "cloudinary"
+
+
+def _blob_model():
+    return apps.get_model("uploads", "MediaBlob")
+
+
+def hash_content(content):
+    """``(sha256, size)`` of a File, read in chunks and rewound for the caller."""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks() if hasattr(content, "chunks") else iter(lambda: content.read(1024 * 1024), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest(), size
+
+
+def pin_blob(backend, sha256):
+    """Take a reference on an existing blob; returns its stored name or None."""
+    MediaBlob = _blob_model()
+    name = MediaBlob.objects.filter(backend=backend, sha256=sha256).values_list("name", flat=True).first()
+    if name is not None and MediaBlob.objects.filter(backend=backend, sha256=sha256).update(ref_count=F("ref_count") + 1):
+        return name
+    return None
+
+
+def record_blob(backend, sha256, name, size):
+    """
+    Record freshly stored content holding one reference. If another upload
+    recorded the same content first, that blob is pinned and its name
+    returned instead, and the caller should drop its own copy.
+    """
+    MediaBlob = _blob_model()
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(backend=backend, sha256=sha256, name=name, size=size, ref_count=1)
+        return name
+    except IntegrityError:
+        return pin_blob(backend, sha256) or name
+
+
+def retain(backend, name):
+    _blob_model().objects.filter(backend=backend, name=name).update(ref_count=F("ref_count") + 1)
+
+
+def release(backend, name):
+    """Drop a reference; the stored object goes once no row refers to it."""
+    MediaBlob = _blob_model()
+    MediaBlob.objects.filter(backend=backend, name=name).update(ref_count=F("ref_count") - 1)
+
+    def collect():
+        # re-checked after commit: a concurrent duplicate upload may have
+        # pinned the blob again in the meantime
+        deleted, _ = MediaBlob.objects.filter(backend=backend, name=name, ref_count__lte=0).delete()
+        if deleted:
+            delete_stored(backend, name)
+
+    transaction.on_commit(collect, robust=True)
+
+
+def delete_stored(backend, name):
+    if backend == FILE_BACKEND:
+        BlobStorage().delete(name)
+    else:
+        resource = CloudinaryField().parse_cloudinary_resource(name)
+        cloudinary.uploader.destroy(resource.public_id, resource_type=resource.resource_type, type=resource.type)
+
+
+class BlobStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names files by content: ``blobs/ab/<sha256>.ext``.
+    Saving content that is already stored writes nothing and returns the
+    existing name.
+    """
+
+    def _save(self, name, content):
+        sha256, size = hash_content(content)
+        existing = pin_blob(FILE_BACKEND, sha256)
+        if existing is not None:
+            if not self.exists(existing):
+                # the row outlived its file; put the content back
+                super()._save(existing, content)
+            return existing
+        ext = os.path.splitext(name)[1].lower()[:10]
+        stored = super()._save(f"blobs/{sha256[:2]}/{sha256}{ext}", content)
+        recorded = record_blob(FILE_BACKEND, sha256, stored, size)
+        if recorded != stored:
+            # lost a race with an identical upload
+            super().delete(stored)
+        return recorded
+
+
+class DedupFileField(models.FileField):
+    """FileField stored in BlobStorage, with reference-counted files."""
+    blob_backend = FILE_BACKEND
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("storage", BlobStorage())
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop("storage", None)
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        fresh = bool(file) and not file._committed
+        file = super().pre_save(model_instance, add)
+        if fresh:
+            # the storage already took this row's reference
+            _pinned(model_instance).add((self.attname, file.name))
+        return file
+
+    def stored_name(self, value):
+        return getattr(value, "name", value) or None
+
+
+class DedupCloudinaryField(CloudinaryField):
+    """CloudinaryField that uploads each distinct file once and shares it after that."""
+    blob_backend = CLOUDINARY_BACKEND
+
+    def pre_save(self, model_instance, add):
+        value = getattr(model_instance, self.attname)
+        if not isinstance(value, UploadedFile):
+            return super().pre_save(model_instance, add)
+        sha256, size = hash_content(value)
+        stored = pin_blob(CLOUDINARY_BACKEND, sha256)
+        if stored is None:
+            stored = record_blob(CLOUDINARY_BACKEND, sha256, super().pre_save(model_instance, add), size)
+        setattr(model_instance, self.attname, self.parse_cloudinary_resource(stored))
+        _pinned(model_instance).add((self.attname, stored))
+        return stored
+
+    def stored_name(self, value):
+        if hasattr(value, "get_prep_value"):
+            return value.get_prep_value()
+        return value or None
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        return name, "uploads.blobs.DedupCloudinaryField", args, kwargs
+
+
+def _pinned(instance):
+    if "_blob_pinned" not in instance.__dict__:
+        instance._blob_pinned = set()
+    return instance._blob_pinned
+
+
+def blob_fields(model):
+    return [field for field in model._meta.concrete_fields if hasattr(field, "blob_backend")]
+
+
+def capture_previous_blobs(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = blob_fields(sender)
+    if not fields or raw or instance._state.adding:
+        return
+    if update_fields is not None:
+        fields = [field for field in fields if field.name in update_fields or field.attname in update_fields]
+    if not fields:
+        return
+    previous = sender._base_manager.filter(pk=instance.pk).values_list(*[f.attname for f in fields]).first()
+    if previous is not None:
+        instance._blob_previous = {
+            field.attname: field.stored_name(value) for field, value in zip(fields, previous)
+        }
+
+
+def count_blob_references(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = blob_fields(sender)
+    if not fields or raw:
+        return
+    if update_fields is not None:
+        fields = [field for field in fields if field.name in update_fields or field.attname in update_fields]
+    previous = instance.__dict__.pop("_blob_previous", {})
+    pinned = instance.__dict__.pop("_blob_pinned", set())
+    for field in fields:
+        old = previous.get(field.attname)
+        new = field.stored_name(getattr(instance, field.attname))
+        if old == new:
+            if (field.attname, new) in pinned:
+                # re-uploaded the content it already had: drop the extra reference
+                release(field.blob_backend, new)
+            continue
+        if new and (field.attname, new) not in pinned:
+            retain(field.blob_backend, new)
+        if old:
+            release(field.blob_backend, old)
+
+
+def release_blob_references(sender, instance, **kwargs):
+    for field in blob_fields(sender):
+        name = field.stored_name(getattr(instance, field.attname))
+        if name:
+            release(field.blob_backend, name)
+
+
+def connect_blob_signals():
+    """Hook reference counting to every model with a dedup field."""
+    for model in apps.get_models():
+        if blob_fields(model):
+            models.signals.pre_save.connect(capture_previous_blobs, sender=model)
+            models.signals.post_save.connect(count_blob_references, sender=model)
+            models.signals.post_delete.connect(release_blob_references, sender=model)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from uploads.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete expired upload sessions and their part files."
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+        for session in expired.iterator():
+            session.discard()
+        deleted, _ = expired.delete()
+        self.stdout.write(f"Deleted {deleted} expired upload session(s)")
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploads', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('backend', models.CharField(choices=[('file', 'File storage'), ('cloudinary', 'Cloudinary')], max_length=20)),
+                ('sha256', models.CharField(max_length=64)),
+                ('name', models.CharField(max_length=255)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['backend', 'name'], name='uploads_med_backend_c0c67c_idx')],
+                'constraints': [models.UniqueConstraint(fields=('backend', 'sha256'), name='unique_media_blob_content')],
+            },
+        ),
+    ]
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.core.files.uploadedfile import UploadedFile
+from django.db import models, transaction
+from django.utils import timezone
+from user.models import CustomUser
+
+
+class UploadSession(models.Model):
+    """
+    A file sent in numbered chunks that can be resumed after a dropped
+    connection. Chunks are written at their offset in a part file on disk;
+    once every chunk is in, the session is completed and a serializer can
+    take its id in place of a multipart file.
+    """
+    class Status(models.TextChoices):
+        OPEN = "open", "Open"
+        COMPLETE = "complete", "Complete"
+        USED = "used", "Used"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, related_name="upload_sessions", on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    # optional sha256 of the whole file, checked on completion
+    checksum = models.CharField(max_length=64, blank=True)
+    received = ArrayField(models.IntegerField(), blank=True, default=list)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.OPEN)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [models.Index(fields=["expires_at"])]
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.status})"
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        super().save(*args, **kwargs)
+
+    @property
+    def total_chunks(self):
+        return max(1, -(-self.size // self.chunk_size))
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_DIR, f"{self.id}.part")
+
+    def chunk_length(self, index):
+        if index == self.total_chunks - 1:
+            return self.size - index * self.chunk_size
+        return self.chunk_size
+
+    def missing(self):
+        received = set(self.received)
+        return [index for index in range(self.total_chunks) if index not in received]
+
+    def write_chunk(self, index, data):
+        """
+        Write chunk ``index`` at its offset in the part file and record it.
+        Resending a chunk overwrites it, so retries are harmless.
+        """
+        os.makedirs(settings.UPLOAD_SESSION_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            os.pwrite(fd, data, index * self.chunk_size)
+        finally:
+            os.close(fd)
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=self.pk)
+            if index not in session.received:
+                session.received = sorted(session.received + [index])
+                session.save(update_fields=["received"])
+        self.received = session.received
+
+    def file_checksum(self):
+        digest = hashlib.sha256()
+        with open(self.path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def open_file(self):
+        """The assembled file, ready to assign to a FileField or CloudinaryField."""
+        return UploadedFile(
+            file=open(self.path, "rb"),
+            name=self.filename,
+            content_type=self.content_type or None,
+            size=self.size,
+        )
+
+    def claim(self):
+        """Mark a completed session used; False if someone else got there first."""
+        claimed = UploadSession.objects.filter(pk=self.pk, status=self.Status.COMPLETE).update(status=self.Status.USED)
+        if claimed:
+            self.status = self.Status.USED
+        return bool(claimed)
+
+    def release(self):
+        UploadSession.objects.filter(pk=self.pk).update(status=self.Status.COMPLETE)
+        self.status = self.Status.COMPLETE
+
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class MediaBlob(models.Model):
+    """
+    One stored copy of some uploaded content, shared by every row that
+    uploaded the same bytes. ``name`` is the storage path, or the stored
+    Cloudinary value, that those rows hold.
+    """
+    class Backend(models.TextChoices):
+        FILE = "file", "File storage"
+        CLOUDINARY = "cloudinary", "Cloudinary"
+
+    backend = models.CharField(max_length=20, choices=Backend.choices)
+    sha256 = models.CharField(max_length=64)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["backend", "sha256"], name="unique_media_blob_content"),
+        ]
+        indexes = [models.Index(fields=["backend", "name"])]
+
+    def __str__(self):
+        return f"{self.backend}:{self.name} ({self.ref_count} refs)"
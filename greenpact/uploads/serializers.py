@@ -0,0 +1,125 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    total_chunks = serializers.IntegerField(read_only=True)
+    missing = serializers.SerializerMethodField()
+    chunk_size = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "filename",
+            "content_type",
+            "size",
+            "chunk_size",
+            "checksum",
+            "total_chunks",
+            "missing",
+            "status",
+            "expires_at",
+        ]
+        read_only_fields = ["status", "expires_at"]
+
+    def get_missing(self, obj):
+        return obj.missing()
+
+    def validate_size(self, value):
+        if value < 1:
+            raise serializers.ValidationError("File is empty")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files are limited to {settings.UPLOAD_MAX_SIZE} bytes")
+        return value
+
+    def validate_chunk_size(self, value):
+        if not settings.UPLOAD_MIN_CHUNK_SIZE <= value <= settings.UPLOAD_MAX_CHUNK_SIZE:
+            raise serializers.ValidationError(
+                f"chunk_size must be between {settings.UPLOAD_MIN_CHUNK_SIZE} and {settings.UPLOAD_MAX_CHUNK_SIZE}"
+            )
+        return value
+
+    def validate_checksum(self, value):
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in "0123456789abcdef" for c in value)):
+            raise serializers.ValidationError("checksum must be a hex sha256")
+        return value
+
+    def create(self, validated_data):
+        validated_data.setdefault("chunk_size", settings.UPLOAD_CHUNK_SIZE)
+        validated_data["user"] = self.context["request"].user
+        return super().create(validated_data)
+
+
+class UploadSessionField(serializers.PrimaryKeyRelatedField):
+    """Id of a completed, unused upload session of the requesting user."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("write_only", True)
+        super().__init__(queryset=UploadSession.objects.all(), **kwargs)
+
+    def to_internal_value(self, data):
+        session = super().to_internal_value(data)
+        request = self.context.get("request")
+        if request is None or session.user_id != request.user.id:
+            self.fail("does_not_exist", pk_value=data)
+        if session.status != UploadSession.Status.COMPLETE:
+            raise serializers.ValidationError("Upload is not complete")
+        return session
+
+
+class UploadSessionMixin:
+    """
+    Lets a ModelSerializer take an upload session id in place of a file.
+    ``upload_fields`` maps each UploadSessionField to the file field it
+    fills. On save the assembled file is handed to that field, and through
+    it to the storage backend, then the session is marked used and its part
+    file removed. A file field the model requires must come one way or the
+    other.
+    """
+    upload_fields = {}
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        self._upload_sessions = {}
+        for session_field, file_field in self.upload_fields.items():
+            session = attrs.pop(session_field, None)
+            if session is not None:
+                if attrs.get(file_field):
+                    raise serializers.ValidationError(
+                        {session_field: f"Send either {file_field} or {session_field}, not both"}
+                    )
+                self._upload_sessions[file_field] = session
+            elif self.instance is None and not self.partial and not attrs.get(file_field):
+                if not self.Meta.model._meta.get_field(file_field).blank:
+                    raise serializers.ValidationError(
+                        {file_field: f"Send {file_field} or {session_field}"}
+                    )
+        return attrs
+
+    def save(self, **kwargs):
+        sessions = getattr(self, "_upload_sessions", {})
+        claimed = []
+        for session in sessions.values():
+            # claim first so a session cannot be attached to two records
+            if not session.claim():
+                for other in claimed:
+                    other.release()
+                raise serializers.ValidationError("Upload was already used")
+            claimed.append(session)
+        files = {file_field: session.open_file() for file_field, session in sessions.items()}
+        try:
+            instance = super().save(**files, **kwargs)
+        except BaseException:
+            for session in sessions.values():
+                session.release()
+            raise
+        finally:
+            for f in files.values():
+                f.close()
+        for session in sessions.values():
+            session.discard()
+        return instance
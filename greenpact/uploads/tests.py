@@ -0,0 +1,264 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+from cloudinary import CloudinaryResource
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from complaints.models import Complaint
+from contract.models import Contract, FarmerProgress, Transaction
+from crops.models import Crops
+from user.models import CustomUser
+from ratings.models import Rating, RatingImage
+from .models import MediaBlob, UploadSession
+
+
+class UploadSessionTests(APITestCase):
+    """Test cases for resumable chunked uploads"""
+
+    CHUNK = 64 * 1024
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(UPLOAD_SESSION_DIR=self.upload_dir, MEDIA_ROOT=self.media)
+        self.override.enable()
+        self.farmer_user = CustomUser.objects.create_user(
+            username="farmer", password="testpass123", type=CustomUser.Types.FARMER
+        )
+        self.contractor_user = CustomUser.objects.create_user(
+            username="contractor", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.crop = Crops.objects.create(
+            crop_name="Wheat", publisher=self.farmer_user, crop_price=5000,
+            quantity=100, Description="Wheat", harvested_time=date.today(), location="Punjab"
+        )
+        self.contract = Contract.objects.create(
+            farmer=self.farmer_user, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5000, quantity=10, delivery_address="Mumbai", delivery_date=date.today()
+        )
+        self.data = os.urandom(2 * self.CHUNK + 1000)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def start(self, user, name="receipt.pdf"):
+        self.client.force_authenticate(user=user)
+        response = self.client.post("/uploads/", {
+            "filename": name, "content_type": "application/pdf", "size": len(self.data),
+            "chunk_size": self.CHUNK, "checksum": hashlib.sha256(self.data).hexdigest(),
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def put_chunk(self, upload_id, index, data=None, checksum=None):
+        if data is None:
+            data = self.data[index * self.CHUNK:(index + 1) * self.CHUNK]
+        return self.client.generic(
+            "PUT", f"/uploads/{upload_id}/chunks/{index}/", data,
+            content_type="application/octet-stream",
+            HTTP_X_CHUNK_CHECKSUM=checksum or hashlib.sha256(data).hexdigest(),
+        )
+
+    def upload(self, user, name="receipt.pdf"):
+        upload_id = self.start(user, name)
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        self.assertEqual(self.client.post(f"/uploads/{upload_id}/complete/").status_code, status.HTTP_200_OK)
+        return upload_id
+
+    def test_resume_after_missing_and_corrupt_chunks(self):
+        upload_id = self.start(self.contractor_user)
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.put_chunk(upload_id, 0, checksum="0" * 64).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.put_chunk(upload_id, 1, data=b"short").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.put_chunk(upload_id, 3).status_code, status.HTTP_400_BAD_REQUEST)
+
+        # the client asks where to resume from
+        self.assertEqual(self.client.get(f"/uploads/{upload_id}/").data["missing"], [0, 1])
+        response = self.client.post(f"/uploads/{upload_id}/complete/")
+        self.assertEqual(response.data["missing"], [0, 1])
+
+        self.put_chunk(upload_id, 1)
+        self.put_chunk(upload_id, 0)
+        self.put_chunk(upload_id, 0)  # a retried chunk is harmless
+        response = self.client.post(f"/uploads/{upload_id}/complete/")
+        self.assertEqual(response.data["status"], "complete")
+        with open(UploadSession.objects.get(pk=upload_id).path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_whole_file_checksum_is_verified(self):
+        upload_id = self.start(self.contractor_user)
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+        UploadSession.objects.filter(pk=upload_id).update(checksum="f" * 64)
+        response = self.client.post(f"/uploads/{upload_id}/complete/")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(f"/uploads/{upload_id}/").data["missing"], [0, 1, 2])
+
+    def test_transaction_receipt_from_session(self):
+        upload_id = self.upload(self.contractor_user)
+        response = self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id), "date": str(date.today()),
+            "amount": 500, "reference_number": "UTR-9", "receipt_upload": upload_id,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        payment = Transaction.objects.get(pk=response.data["transaction_id"])
+        self.assertTrue(payment.receipt.name.startswith("blobs/"))
+        with payment.receipt.open("rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(session.status, "used")
+        self.assertFalse(os.path.exists(session.path))
+
+        # a session is attached once, and only by its owner
+        response = self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id), "date": str(date.today()),
+            "amount": 500, "reference_number": "UTR-10", "receipt_upload": upload_id,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        other_id = self.upload(self.farmer_user)
+        self.client.force_authenticate(user=self.contractor_user)
+        response = self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id), "date": str(date.today()),
+            "amount": 500, "reference_number": "UTR-11", "receipt_upload": other_id,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id), "date": str(date.today()),
+            "amount": 500, "reference_number": "UTR-12",
+        }, format="json")
+        self.assertIn("receipt", response.data["Error"])
+
+    def test_progress_image_and_complaint_proof_from_session(self):
+        upload_id = self.upload(self.farmer_user, name="field.jpg")
+        stored = CloudinaryResource("progess/image/field", version=1, format="jpg", type="upload", resource_type="image")
+        with mock.patch("cloudinary.models.uploader.upload_resource", return_value=stored) as upload_resource:
+            response = self.client.post("/contracts/progress/", {
+                "contract_id": str(self.contract.contract_id), "date": str(date.today()),
+                "current_status": "Sown", "image_upload": upload_id,
+            }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(upload_resource.call_args.args[0].name, "field.jpg")
+        self.assertEqual(FarmerProgress.objects.get().image.public_id, "progess/image/field")
+
+        upload_id = self.upload(self.farmer_user, name="proof.pdf")
+        response = self.client.post("/complaints/", {
+            "accused": "contractor", "description": "Late payment", "proof_upload": upload_id,
+        }, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        with Complaint.objects.get().proof.open("rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_prune_expired_sessions(self):
+        upload_id = self.start(self.contractor_user)
+        self.put_chunk(upload_id, 0)
+        session = UploadSession.objects.get(pk=upload_id)
+        UploadSession.objects.filter(pk=upload_id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get(f"/uploads/{upload_id}/").status_code, status.HTTP_404_NOT_FOUND)
+        call_command("prune_upload_sessions", stdout=open(os.devnull, "w"))
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertFalse(os.path.exists(session.path))
+
+
+class MediaBlobTests(APITestCase):
+    """Test cases for content-addressed, reference-counted media"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media)
+        self.override.enable()
+        self.farmer_user = CustomUser.objects.create_user(
+            username="farmer", password="testpass123", type=CustomUser.Types.FARMER
+        )
+        self.contractor_user = CustomUser.objects.create_user(
+            username="contractor", password="testpass123", type=CustomUser.Types.CONTRACTOR
+        )
+        self.crop = Crops.objects.create(
+            crop_name="Wheat", publisher=self.farmer_user, crop_price=5000,
+            quantity=100, Description="Wheat", harvested_time=date.today(), location="Punjab"
+        )
+        self.contract = Contract.objects.create(
+            farmer=self.farmer_user, buyer=self.contractor_user, crop=self.crop,
+            nego_price=5000, quantity=10, delivery_address="Mumbai", delivery_date=date.today()
+        )
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def pay(self, reference, content=b"same receipt"):
+        self.client.force_authenticate(user=self.contractor_user)
+        response = self.client.post("/contracts/transaction/", {
+            "contract_id": str(self.contract.contract_id), "date": str(date.today()), "amount": 500,
+            "reference_number": reference, "receipt": SimpleUploadedFile("receipt.pdf", content),
+        }, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return Transaction.objects.get(pk=response.data["transaction_id"])
+
+    def test_duplicate_receipts_share_one_file(self):
+        first = self.pay("UTR-1")
+        second = self.pay("UTR-2")
+        third = self.pay("UTR-3", content=b"another receipt")
+        self.assertEqual(first.receipt.name, second.receipt.name)
+        self.assertNotEqual(first.receipt.name, third.receipt.name)
+        blob = MediaBlob.objects.get(name=first.receipt.name)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.sha256, hashlib.sha256(b"same receipt").hexdigest())
+        self.assertEqual(len(os.listdir(os.path.dirname(first.receipt.path))), 1)
+
+        path = first.receipt.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(MediaBlob.objects.get(name=second.receipt.name).ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(MediaBlob.objects.filter(name=second.receipt.name).exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_replacing_a_receipt_moves_the_reference(self):
+        payment = self.pay("UTR-1")
+        old = payment.receipt.name
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.receipt = SimpleUploadedFile("receipt.pdf", b"corrected receipt")
+            payment.save()
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+        self.assertEqual(MediaBlob.objects.get(name=payment.receipt.name).ref_count, 1)
+
+        # saving the same content again keeps a single reference
+        with self.captureOnCommitCallbacks(execute=True):
+            payment.receipt = SimpleUploadedFile("receipt.pdf", b"corrected receipt")
+            payment.save()
+        self.assertEqual(MediaBlob.objects.get(name=payment.receipt.name).ref_count, 1)
+
+    def test_duplicate_cloudinary_upload_is_sent_once(self):
+        rating = Rating.objects.create(
+            rating_user=self.contractor_user, rated_user=self.farmer_user, rate=5, description="Good"
+        )
+        stored = CloudinaryResource("rating/image/photo", version=1, format="jpg", type="upload", resource_type="image")
+        with mock.patch("cloudinary.models.uploader.upload_resource", return_value=stored) as upload_resource:
+            images = [
+                RatingImage.objects.create(rating=rating, image=SimpleUploadedFile("photo.jpg", b"jpeg bytes"))
+                for _ in range(3)
+            ]
+        upload_resource.assert_called_once()
+        self.assertEqual({image.image.public_id for image in images}, {"rating/image/photo"})
+        blob = MediaBlob.objects.get(backend=MediaBlob.Backend.CLOUDINARY)
+        self.assertEqual(blob.ref_count, 3)
+
+        with mock.patch("cloudinary.uploader.destroy") as destroy:
+            with self.captureOnCommitCallbacks(execute=True):
+                rating.delete()
+        destroy.assert_called_once_with("rating/image/photo", resource_type="image", type="upload")
+        self.assertFalse(MediaBlob.objects.exists())
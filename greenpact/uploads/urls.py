@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+urlpatterns = [
+    path('',views.UploadSessionView.as_view()),
+    path('<uuid:pk>/',views.UploadSessionView.as_view()),
+    path('<uuid:pk>/chunks/<int:index>/',views.UploadChunkView.as_view()),
+    path('<uuid:pk>/complete/',views.UploadCompleteView.as_view()),
+]
@@ -0,0 +1,109 @@
+import hashlib
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import UploadSession
+from .serializers import UploadSessionSerializer
+
+
+def get_session(request, pk):
+    return get_object_or_404(
+        UploadSession, id=pk, user=request.user, expires_at__gt=timezone.now()
+    )
+
+
+class UploadSessionView(APIView):
+    """
+    Resumable uploads: POST starts a session, GET reports which chunks are
+    still missing so a client can resume after a dropped connection.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            serial = UploadSessionSerializer(data=request.data, context={"request": request})
+            if serial.is_valid():
+                serial.save()
+                return Response(serial.data, status=status.HTTP_201_CREATED)
+            return Response({"error": serial.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def get(self, request, pk):
+        try:
+            return Response(UploadSessionSerializer(get_session(request, pk)).data, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UploadChunkView(APIView):
+    """
+    PUT the raw bytes of chunk ``index`` with its sha256 in the
+    ``X-Chunk-Checksum`` header. The chunk goes straight to its offset in the
+    part file; a corrupted chunk is rejected and can simply be resent.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, index):
+        try:
+            session = get_session(request, pk)
+            if session.status != UploadSession.Status.OPEN:
+                return Response({"error": "Upload is already complete"}, status=status.HTTP_409_CONFLICT)
+            if index >= session.total_chunks:
+                return Response({"error": "Chunk index out of range"}, status=status.HTTP_400_BAD_REQUEST)
+            expected = request.headers.get("X-Chunk-Checksum", "").lower()
+            if not expected:
+                return Response({"error": "X-Chunk-Checksum header is required"}, status=status.HTTP_400_BAD_REQUEST)
+
+            length = session.chunk_length(index)
+            data = request.stream.read(length + 1) if request.stream else b""
+            if len(data) != length:
+                return Response(
+                    {"error": f"Chunk {index} must be {length} bytes"}, status=status.HTTP_400_BAD_REQUEST
+                )
+            if hashlib.sha256(data).hexdigest() != expected:
+                return Response({"error": "Chunk checksum mismatch"}, status=status.HTTP_400_BAD_REQUEST)
+
+            session.write_chunk(index, data)
+            return Response({"received": index, "missing": session.missing()}, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class UploadCompleteView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, pk):
+        try:
+            session = get_session(request, pk)
+            if session.status == UploadSession.Status.OPEN:
+                missing = session.missing()
+                if missing:
+                    return Response(
+                        {"error": "Chunks missing", "missing": missing}, status=status.HTTP_400_BAD_REQUEST
+                    )
+                if session.checksum and session.file_checksum() != session.checksum:
+                    # the part file is useless; start over
+                    session.received = []
+                    session.save(update_fields=["received"])
+                    session.discard()
+                    return Response({"error": "File checksum mismatch"}, status=status.HTTP_400_BAD_REQUEST)
+                session.status = UploadSession.Status.COMPLETE
+                session.save(update_fields=["status"])
+            return Response(UploadSessionSerializer(session).data, status=status.HTTP_200_OK)
+        except Http404:
+            return Response({"error": "Upload not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
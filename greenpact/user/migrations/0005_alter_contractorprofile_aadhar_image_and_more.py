@@ -0,0 +1,54 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:36
+
+import uploads.blobs
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0004_alter_contractorprofile_aadhar_image_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='contractorprofile',
+            name='aadhar_image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='aadhar_image'),
+        ),
+        migrations.AlterField(
+            model_name='contractorprofile',
+            name='image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='contractorprofile',
+            name='signature',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='signature'),
+        ),
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='aadhar_image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='aadhar_image'),
+        ),
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='image'),
+        ),
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='qr_code_image',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='qr_code_image'),
+        ),
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='screenshot',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='screenshot'),
+        ),
+        migrations.AlterField(
+            model_name='farmerprofile',
+            name='signature',
+            field=uploads.blobs.DedupCloudinaryField(blank=True, max_length=255, null=True, verbose_name='signature'),
+        ),
+    ]
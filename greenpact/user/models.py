@@ -3,7 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from cloudinary.models import CloudinaryField
+from uploads.blobs import DedupCloudinaryField
 
 class CustomUser(AbstractUser):
     class Types(models.TextChoices):
@@ -21,12 +21,12 @@ class FarmerProfile(models.Model):
     name = models.CharField(max_length=100)
     address = models.TextField()
     phoneno = models.CharField(max_length=15, unique=True)
-    image = CloudinaryField('image', folder='farmer/image/', null=True, blank=True)
-    screenshot = CloudinaryField('screenshot', folder='screenshots/', null=True, blank=True)
-    aadhar_image = CloudinaryField('aadhar_image', folder='aadhar/', null=True, blank=True)
-    signature = CloudinaryField('signature', folder='signature/', null=True, blank=True)
+    image = DedupCloudinaryField('image', folder='farmer/image/', null=True, blank=True)
+    screenshot = DedupCloudinaryField('screenshot', folder='screenshots/', null=True, blank=True)
+    aadhar_image = DedupCloudinaryField('aadhar_image', folder='aadhar/', null=True, blank=True)
+    signature = DedupCloudinaryField('signature', folder='signature/', null=True, blank=True)
     is_verfied=models.BooleanField(default=False)
-    qr_code_image = CloudinaryField('qr_code_image', folder='qr_codes/', null=True, blank=True)
+    qr_code_image = DedupCloudinaryField('qr_code_image', folder='qr_codes/', null=True, blank=True)
     
     def __str__(self):
         return self.user.username
@@ -36,10 +36,10 @@ class ContractorProfile(models.Model):
     name = models.CharField(max_length=100)
     address = models.TextField()
     phoneno = models.CharField(max_length=15, unique=True)
-    image = CloudinaryField('image', folder='contractor/image/', null=True, blank=True)
+    image = DedupCloudinaryField('image', folder='contractor/image/', null=True, blank=True)
     gstin = models.CharField(max_length=15, unique=True)
-    aadhar_image = CloudinaryField('aadhar_image', folder='contractor/aadhar/', null=True, blank=True)
-    signature = CloudinaryField('signature', folder='contractor/signature/', null=True, blank=True)
+    aadhar_image = DedupCloudinaryField('aadhar_image', folder='contractor/aadhar/', null=True, blank=True)
+    signature = DedupCloudinaryField('signature', folder='contractor/signature/', null=True, blank=True)
     is_verfied=models.BooleanField(default=False)
     
     def __str__(self):
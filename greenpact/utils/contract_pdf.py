@@ -1,224 +1,392 @@
+import hashlib
+import json
+import threading
 from io import BytesIO
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, HRFlowable, Image
+from reportlab.graphics.barcode.qr import QrCodeWidget
+from reportlab.graphics.shapes import Drawing
+from django.conf import settings
 from django.core.files.base import ContentFile
 
 # Import your models (keeping your existing imports)
 from user.models import FarmerProfile, ContractorProfile
 from contract.models import Contract
+from utils.pdf_cache import cached_pdf_path, store_pdf
+from utils.image_cache import signature_cache
+
+# Bump whenever the layout below changes so cached PDFs are re-rendered.
+TEMPLATE_VERSION = 3
+
+
+def _party_profile(user, accessor, model):
+    """Use a profile loaded via select_related when present, else query for it."""
+    if getattr(type(user), accessor).is_cached(user):
+        return getattr(user, accessor, None)
+    return model.objects.filter(user=user).first()
+
+
+def _public_id(field):
+    return getattr(field, "public_id", None) or None
+
+
+def contract_verify_url(token) -> str:
+    return f"{settings.CONTRACT_VERIFY_BASE_URL.rstrip('/')}/{token}/"
+
+
+def build_contract_context(contract: Contract, farmer_profile=None, contractor_profile=None) -> dict:
+    """
+    Collect every value that ends up in the rendered agreement as plain data.
+
+    The result is JSON-serialisable, so it can be hashed for caching and
+    handed to a worker process without touching the database again.
+    """
+    if farmer_profile is None:
+        farmer_profile = _party_profile(contract.farmer, "farmer_profile", FarmerProfile)
+    if contractor_profile is None:
+        contractor_profile = _party_profile(contract.buyer, "contractor_profile", ContractorProfile)
+
+    return {
+        "contract_id": str(contract.contract_id),
+        "created_date": str(contract.created_at.date()),
+        "farmer_name": farmer_profile.name if farmer_profile else contract.farmer.username,
+        "farmer_address": getattr(farmer_profile, "address", "N/A") if farmer_profile else "N/A",
+        "farmer_phone": getattr(farmer_profile, "phoneno", "N/A") if farmer_profile else "N/A",
+        "buyer_name": contractor_profile.name if contractor_profile else contract.buyer.username,
+        "buyer_address": getattr(contractor_profile, "address", "N/A") if contractor_profile else "N/A",
+        "buyer_phone": getattr(contractor_profile, "phoneno", "N/A") if contractor_profile else "N/A",
+        "crop_name": contract.crop.crop_name,
+        "quantity": contract.quantity,
+        "nego_price": contract.nego_price,
+        "delivery_date": str(contract.delivery_date),
+        "delivery_address": str(contract.delivery_address),
+        "terms": list(contract.terms or []),
+        "farmer_signature": _public_id(getattr(farmer_profile, "signature", None)),
+        "buyer_signature": _public_id(getattr(contractor_profile, "signature", None)),
+        "verify_url": contract_verify_url(contract.verification_token),
+    }
+
+
+class SignatureUnavailable(Exception):
+    """A party's signature image could not be loaded; the render should be retried."""
+
+    def __init__(self, public_id):
+        # args stay (public_id,) so the error survives the trip back from a worker process
+        super().__init__(public_id)
+        self.public_id = public_id
+
+    def __str__(self):
+        return f"Signature {self.public_id} could not be loaded, try again later"
+
+
+def contract_pdf_digest(context: dict) -> str:
+    """Content hash of a contract context; doubles as the cache key and ETag."""
+    payload = json.dumps({"v": TEMPLATE_VERSION, "ctx": context}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_or_render_contract_pdf(context: dict, digest: str = None) -> str:
+    """Return the cached PDF path for a context, rendering only on a cache miss."""
+    digest = digest or contract_pdf_digest(context)
+    path = cached_pdf_path(context["contract_id"], digest)
+    if path is None:
+        path = store_pdf(context["contract_id"], digest, render_contract_pdf(context))
+    return path
+
+
+def open_contract_pdf(context: dict, digest: str = None):
+    """
+    Open the PDF for a context, rendering it if needed. A render removed
+    between the lookup and the open (a concurrent save invalidated the cache)
+    is rendered again instead of failing the download.
+    """
+    digest = digest or contract_pdf_digest(context)
+    try:
+        return open(get_or_render_contract_pdf(context, digest), "rb")
+    except FileNotFoundError:
+        return open(store_pdf(context["contract_id"], digest, render_contract_pdf(context)), "rb")
+
 
 def generate_contract_pdf_bytes(contract: Contract) -> bytes:
     """
     Generate a professional PDF agreement for the given contract using 
     ReportLab Platypus for advanced formatting.
     """
-    buffer = BytesIO()
-    
-    # Setup the document with margins
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=40,
-        leftMargin=40,
-        topMargin=40,
-        bottomMargin=40,
-        title=f"Contract_{contract.contract_id}"
-    )
-
-    # --- Styles ---
-    styles = getSampleStyleSheet()
-    
-    # Custom Brand Color (Greenpact Green)
-    brand_color = colors.HexColor("#2E7D32") 
-    
-    # Title Style
-    style_title = ParagraphStyle(
-        'GreenpactTitle',
-        parent=styles['Heading1'],
-        fontSize=20,
-        textColor=brand_color,
-        alignment=TA_CENTER,
-        spaceAfter=10,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Section Header Style
-    style_section_head = ParagraphStyle(
-        'SectionHead',
-        parent=styles['Heading2'],
-        fontSize=12,
-        textColor=colors.white,
-        backColor=brand_color,
-        borderPadding=(5, 2, 5, 2), # top, right, bottom, left
-        spaceAfter=10,
-        spaceBefore=15,
-        fontName='Helvetica-Bold'
-    )
-    
-    # Normal Text Style
-    style_normal = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=10,
-        leading=14, # Line spacing
-        spaceAfter=6
-    )
-
-    # Label-Value Style (for specific data points)
-    style_label = ParagraphStyle(
-        'Label',
-        parent=styles['Normal'],
-        fontSize=10,
-        fontName='Helvetica-Bold',
-        textColor=colors.darkgrey
-    )
-
-    # --- Data Fetching Logic (Preserved from your code) ---
-    farmer_profile = FarmerProfile.objects.filter(user=contract.farmer).first()
-    contractor_profile = ContractorProfile.objects.filter(user=contract.buyer).first()
-
-    farmer_name = farmer_profile.name if farmer_profile else contract.farmer.username
-    farmer_address = getattr(farmer_profile, "address", "N/A") if farmer_profile else "N/A"
-    farmer_phone = getattr(farmer_profile, "phoneno", "N/A") if farmer_profile else "N/A"
-
-    buyer_name = contractor_profile.name if contractor_profile else contract.buyer.username
-    buyer_address = getattr(contractor_profile, "address", "N/A") if contractor_profile else "N/A"
-    buyer_phone = getattr(contractor_profile, "phoneno", "N/A") if contractor_profile else "N/A"
-
-    # --- Building the Story (Content) ---
-    story = []
-
-    # 1. Header
-    story.append(Paragraph("GREENPACT CROP SUPPLY AGREEMENT", style_title))
-    
-    # Contract Meta Info (Right aligned table)
-    meta_data = [
-        [Paragraph(f"<b>Contract ID:</b> {contract.contract_id}", style_normal)],
-        [Paragraph(f"<b>Date:</b> {contract.created_at.date()}", style_normal)]
-    ]
-    meta_table = Table(meta_data, colWidths=[doc.width], hAlign='RIGHT')
-    story.append(meta_table)
-    story.append(Spacer(1, 10))
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.lightgrey))
-    story.append(Spacer(1, 15))
-
-    # 2. Parties Involved (Side-by-Side Table)
-    story.append(Paragraph("1. PARTIES INVOLVED", style_section_head))
-    
-    # Create content for Farmer and Buyer cells
-    farmer_info = [
-        [Paragraph("FARMER / SELLER", style_label)],
-        [Paragraph(f"<b>{farmer_name}</b>", style_normal)],
-        [Paragraph(f"{farmer_address}", style_normal)],
-        [Paragraph(f"Tel: {farmer_phone}", style_normal)],
-    ]
-    
-    buyer_info = [
-        [Paragraph("BUYER / CONTRACTOR", style_label)],
-        [Paragraph(f"<b>{buyer_name}</b>", style_normal)],
-        [Paragraph(f"{buyer_address}", style_normal)],
-        [Paragraph(f"Tel: {buyer_phone}", style_normal)],
-    ]
-
-    # Nested tables for clean layout inside the main row
-    t_farmer = Table(farmer_info, colWidths=[3.2*inch])
-    t_buyer = Table(buyer_info, colWidths=[3.2*inch])
-
-    parties_data = [[t_farmer, t_buyer]]
-    parties_table = Table(parties_data, colWidths=[3.5*inch, 3.5*inch])
-    parties_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LINEAFTER', (0,0), (0,0), 1, colors.lightgrey), # Vertical separator
-    ]))
-    story.append(parties_table)
-
-    # 3. Crop & Order Details (Grid Table)
-    story.append(Paragraph("2. CROP & ORDER DETAILS", style_section_head))
-    
-    total_amount = contract.quantity * contract.nego_price
-    
-    order_data = [
-        ["Crop Name", contract.crop.crop_name, "Delivery Date", str(contract.delivery_date)],
-        ["Quantity", f"{contract.quantity}", "Price per Unit", f"{contract.nego_price}"],
-        ["Total Amount", f"{total_amount}", "Delivery Address", Paragraph(str(contract.delivery_address), style_normal)]
-    ]
-
-    order_table = Table(order_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
-    order_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.whitesmoke), # Header-like row
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'), # First col bold
-        ('FONTNAME', (2,0), (2,-1), 'Helvetica-Bold'), # Third col bold
-        ('PADDING', (0,0), (-1,-1), 6),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-    ]))
-    story.append(order_table)
-
-    # 4. Agreement Terms
-    story.append(Paragraph("3. AGREEMENT TERMS", style_section_head))
-    
-    if contract.terms:
-        for i, term in enumerate(contract.terms, start=1):
-            story.append(Paragraph(f"{i}. {term}", style_normal))
-    else:
-        story.append(Paragraph("No specific additional terms were recorded for this contract.", style_normal))
-
-    # 5. Payment & Responsibilities (Compact Section)
-    story.append(Paragraph("4. PAYMENT & RESPONSIBILITIES", style_section_head))
-    
-    p_text = f"""
-    <b>Payment Terms:</b> The total payable amount is <b>{total_amount}</b>. 
-    Payment shall be completed as per the mutually agreed schedule. Any delay may attract penalties.
-    <br/><br/>
-    <b>Farmer Responsibilities:</b> Deliver the agreed crop in specified quantity and quality; inform buyer of any delays.
-    <br/><br/>
-    <b>Buyer Responsibilities:</b> Accept delivery at the agreed time/place and complete payments on time.
+    return render_contract_pdf(build_contract_context(contract))
+
+
+class ContractPdfTemplate:
     """
-    story.append(Paragraph(p_text, style_normal))
-
-    # 6. Liability & Dispute Resolution
-    story.append(Paragraph("5. LEGAL & TERMINATION", style_section_head))
-    legal_text = """
-    In case of disputes, parties agree to amicable resolution. If unresolved, jurisdiction lies with the 
-    local district court of the farmer. Either party may terminate with prior written notice, subject to 
-    settlement of outstanding obligations.
+    Styles and boilerplate for the agreement, built once and reused for every
+    render. Only the per-contract data is laid out on each call to ``render``.
+
+    Flowables keep layout state while a document is being built, so an
+    instance must not be shared between threads; use ``get_contract_template``.
     """
-    story.append(Paragraph(legal_text, style_normal))
-
-    story.append(Spacer(1, 30))
-
-    # 7. Signatures
-    story.append(HRFlowable(width="100%", thickness=1, color=colors.black))
-    story.append(Spacer(1, 10))
-    
-    sig_data = [
-        [Paragraph("<b>FARMER SIGNATURE</b>", style_normal), Paragraph("<b>BUYER SIGNATURE</b>", style_normal)],
-        [Spacer(1, 40), Spacer(1, 40)], # Space for signing
-        [Paragraph(f"{farmer_name}", style_normal), Paragraph(f"{buyer_name}", style_normal)],
-        [Paragraph(f"Date: _________________", style_normal), Paragraph(f"Date: _________________", style_normal)]
-    ]
-    
-    sig_table = Table(sig_data, colWidths=[3.5*inch, 3.5*inch])
-    sig_table.setStyle(TableStyle([
-        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-    ]))
-    story.append(sig_table)
-    
-    # Footer Text
-    story.append(Spacer(1, 30))
-    footer = Paragraph(
-        "This is a computer-generated document. Greenpact facilitates the connection but is not a party to the direct trade.",
-        ParagraphStyle('Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=TA_CENTER)
-    )
-    story.append(footer)
-
-    # Build the PDF
-    doc.build(story)
-    
-    buffer.seek(0)
-    return buffer.getvalue()
\ No newline at end of file
+
+    # Custom Brand Color (Greenpact Green)
+    brand_color = colors.HexColor("#2E7D32")
+
+    def __init__(self):
+        # --- Styles ---
+        styles = getSampleStyleSheet()
+
+        # Title Style
+        self.style_title = ParagraphStyle(
+            'GreenpactTitle',
+            parent=styles['Heading1'],
+            fontSize=20,
+            textColor=self.brand_color,
+            alignment=TA_CENTER,
+            spaceAfter=10,
+            fontName='Helvetica-Bold'
+        )
+
+        # Section Header Style
+        self.style_section_head = ParagraphStyle(
+            'SectionHead',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.white,
+            backColor=self.brand_color,
+            borderPadding=(5, 2, 5, 2), # top, right, bottom, left
+            spaceAfter=10,
+            spaceBefore=15,
+            fontName='Helvetica-Bold'
+        )
+
+        # Normal Text Style
+        self.style_normal = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            leading=14, # Line spacing
+            spaceAfter=6
+        )
+
+        # Label-Value Style (for specific data points)
+        self.style_label = ParagraphStyle(
+            'Label',
+            parent=styles['Normal'],
+            fontSize=10,
+            fontName='Helvetica-Bold',
+            textColor=colors.darkgrey
+        )
+
+        self.style_footer = ParagraphStyle(
+            'Footer', parent=styles['Normal'], fontSize=8, textColor=colors.grey, alignment=TA_CENTER
+        )
+
+        # --- Table styles ---
+        self.parties_table_style = TableStyle([
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+            ('LINEAFTER', (0,0), (0,0), 1, colors.lightgrey), # Vertical separator
+        ])
+        self.order_table_style = TableStyle([
+            ('BACKGROUND', (0,0), (-1,0), colors.whitesmoke), # Header-like row
+            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+            ('FONTNAME', (0,0), (0,-1), 'Helvetica-Bold'), # First col bold
+            ('FONTNAME', (2,0), (2,-1), 'Helvetica-Bold'), # Third col bold
+            ('PADDING', (0,0), (-1,-1), 6),
+            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ])
+        self.sig_table_style = TableStyle([
+            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+            ('VALIGN', (0,0), (-1,-1), 'TOP'),
+        ])
+
+        # --- Static flowables ---
+        self.title = Paragraph("GREENPACT CROP SUPPLY AGREEMENT", self.style_title)
+        self.section_parties = Paragraph("1. PARTIES INVOLVED", self.style_section_head)
+        self.section_order = Paragraph("2. CROP & ORDER DETAILS", self.style_section_head)
+        self.section_terms = Paragraph("3. AGREEMENT TERMS", self.style_section_head)
+        self.section_payment = Paragraph("4. PAYMENT & RESPONSIBILITIES", self.style_section_head)
+        self.section_legal = Paragraph("5. LEGAL & TERMINATION", self.style_section_head)
+        self.farmer_label = Paragraph("FARMER / SELLER", self.style_label)
+        self.buyer_label = Paragraph("BUYER / CONTRACTOR", self.style_label)
+        self.no_terms = Paragraph("No specific additional terms were recorded for this contract.", self.style_normal)
+        self.responsibilities = Paragraph("""
+        <b>Farmer Responsibilities:</b> Deliver the agreed crop in specified quantity and quality; inform buyer of any delays.
+        <br/><br/>
+        <b>Buyer Responsibilities:</b> Accept delivery at the agreed time/place and complete payments on time.
+        """, self.style_normal)
+        self.legal = Paragraph("""
+        In case of disputes, parties agree to amicable resolution. If unresolved, jurisdiction lies with the 
+        local district court of the farmer. Either party may terminate with prior written notice, subject to 
+        settlement of outstanding obligations.
+        """, self.style_normal)
+        self.sig_headers = [
+            Paragraph("<b>FARMER SIGNATURE</b>", self.style_normal),
+            Paragraph("<b>BUYER SIGNATURE</b>", self.style_normal),
+        ]
+        self.sig_dates = [
+            Paragraph("Date: _________________", self.style_normal),
+            Paragraph("Date: _________________", self.style_normal),
+        ]
+        self.qr_caption = Paragraph("Scan to verify this agreement", self.style_footer)
+        self.footer = Paragraph(
+            "This is a computer-generated document. Greenpact facilitates the connection but is not a party to the direct trade.",
+            self.style_footer
+        )
+
+    def render(self, context: dict) -> bytes:
+        """Render the agreement for a context built by ``build_contract_context``."""
+        buffer = BytesIO()
+
+        # Setup the document with margins
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            rightMargin=40,
+            leftMargin=40,
+            topMargin=40,
+            bottomMargin=40,
+            title=f"Contract_{context['contract_id']}"
+        )
+        story = []
+        story += self._header(context, doc.width)
+        story += self._parties(context)
+        story += self._order(context)
+        story += self._terms(context)
+        story += self._payment(context)
+        story += self._signatures(context)
+
+        # Build the PDF
+        doc.build(story)
+        return buffer.getvalue()
+
+    def _header(self, context, width):
+        # Contract Meta Info (Right aligned table)
+        meta_data = [
+            [Paragraph(f"<b>Contract ID:</b> {context['contract_id']}", self.style_normal)],
+            [Paragraph(f"<b>Date:</b> {context['created_date']}", self.style_normal)]
+        ]
+        return [
+            self.title,
+            Table(meta_data, colWidths=[width], hAlign='RIGHT'),
+            Spacer(1, 10),
+            HRFlowable(width="100%", thickness=1, color=colors.lightgrey),
+            Spacer(1, 15),
+        ]
+
+    def _parties(self, context):
+        # Create content for Farmer and Buyer cells
+        farmer_info = [
+            [self.farmer_label],
+            [Paragraph(f"<b>{context['farmer_name']}</b>", self.style_normal)],
+            [Paragraph(f"{context['farmer_address']}", self.style_normal)],
+            [Paragraph(f"Tel: {context['farmer_phone']}", self.style_normal)],
+        ]
+        buyer_info = [
+            [self.buyer_label],
+            [Paragraph(f"<b>{context['buyer_name']}</b>", self.style_normal)],
+            [Paragraph(f"{context['buyer_address']}", self.style_normal)],
+            [Paragraph(f"Tel: {context['buyer_phone']}", self.style_normal)],
+        ]
+
+        # Nested tables for clean layout inside the main row
+        t_farmer = Table(farmer_info, colWidths=[3.2*inch])
+        t_buyer = Table(buyer_info, colWidths=[3.2*inch])
+
+        parties_table = Table([[t_farmer, t_buyer]], colWidths=[3.5*inch, 3.5*inch])
+        parties_table.setStyle(self.parties_table_style)
+        return [self.section_parties, parties_table]
+
+    def _order(self, context):
+        total_amount = context["quantity"] * context["nego_price"]
+        order_data = [
+            ["Crop Name", context["crop_name"], "Delivery Date", context["delivery_date"]],
+            ["Quantity", f"{context['quantity']}", "Price per Unit", f"{context['nego_price']}"],
+            ["Total Amount", f"{total_amount}", "Delivery Address", Paragraph(context["delivery_address"], self.style_normal)]
+        ]
+        order_table = Table(order_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
+        order_table.setStyle(self.order_table_style)
+        return [self.section_order, order_table]
+
+    def _terms(self, context):
+        if not context["terms"]:
+            return [self.section_terms, self.no_terms]
+        return [self.section_terms] + [
+            Paragraph(f"{i}. {term}", self.style_normal)
+            for i, term in enumerate(context["terms"], start=1)
+        ]
+
+    def _payment(self, context):
+        total_amount = context["quantity"] * context["nego_price"]
+        p_text = f"""
+        <b>Payment Terms:</b> The total payable amount is <b>{total_amount}</b>. 
+        Payment shall be completed as per the mutually agreed schedule. Any delay may attract penalties.
+        """
+        return [
+            self.section_payment,
+            Paragraph(p_text, self.style_normal),
+            self.responsibilities,
+            # Liability & Dispute Resolution
+            self.section_legal,
+            self.legal,
+            Spacer(1, 30),
+        ]
+
+    def _signatures(self, context):
+        sig_data = [
+            list(self.sig_headers),
+            [self._signature(context.get("farmer_signature")), self._signature(context.get("buyer_signature"))],
+            [Paragraph(f"{context['farmer_name']}", self.style_normal), Paragraph(f"{context['buyer_name']}", self.style_normal)],
+            list(self.sig_dates),
+        ]
+        sig_table = Table(sig_data, colWidths=[3.5*inch, 3.5*inch])
+        sig_table.setStyle(self.sig_table_style)
+        return [
+            HRFlowable(width="100%", thickness=1, color=colors.black),
+            Spacer(1, 10),
+            sig_table,
+            # Footer Text
+            Spacer(1, 30),
+            *self._verification(context),
+            self.footer,
+        ]
+
+    def _signature(self, public_id):
+        """
+        Signature image from the local cache, or blank space for signing when
+        the party has none. A signature that cannot be loaded raises, so an
+        unsigned copy is never cached under the signed agreement's digest.
+        """
+        if not public_id:
+            return Spacer(1, 40)
+        data = signature_cache.get(public_id)
+        if data is None:
+            raise SignatureUnavailable(public_id)
+        return Image(BytesIO(data), width=2.2*inch, height=40, kind='proportional', hAlign='LEFT')
+
+    def _verification(self, context):
+        url = context.get("verify_url")
+        if not url:
+            return []
+        widget = QrCodeWidget(url)
+        x1, y1, x2, y2 = widget.getBounds()
+        size = 72
+        drawing = Drawing(size, size, transform=[size / (x2 - x1), 0, 0, size / (y2 - y1), 0, 0])
+        drawing.add(widget)
+        drawing.hAlign = 'CENTER'
+        return [drawing, self.qr_caption, Spacer(1, 6)]
+
+
+_local = threading.local()
+
+
+def get_contract_template() -> ContractPdfTemplate:
+    """Return this thread's template, building it on first use."""
+    template = getattr(_local, "template", None)
+    if template is None:
+        template = _local.template = ContractPdfTemplate()
+    return template
+
+
+def render_contract_pdf(context: dict) -> bytes:
+    """Render the agreement for a context built by ``build_contract_context``."""
+    return get_contract_template().render(context)
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+import requests
+from cloudinary.utils import cloudinary_url
+from django.conf import settings
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class ImageCache:
+    """
+    Bounded two-level LRU of downscaled Cloudinary images, keyed by public_id.
+
+    Hits are served from memory, then from a shared directory on disk, so an
+    image is downloaded and decoded once no matter how many renders or worker
+    processes ask for it. Both levels evict the least recently used entries.
+    A failed download is remembered for ``failure_ttl`` seconds, so an
+    outage costs one timeout per image rather than one per request.
+    """
+
+    def __init__(self, name, size, mode="RGBA", max_memory_items=256, max_disk_items=5000, failure_ttl=60):
+        self.name = name
+        self.size = size
+        self.mode = mode
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.failure_ttl = failure_ttl
+        self._memory = OrderedDict()
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self):
+        root = getattr(settings, "IMAGE_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache", "images"))
+        return os.path.join(root, self.name)
+
+    def _disk_path(self, public_id):
+        return os.path.join(self.directory, hashlib.sha1(public_id.encode("utf-8")).hexdigest() + ".png")
+
+    def get(self, public_id):
+        """Return the processed PNG bytes for ``public_id``, or None if unavailable."""
+        if not public_id:
+            return None
+
+        with self._lock:
+            data = self._memory.get(public_id)
+            if data is not None:
+                self._memory.move_to_end(public_id)
+                return data
+
+        path = self._disk_path(public_id)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            if self._recently_failed(public_id):
+                return None
+            try:
+                data = self.process(self.download(public_id))
+            except Exception as e:
+                logger.warning("Could not load image %s: %s", public_id, e)
+                self._remember_failure(public_id)
+                return None
+            self._write_disk(path, data)
+
+        self._remember(public_id, data)
+        return data
+
+    def download(self, public_id):
+        url, _ = cloudinary_url(public_id, secure=True)
+        response = requests.get(url, timeout=10)
+        response.raise_for_status()
+        return response.content
+
+    def process(self, raw):
+        """Decode, convert and shrink the image to fit ``self.size``."""
+        with Image.open(BytesIO(raw)) as image:
+            image = image.convert(self.mode)
+            image.thumbnail(self.size)
+            out = BytesIO()
+            image.save(out, format="PNG", optimize=True)
+        return out.getvalue()
+
+    def _recently_failed(self, public_id):
+        with self._lock:
+            failed_at = self._failures.get(public_id)
+            if failed_at is None:
+                return False
+            if time.monotonic() - failed_at < self.failure_ttl:
+                return True
+            del self._failures[public_id]
+            return False
+
+    def _remember_failure(self, public_id):
+        now = time.monotonic()
+        with self._lock:
+            self._failures[public_id] = now
+            if len(self._failures) > self.max_memory_items:
+                self._failures = {
+                    key: failed_at for key, failed_at in self._failures.items()
+                    if now - failed_at < self.failure_ttl
+                }
+
+    def _remember(self, public_id, data):
+        with self._lock:
+            self._failures.pop(public_id, None)
+            self._memory[public_id] = data
+            self._memory.move_to_end(public_id)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _write_disk(self, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".png")]
+        excess = len(entries) - self.max_disk_items
+        if excess <= 0:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+signature_cache = ImageCache(
+    "signatures",
+    size=(360, 120),
+    max_memory_items=getattr(settings, "IMAGE_CACHE_MAX_MEMORY_ITEMS", 256),
+    max_disk_items=getattr(settings, "IMAGE_CACHE_MAX_DISK_ITEMS", 5000),
+    failure_ttl=getattr(settings, "IMAGE_CACHE_FAILURE_TTL", 60),
+)
+
+# Small greyscale copies of profile photos compared by face verification.
+face_cache = ImageCache(
+    "faces",
+    size=(128, 128),
+    mode="L",
+    max_memory_items=getattr(settings, "IMAGE_CACHE_MAX_MEMORY_ITEMS", 256),
+    max_disk_items=getattr(settings, "IMAGE_CACHE_MAX_DISK_ITEMS", 5000),
+    failure_ttl=getattr(settings, "IMAGE_CACHE_FAILURE_TTL", 60),
+)
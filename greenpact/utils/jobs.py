@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+def claim_jobs(model, limit, *conditions, **filters):
+    """
+    Atomically move up to ``limit`` pending jobs to running and return them.
+
+    Rows locked by another worker are skipped, so several workers can drain the
+    same table without handing out a job twice.
+    """
+    with transaction.atomic():
+        jobs = list(
+            model.objects.select_for_update(skip_locked=True)
+            .filter(*conditions, status=model.Status.PENDING, **filters)
+            .order_by("created_at")[:limit]
+        )
+        if jobs:
+            model.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=model.Status.RUNNING,
+                attempts=F("attempts") + 1,
+                updated_at=timezone.now(),
+            )
+            for job in jobs:
+                job.status = model.Status.RUNNING
+    return jobs
+
+
+def requeue_stale_jobs(model, minutes=10):
+    """Return jobs left running by a crashed worker to the pending state."""
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return model.objects.filter(
+        status=model.Status.RUNNING, updated_at__lt=cutoff
+    ).update(status=model.Status.PENDING)
+
+
+def init_django_worker():
+    """ProcessPoolExecutor initializer so spawned children can import models."""
+    import os
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "greenpact.settings")
+    django.setup()
@@ -0,0 +1,62 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at, pk):
+    # full isoformat: DjangoJSONEncoder would cut the microseconds the key relies on
+    raw = json.dumps([created_at.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        created_at = parse_datetime(created_at)
+    except (ValueError, TypeError, UnicodeError):
+        created_at = None
+    if created_at is None:
+        raise ValueError("Invalid cursor")
+    return created_at, pk
+
+
+def parse_page_size(value):
+    if value in (None, ""):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if size < 1:
+        raise ValueError("limit must be positive")
+    return min(size, MAX_PAGE_SIZE)
+
+
+def keyset_page(queryset, cursor=None, limit=DEFAULT_PAGE_SIZE, pk_field="pk"):
+    """
+    Return ``(rows, next_cursor)`` for one page of ``queryset`` newest first,
+    ordered by ``(created_at, pk_field)``. The cursor holds the last row's
+    key, so every page is a range read on an index starting with those
+    columns instead of an OFFSET scan.
+    """
+    queryset = queryset.order_by("-created_at", f"-{pk_field}")
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        try:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, **{f"{pk_field}__lt": pk})
+            )
+        except ValidationError:
+            raise ValueError("Invalid cursor")
+    rows = list(queryset[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, getattr(last, pk_field))
+    return rows, next_cursor
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import time
+from django.conf import settings
+
+
+def cache_root():
+    return getattr(
+        settings,
+        "CONTRACT_PDF_CACHE_DIR",
+        os.path.join(settings.BASE_DIR, "cache", "contract_pdfs"),
+    )
+
+
+def _contract_dir(contract_id):
+    return os.path.join(cache_root(), str(contract_id))
+
+
+def cached_pdf_path(contract_id, digest):
+    """Return the path of a cached PDF, or None if it has not been rendered yet."""
+    path = os.path.join(_contract_dir(contract_id), f"{digest}.pdf")
+    return path if os.path.exists(path) else None
+
+
+def store_pdf(contract_id, digest, pdf_bytes):
+    """
+    Write rendered bytes under their content hash. The write goes through a
+    temp file so readers never see a partially written PDF. Other renders of
+    the contract are left for ``sweep_contract_pdfs``: a download or export
+    may be about to open one of them.
+    """
+    directory = _contract_dir(contract_id)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{digest}.pdf")
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def invalidate_contract_pdfs(contract_id):
+    """Remove every cached render of a contract."""
+    directory = _contract_dir(contract_id)
+    if os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def sweep_contract_pdfs(max_age):
+    """
+    Remove renders (and abandoned temp files) older than ``max_age`` seconds,
+    except the newest render of each contract. Returns how many files went.
+    """
+    root = cache_root()
+    if not os.path.isdir(root):
+        return 0
+    cutoff = time.time() - max_age
+    removed = 0
+    for contract_dir in os.scandir(root):
+        if not contract_dir.is_dir():
+            continue
+        try:
+            entries = sorted(
+                (entry.stat().st_mtime, entry.path, entry.name)
+                for entry in os.scandir(contract_dir.path) if entry.is_file()
+            )
+        except FileNotFoundError:
+            continue
+        renders = [path for _, path, name in entries if name.endswith(".pdf")]
+        newest = renders[-1] if renders else None
+        for mtime, path, _ in entries:
+            if mtime < cutoff and path != newest:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
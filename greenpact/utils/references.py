@@ -0,0 +1,23 @@
+import re
+from django.db.models import F, Func, Value
+from django.db.models.functions import Upper
+
+_SEPARATORS = re.compile(r"[^0-9A-Za-z]+")
+
+
+def normalize_reference(value):
+    """
+    Canonical form of a payment reference (UTR, UPI or cheque number) for
+    matching: everything but letters and digits is dropped and letters are
+    upper-cased, so "utr-1234 56" and "UTR123456" compare equal.
+    """
+    if value is None:
+        return ""
+    return _SEPARATORS.sub("", str(value)).upper()
+
+
+def normalized_reference_sql(field):
+    """Database-side ``normalize_reference`` for set-based backfills on Postgres."""
+    return Upper(Func(
+        F(field), Value("[^0-9A-Za-z]+"), Value(""), Value("g"), function="REGEXP_REPLACE",
+    ))
@@ -0,0 +1,123 @@
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: only threads of one process are serialised
+    fcntl = None
+
+_thread_lock = threading.Lock()
+
+
+class ScratchFull(Exception):
+    """Raised when the scratch area is over its byte budget."""
+
+
+class UploadTooLarge(Exception):
+    """Raised when a single upload exceeds the per-file limit."""
+
+
+class ScratchArea:
+    """
+    Size-capped directory for uploads waiting on a background worker.
+
+    Files are streamed in chunk by chunk, so a request never holds a whole
+    upload in memory, and are refused once the directory holds ``max_bytes``.
+    Each save reserves ``max_file_bytes`` up front, under a lock shared by all
+    processes, by extending its new file to that size; the file is cut back
+    to what was written at the end. Concurrent uploads therefore cannot
+    overshoot the budget together. Workers remove files when done; ``sweep``
+    clears what a crash left behind.
+    """
+
+    def __init__(self, directory, max_bytes, max_file_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        # next to the directory, so it never shows up among the uploads
+        self.lock_path = directory.rstrip(os.sep) + ".lock"
+
+    def _entries(self):
+        try:
+            return list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+
+    def usage(self):
+        """Bytes held or reserved by files in the area."""
+        total = 0
+        for entry in self._entries():
+            try:
+                if entry.is_file():
+                    total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    @contextmanager
+    def _locked(self):
+        with _thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reserve(self, suffix):
+        """Create a file holding ``max_file_bytes`` of the budget; returns ``(fd, path)``."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._locked():
+            if self.usage() + self.max_file_bytes > self.max_bytes:
+                raise ScratchFull("Scratch space is full, try again shortly")
+            fd, path = tempfile.mkstemp(dir=self.directory, suffix=suffix)
+            try:
+                os.ftruncate(fd, self.max_file_bytes)
+            except BaseException:
+                os.close(fd)
+                self.remove(path)
+                raise
+        return fd, path
+
+    def save(self, chunks, suffix=""):
+        """Write ``chunks`` to a new file and return its path."""
+        fd, path = self._reserve(suffix)
+        written = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in chunks:
+                    written += len(chunk)
+                    if written > self.max_file_bytes:
+                        raise UploadTooLarge(f"Upload is larger than {self.max_file_bytes} bytes")
+                    out.write(chunk)
+                # give back the unused part of the reservation
+                out.truncate(written)
+        except BaseException:
+            self.remove(path)
+            raise
+        return path
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def sweep(self, max_age):
+        """Delete files older than ``max_age`` seconds; returns how many."""
+        cutoff = time.time() - max_age
+        removed = 0
+        for entry in self._entries():
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
@@ -0,0 +1,134 @@
+import csv
+import io
+import json
+import zipfile
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable sink that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(entries):
+    """
+    Yield a ZIP archive piece by piece from ``(arcname, source)`` pairs, where
+    ``source`` is a bytes payload, an open binary file (closed once written)
+    or a file path.
+
+    Files are copied from disk straight into the output, so only the entry
+    being written is ever held in memory.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for arcname, source in entries:
+            if isinstance(source, bytes):
+                archive.writestr(arcname, source)
+            elif hasattr(source, "read"):
+                with source, archive.open(arcname, "w") as entry:
+                    for block in iter(lambda: source.read(1024 * 1024), b""):
+                        entry.write(block)
+                        yield sink.drain()
+            else:
+                archive.write(source, arcname=arcname)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_csv(rows, fields, batch_size=500):
+    """Yield CSV text for dict ``rows`` in batches, header first."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_jsonl(rows, batch_size=500):
+    """Yield JSON Lines text for dict ``rows`` in batches."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, cls=DjangoJSONEncoder))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def export_response(request, export, rows, fields, basename):
+    """
+    Stream ``rows`` (an iterator of dicts, ideally from ``.iterator()``) as a
+    CSV or JSON Lines download. Raises ValueError for an unknown ``export``.
+    """
+    if export not in EXPORT_FORMATS:
+        raise ValueError(f"export must be one of: {', '.join(EXPORT_FORMATS)}")
+    if export == "csv":
+        chunks = stream_csv(rows, fields)
+    else:
+        chunks = stream_jsonl(({field: row[field] for field in fields} for row in rows))
+    return streaming_response(
+        request,
+        (chunk.encode("utf-8") for chunk in chunks),
+        EXPORT_FORMATS[export],
+        filename=f"{basename}.{export}",
+    )
+
+
+async def _iterate_in_thread(iterator):
+    sentinel = object()
+    iterator = iter(iterator)
+    while True:
+        chunk = await sync_to_async(next)(iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def streaming_response(request, iterator, content_type, filename=None):
+    """
+    Build a StreamingHttpResponse that streams under both WSGI and ASGI.
+
+    Django buffers synchronous iterators completely when serving over ASGI,
+    so there the iterator is pulled one chunk at a time in the sync thread.
+    """
+    django_request = getattr(request, "_request", request)
+    if isinstance(django_request, ASGIRequest):
+        iterator = _iterate_in_thread(iterator)
+    response = StreamingHttpResponse(iterator, content_type=content_type)
+    if filename:
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response